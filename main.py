@@ -8,5 +8,14 @@ if SRC_DIR not in sys.path:
 
 import uvicorn
 
+from bot.config.settings import settings
+
 print("Starting server on http://127.0.0.1:8000 ...")
-uvicorn.run("bot.api.server:app", host="127.0.0.1", port=8000, reload=False, log_level="debug")
\ No newline at end of file
+uvicorn.run(
+    "bot.api.server:app",
+    host="127.0.0.1",
+    port=8000,
+    reload=False,
+    log_level="debug",
+    ws_per_message_deflate=settings.ws_deflate,
+)
\ No newline at end of file
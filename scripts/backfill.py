@@ -0,0 +1,44 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import date, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from bot.config.settings import settings
+from bot.data.backfill import run_backfill
+from bot.storage.bar_store import BarStore
+
+
+def main():
+    p = argparse.ArgumentParser(description="Download historical 1-minute bars into the local bar store.")
+    p.add_argument("--symbols", default=",".join(settings.watchlist), help="comma-separated (default: WATCHLIST)")
+    p.add_argument("--start", default=(date.today() - timedelta(days=365)).isoformat(), help="first ET day, YYYY-MM-DD")
+    p.add_argument("--end", default=date.today().isoformat(), help="last ET day, YYYY-MM-DD (today is never stored)")
+    p.add_argument("--workers", type=int, default=settings.backfill_workers)
+    p.add_argument("--dir", default=settings.bar_store_dir, help="bar store directory")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    report = run_backfill(
+        symbols,
+        date.fromisoformat(args.start),
+        date.fromisoformat(args.end),
+        workers=args.workers,
+        store=BarStore(args.dir),
+    )
+    for sym in symbols:
+        print(f"{sym}: {report.days_written.get(sym, 0)} days, {report.bars_written.get(sym, 0)} bars")
+    print(f"{report.jobs} jobs, {report.pages} pages, {len(report.errors)} errors")
+    for key, err in report.errors.items():
+        print(f"  {key}: {err}")
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
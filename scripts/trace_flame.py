@@ -0,0 +1,74 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from bot.config.settings import settings
+
+
+def read_spans(paths: Iterable[str]) -> Iterator[dict]:
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get("event") == "span":
+                    yield rec["payload"]
+
+
+def folded(spans: List[dict]) -> Dict[str, float]:
+    """
+    Self time in microseconds per stack ("tick;scan;fetch_bars;bars 1234"), the
+    input format of flamegraph.pl and speedscope. Children that ran concurrently
+    in a thread pool can add up to more than their parent; its self time is then 0.
+    """
+    by_id = {s["span_id"]: s for s in spans}
+    child_ms: Dict[str, float] = defaultdict(float)
+    for s in spans:
+        if s.get("parent_id"):
+            child_ms[s["parent_id"]] += s.get("dur_ms") or 0.0
+
+    def stack(s: dict) -> str:
+        names = []
+        while s is not None:
+            names.append(s["name"])
+            s = by_id.get(s.get("parent_id"))
+        return ";".join(reversed(names))
+
+    out: Dict[str, float] = defaultdict(float)
+    for s in spans:
+        self_ms = max(0.0, (s.get("dur_ms") or 0.0) - child_ms[s["span_id"]])
+        out[stack(s)] += self_ms * 1000.0
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description="Turn exported trace spans into folded stacks for flame graphs.")
+    p.add_argument("paths", nargs="*", default=[settings.trace_file], help="span files, .gz segments included (default: TRACE_FILE)")
+    p.add_argument("--trace", help="only this trace_id (as stamped on audit records and events)")
+    p.add_argument("--root", help="only traces whose root span has this name (tick, stream_bar, ...)")
+    args = p.parse_args()
+
+    spans = list(read_spans(args.paths))
+    if args.trace:
+        spans = [s for s in spans if s["trace_id"] == args.trace]
+    if args.root:
+        keep = {s["trace_id"] for s in spans if s.get("parent_id") is None and s["name"] == args.root}
+        spans = [s for s in spans if s["trace_id"] in keep]
+    for stack, us in sorted(folded(spans).items()):
+        print(f"{stack} {int(round(us))}")
+
+
+if __name__ == "__main__":
+    main()
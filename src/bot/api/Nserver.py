@@ -13,9 +13,11 @@ from fastapi.staticfiles import StaticFiles
 import websockets  # pip install websockets
 
 from bot.engine.state_machine import Engine, in_entry_window
-from bot.broker.alpaca_adapter import get_account, now_et
+from bot.broker.account import account
+from bot.broker.alpaca_adapter import now_et
 from bot.config.settings import settings
-from bot.logging.events import get_queue as get_events_queue  # NEW
+from bot.api.broadcast import BroadcastHub, SlowConsumer
+from bot.logging.events import hub as events_hub
 
 logger = logging.getLogger("limitless.server")
 logging.basicConfig(level=logging.INFO)
@@ -35,9 +37,6 @@ app.mount("/ui", StaticFiles(directory="webui", html=True), name="webui")
 engine = Engine()
 engine_task: Optional[asyncio.Task] = None
 
-# --- Operator events queue (human-readable) ---
-_events_queue = get_events_queue()
-
 def _extract_bearer_token(auth_header: Optional[str]) -> Optional[str]:
     if not auth_header:
         return None
@@ -86,7 +85,7 @@ ALPACA_SECRET_KEY = BROKER.get("secret", "")
 # -------------------------
 # Prices (upstream Alpaca WS) and downstream fanout
 # -------------------------
-_prices_queue: "asyncio.Queue[dict]" = asyncio.Queue()
+prices_hub = BroadcastHub("prices")
 _prices_symbols: set[str] = set(["AAPL", "MSFT"])  # default symbols
 _prices_task: Optional[asyncio.Task] = None
 _prices_ws: Optional[websockets.WebSocketClientProtocol] = None
@@ -95,9 +94,9 @@ _prices_connect_lock = asyncio.Lock()
 _prices_reconnect_in_progress = False
 _prices_connected = False
 
-async def _prices_emit(ev: dict):
+def _prices_emit(ev: dict):
     try:
-        await _prices_queue.put(ev)
+        prices_hub.publish(ev, ev.get("S") if isinstance(ev, dict) else None)
     except Exception:
         pass
 
@@ -127,7 +126,7 @@ async def _prices_connect_loop():
                 await _prices_ws.send(json.dumps(sub_msg))
                 _prices_connected = True
                 _prices_reconnect_in_progress = False
-                await _prices_emit({"T": "success", "msg": f"connected to Alpaca data ws ({ALPACA_DATA_WS})"})
+                _prices_emit({"T": "success", "msg": f"connected to Alpaca data ws ({ALPACA_DATA_WS})"})
             # Receive loop
             async for raw in _prices_ws:
                 try:
@@ -136,9 +135,9 @@ async def _prices_connect_loop():
                     msg = raw
                 if isinstance(msg, list):
                     for ev in msg:
-                        await _prices_emit(ev)
+                        _prices_emit(ev)
                 else:
-                    await _prices_emit(msg)
+                    _prices_emit(msg)
         except Exception as e:
             logger.warning("Prices WS error: %s", e)
         finally:
@@ -157,15 +156,10 @@ async def events_stream(ws: WebSocket):
     """
     await ws.accept()
     try:
-        while True:
-            line = await _events_queue.get()
-            try:
-                await ws.send_text(line)
-            except WebSocketDisconnect:
-                break
-            except Exception:
-                pass
-    except WebSocketDisconnect:
+        with events_hub.subscribe() as sub:
+            while True:
+                await ws.send_text(await sub.get())
+    except (WebSocketDisconnect, SlowConsumer):
         pass
     except Exception as e:
         logger.warning("Events WS error: %s", e)
@@ -178,7 +172,7 @@ async def events_stream(ws: WebSocket):
 # -------------------------
 @app.get("/status")
 async def status():
-    acct = get_account()
+    acct = await account.aget()
     soft, hard = engine.daily_caps_state()
     return {
         "mode": getattr(engine, "mode", "paper"),
@@ -321,15 +315,10 @@ async def prices_unsub(symbol: str):
 async def prices_stream(ws: WebSocket):
     await ws.accept()
     try:
-        while True:
-            ev = await _prices_queue.get()
-            try:
-                await ws.send_text(json.dumps(ev))
-            except WebSocketDisconnect:
-                break
-            except Exception:
-                pass
-    except WebSocketDisconnect:
+        with prices_hub.subscribe() as sub:
+            while True:
+                await ws.send_text(json.dumps(await sub.get()))
+    except (WebSocketDisconnect, SlowConsumer):
         pass
     except Exception as e:
         logger.warning("Prices UI WS error: %s", e)
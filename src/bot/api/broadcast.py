@@ -0,0 +1,174 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+import logging
+
+from bot.config.settings import settings
+
+logger = logging.getLogger("limitless.broadcast")
+
+# Fan-out for WebSocket clients. Every subscriber gets its own bounded buffer,
+# so each message reaches every connected client, a slow client can only
+# lose its own messages, and nothing is retained when nobody is connected.
+# All methods run on the event loop thread.
+
+
+class SlowConsumer(Exception):
+    """Raised by Subscriber.get() once the hub disconnected a subscriber that fell behind."""
+
+
+class Subscriber:
+    def __init__(self, hub: "BroadcastHub", maxlen: int, symbols: Optional[Set[str]], policy: str):
+        self.hub = hub
+        self.maxlen = max(1, maxlen)
+        self.symbols = symbols  # None = everything
+        self.policy = policy
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.max_lag_ms = 0.0
+        self.frames = 0  # WebSocket frames / bytes sent for this subscriber (see bot.api.wire)
+        self.bytes = 0
+        self._buf: Deque[Tuple[float, Any]] = deque()
+        self._wake = asyncio.Event()
+
+    @property
+    def depth(self) -> int:
+        """Messages buffered and not yet read."""
+        return len(self._buf)
+
+    def wants(self, symbol: Optional[str]) -> bool:
+        return self.symbols is None or symbol is None or symbol in self.symbols
+
+    def push(self, msg: Any, ts: float) -> bool:
+        """Buffer one message; False if the subscriber was disconnected instead."""
+        if self.closed:
+            return False
+        if len(self._buf) >= self.maxlen:
+            if self.policy == "disconnect":
+                self.closed = True
+                self._wake.set()
+                return False
+            self._buf.popleft()
+            self.dropped += 1
+        self._buf.append((ts, msg))
+        self.max_depth = max(self.max_depth, len(self._buf))
+        self._wake.set()
+        return True
+
+    async def get(self) -> Any:
+        """Next message, waiting if none is buffered."""
+        return (await self.get_many(1))[0]
+
+    async def get_many(self, limit: Optional[int] = None) -> List[Any]:
+        """Every buffered message (at most `limit`), waiting until there is at least one."""
+        while not self._buf:
+            if self.closed:
+                raise SlowConsumer(f"{self.hub.name}: subscriber fell {self.maxlen} messages behind")
+            self._wake.clear()
+            await self._wake.wait()
+        n = len(self._buf) if limit is None else min(limit, len(self._buf))
+        now = time.monotonic()
+        out = []
+        for _ in range(n):
+            ts, msg = self._buf.popleft()
+            out.append(msg)
+        self.max_lag_ms = max(self.max_lag_ms, (now - ts) * 1000.0)
+        self.delivered += n
+        return out
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self) -> "Subscriber":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "max_lag_ms": round(self.max_lag_ms, 3),
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "symbols": sorted(self.symbols) if self.symbols is not None else None,
+        }
+
+
+class BroadcastHub:
+    """
+    Delivers each published message to every subscriber whose symbol filter
+    matches. When a subscriber's buffer is full the "drop_oldest" policy
+    discards its oldest message, "disconnect" closes it (its get() raises
+    SlowConsumer).
+    """
+
+    def __init__(self, name: str, maxlen: int = settings.ws_client_buffer, policy: str = settings.ws_slow_policy):
+        self.name = name
+        self.maxlen = maxlen
+        self.policy = policy
+        self.subscribers: List[Subscriber] = []
+        self.published = 0
+        self.dropped = 0  # across past and present subscribers
+        self.disconnected = 0
+
+    def subscribe(self, symbols: Optional[Iterable[str]] = None, maxlen: Optional[int] = None, policy: Optional[str] = None) -> Subscriber:
+        sym = {s.upper() for s in symbols} if symbols else None
+        sub = Subscriber(self, maxlen or self.maxlen, sym, policy or self.policy)
+        self.subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        if sub in self.subscribers:
+            self.subscribers.remove(sub)
+            self.dropped += sub.dropped
+        sub.closed = True
+        sub._wake.set()
+
+    def publish(self, msg: Any, symbol: Optional[str] = None):
+        self.published += 1
+        if not self.subscribers:
+            return
+        ts = time.monotonic()
+        for sub in list(self.subscribers):
+            if sub.wants(symbol):
+                self._deliver(sub, msg, ts)
+
+    def publish_filtered(self, select: Callable[[Optional[Set[str]]], Any]):
+        """
+        Publish a message tailored to each symbol filter: select(filter) returns
+        the message for subscribers with that filter (None = send nothing). It is
+        called once per distinct filter, not once per subscriber.
+        """
+        self.published += 1
+        if not self.subscribers:
+            return
+        ts = time.monotonic()
+        cache: Dict[Optional[frozenset], Any] = {}
+        for sub in list(self.subscribers):
+            key = frozenset(sub.symbols) if sub.symbols is not None else None
+            if key not in cache:
+                cache[key] = select(sub.symbols)
+            if cache[key] is not None:
+                self._deliver(sub, cache[key], ts)
+
+    def _deliver(self, sub: Subscriber, msg: Any, ts: float):
+        if not sub.push(msg, ts):
+            self.disconnected += 1
+            logger.warning("%s: disconnecting slow subscriber (%d buffered)", self.name, sub.maxlen)
+            self.unsubscribe(sub)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self.subscribers),
+            "published": self.published,
+            "dropped": self.dropped + sum(s.dropped for s in self.subscribers),
+            "disconnected": self.disconnected,
+            "subscribers": [s.stats() for s in self.subscribers],
+        }
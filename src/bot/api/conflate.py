@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import logging
+
+from bot.config.settings import settings
+
+logger = logging.getLogger("limitless.conflate")
+
+
+class Conflator:
+    """
+    Rate cap for market data going to the UI: only the latest quote and trade
+    per symbol are kept, and they are released at most `hz` times a second.
+    Everything else (bars, status messages) is emitted immediately. hz <= 0
+    disables conflation.
+    """
+
+    def __init__(self, emit: Callable[[Any], None], hz: float = settings.prices_conflate_hz, channels: Iterable[str] = ("q", "t")):
+        self.emit = emit
+        self.interval = 1.0 / hz if hz > 0 else 0.0
+        self.channels = set(channels)
+        self._latest: Dict[Tuple[str, str], dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.emitted = 0
+
+    def push(self, ev: Any):
+        self.received += 1
+        if self.interval and isinstance(ev, dict) and ev.get("T") in self.channels and ev.get("S"):
+            self._latest[(ev["S"], ev["T"])] = ev
+            return
+        self.emitted += 1
+        self.emit(ev)
+
+    def flush(self):
+        if not self._latest:
+            return
+        pending, self._latest = self._latest, {}
+        for ev in pending.values():
+            self.emitted += 1
+            self.emit(ev)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning("Conflation flush failed: %s", e)
+
+    def start(self):
+        if self.interval and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hz": round(1.0 / self.interval, 3) if self.interval else 0,
+            "received": self.received,
+            "emitted": self.emitted,
+            "pending": len(self._latest),
+        }
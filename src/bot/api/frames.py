@@ -0,0 +1,35 @@
+import re
+from typing import Optional, Set
+
+# Alpaca market data frames are JSON arrays of flat objects
+# ([{"T":"q","S":"AAPL",...},...]; condition codes are arrays of strings, never
+# objects). That lets raw frames be routed by symbol with two regexes instead
+# of a json.loads/json.dumps round trip per message.
+
+_SYMBOL = re.compile(r'"S"\s*:\s*"([^"]+)"')
+_OBJECT = re.compile(r"\{[^{}]*\}")
+
+
+def frame_symbols(raw: str) -> Set[str]:
+    """Symbols mentioned anywhere in a raw frame."""
+    return set(_SYMBOL.findall(raw))
+
+
+def filter_frame(raw: str, symbols: Optional[Set[str]], present: Optional[Set[str]] = None) -> Optional[str]:
+    """
+    The part of `raw` a client subscribed to `symbols` should see: the frame
+    itself when every message matches (or carries no symbol), a rebuilt array
+    of just the matching messages when only some do, None when none do.
+    `present` is frame_symbols(raw), if the caller already has it.
+    """
+    if symbols is None:
+        return raw
+    present = frame_symbols(raw) if present is None else present
+    if present <= symbols:
+        return raw
+    keep = []
+    for m in _OBJECT.findall(raw):
+        s = _SYMBOL.search(m)
+        if s is None or s.group(1) in symbols:
+            keep.append(m)
+    return "[" + ",".join(keep) + "]" if keep else None
@@ -0,0 +1,125 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+import logging
+
+from bot.config.settings import settings
+
+logger = logging.getLogger("limitless.loop_lag")
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop scheduling delay: a task sleeps `interval` seconds and
+    records how late it wakes up. Lag percentiles over the last `window`
+    samples are available from stats().
+
+    With `watchdog` on (LOOP_WATCHDOG, meant for debugging), a helper thread
+    also notices when the loop has not woken up for `block_ms` and captures the
+    loop thread's stack at that moment, i.e. the callback that is blocking it.
+    """
+
+    def __init__(
+        self,
+        interval: float = settings.loop_lag_interval_ms / 1000.0,
+        block_ms: float = settings.loop_block_ms,
+        watchdog: bool = settings.loop_watchdog,
+        window: int = 3000,
+        keep_stalls: int = 20,
+    ):
+        self.interval = max(0.001, interval)
+        self.block_ms = block_ms
+        self.watchdog = watchdog
+        self.samples: Deque[float] = deque(maxlen=window)  # lag in ms
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=keep_stalls)
+        self.count = 0
+        self.over_threshold = 0
+        self.max_ms = 0.0
+        self._beat = 0.0
+        self._open_stall: Optional[Dict[str, Any]] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog_thread: Optional[threading.Thread] = None
+
+    def _record(self, lag_ms: float):
+        self.samples.append(lag_ms)
+        self.count += 1
+        self.max_ms = max(self.max_ms, lag_ms)
+        if lag_ms >= self.block_ms:
+            self.over_threshold += 1
+        stall = self._open_stall
+        if stall is not None:
+            stall["blocked_ms"] = round(lag_ms, 3)
+            self._open_stall = None
+            logger.warning("Event loop blocked for %.0f ms in:\n%s", lag_ms, "".join(stall["stack"][-6:]))
+
+    async def run(self):
+        self._loop_thread = threading.get_ident()
+        while True:
+            start = time.monotonic()
+            self._beat = start
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            self._record(max(0.0, (self._beat - start - self.interval) * 1000.0))
+
+    def _watch(self):
+        poll = max(0.005, self.block_ms / 4000.0)
+        while not self._stop.wait(poll):
+            beat = self._beat
+            # The monitor task is due every `interval`; anything beyond that is blocking
+            late_ms = (time.monotonic() - beat - self.interval) * 1000.0
+            if beat and late_ms >= self.block_ms and self._open_stall is None and self._loop_thread is not None:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is None:
+                    continue
+                stall = {
+                    "at": datetime.utcnow().isoformat() + "Z",
+                    "blocked_ms": None,  # filled in once the loop wakes up
+                    "stack": traceback.format_stack(frame),
+                }
+                self.stalls.append(stall)
+                self._open_stall = stall
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        if self.watchdog and (self._watchdog_thread is None or not self._watchdog_thread.is_alive()):
+            self._stop.clear()
+            self._watchdog_thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog_thread.start()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._stop.set()
+
+    def stats(self, stalls: bool = False) -> Dict[str, Any]:
+        ordered: List[float] = sorted(self.samples)
+
+        def pct(q: float) -> Optional[float]:
+            return round(ordered[int(q * (len(ordered) - 1))], 3) if ordered else None
+
+        out: Dict[str, Any] = {
+            "interval_ms": self.interval * 1000.0,
+            "samples": len(ordered),
+            "p50_ms": pct(0.50),
+            "p90_ms": pct(0.90),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "over_threshold": self.over_threshold,
+            "threshold_ms": self.block_ms,
+            "watchdog": self.watchdog,
+        }
+        if stalls:
+            out["stalls"] = list(self.stalls)
+        return out
+
+
+loop_monitor = LoopLagMonitor()
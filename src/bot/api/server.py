@@ -6,16 +6,26 @@ import re
 from typing import Dict, Optional
 from contextlib import suppress
 
-from fastapi import FastAPI, WebSocket, HTTPException, Header, Query, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, HTTPException, Header, Query, Response, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 import websockets
 
 from bot.engine.state_machine import Engine, in_entry_window
-from bot.broker.alpaca_adapter import get_account, now_et, set_alpaca_creds
+from bot.api.broadcast import BroadcastHub, SlowConsumer
+from bot.api.conflate import Conflator
+from bot.api.frames import filter_frame
+from bot.api.loop_lag import loop_monitor
+from bot.api.state import StateChannel
+from bot.api.wire import negotiate, pump
+from bot.broker import alpaca_async
+from bot.broker.account import account
+from bot.broker.alpaca_adapter import now_et, set_alpaca_creds
+from bot.broker.rate_limit import limiter, plan_request_budget
 from bot.config.settings import settings
-from bot.logging.events import get_queue as get_events_queue
+from bot.logging import metrics, tracing
+from bot.logging.events import hub as events_hub
 from bot.logging.events import publish as publish_event
 
 logger = logging.getLogger("limitless.server")
@@ -34,8 +44,7 @@ app.mount("/ui", StaticFiles(directory="webui", html=True), name="webui")
 
 engine = Engine()
 engine_task: Optional[asyncio.Task] = None
-
-_events_queue = get_events_queue()
+state_channel = StateChannel(engine)
 
 def _extract_bearer_token(auth_header: Optional[str]) -> Optional[str]:
     if not auth_header:
@@ -82,8 +91,12 @@ ALPACA_DATA_WS = BROKER.get("data_ws", "wss://stream.data.alpaca.markets/v2/iex"
 ALPACA_KEY_ID = BROKER.get("key", "")
 ALPACA_SECRET_KEY = BROKER.get("secret", "")
 
-_prices_queue: "asyncio.Queue[dict]" = asyncio.Queue()
+prices_hub = BroadcastHub("prices")  # decoded events
+prices_raw_hub = BroadcastHub("prices_raw")  # upstream frames as received (/prices?raw=1)
 _prices_symbols: set[str] = set(["AAPL", "MSFT"])
+if settings.engine_mode == "stream":
+    # The engine is driven by this stream, so it must carry the whole watchlist
+    _prices_symbols.update(settings.watchlist)
 _prices_task: Optional[asyncio.Task] = None
 _prices_ws: Optional[websockets.WebSocketClientProtocol] = None
 _prices_lock = asyncio.Lock()
@@ -91,12 +104,42 @@ _prices_connect_lock = asyncio.Lock()
 _prices_reconnect_in_progress = False
 _prices_connected = False
 
-async def _prices_emit(ev: dict):
+def _prices_emit(ev: dict):
     try:
-        await _prices_queue.put(ev)
+        prices_hub.publish(ev, ev.get("S") if isinstance(ev, dict) else None)
     except Exception:
         pass
 
+_prices_conflator = Conflator(_prices_emit)  # engine sees every tick; decoded /prices clients see conflated ones
+
+def _prices_forward(raw):
+    """
+    Route one upstream frame. Raw subscribers get it (or the part matching their
+    symbols) without decoding; it is only parsed when the engine or a decoded
+    /prices client needs individual events.
+    """
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", "replace")
+    prices_raw_hub.publish_filtered(lambda symbols: filter_frame(raw, symbols))
+    if settings.engine_mode != "stream" and not prices_hub.subscribers:
+        return
+    try:
+        msg = json.loads(raw)
+    except Exception:
+        msg = raw
+    if isinstance(msg, list):
+        for ev in msg:
+            engine.on_stream_event(ev)
+            _prices_conflator.push(ev)
+    else:
+        engine.on_stream_event(msg)
+        _prices_conflator.push(msg)
+
+def _parse_symbols(symbols: Optional[str]) -> Optional[set]:
+    if not symbols:
+        return None
+    return {s.strip().upper() for s in symbols.split(",") if s.strip()} or None
+
 async def _prices_send(payload: dict) -> bool:
     async with _prices_lock:
         if _prices_ws:
@@ -121,7 +164,10 @@ async def _prices_connect_loop():
                 await _prices_ws.send(json.dumps(sub_msg))
                 _prices_connected = True
                 _prices_reconnect_in_progress = False
-                await _prices_emit({"T": "success", "msg": f"connected to Alpaca data ws ({ALPACA_DATA_WS})"})
+                engine.set_stream_connected(True)
+                connected = {"T": "success", "msg": f"connected to Alpaca data ws ({ALPACA_DATA_WS})"}
+                _prices_emit(connected)
+                prices_raw_hub.publish(json.dumps([connected]))
                 try:
                     from bot.logging.events import publish
                     ws_name = "IEX" if "/iex" in ALPACA_DATA_WS else "SIP"
@@ -131,19 +177,12 @@ async def _prices_connect_loop():
                     pass
 
             async for raw in _prices_ws:
-                try:
-                    msg = json.loads(raw)
-                except Exception:
-                    msg = raw
-                if isinstance(msg, list):
-                    for ev in msg:
-                        await _prices_emit(ev)
-                else:
-                    await _prices_emit(msg)
+                _prices_forward(raw)
         except Exception as e:
             logger.warning("Prices WS error: %s", e)
         finally:
             _prices_connected = False
+            engine.set_stream_connected(False)
             with suppress(Exception):
                 if _prices_ws:
                     await _prices_ws.close()
@@ -151,19 +190,21 @@ async def _prices_connect_loop():
             await asyncio.sleep(1.0)
 
 @app.websocket("/events")
-async def events_stream(ws: WebSocket):
+async def events_stream(ws: WebSocket, proto: Optional[str] = Query(None)):
+    try:
+        proto = negotiate(proto)
+    except ValueError:
+        await ws.close(code=1003)
+        return
     await ws.accept()
     try:
-        while True:
-            line = await _events_queue.get()
-            try:
-                await ws.send_text(line)
-            except WebSocketDisconnect:
-                break
-            except Exception:
-                pass
+        with events_hub.subscribe() as sub:
+            await pump(ws, sub, proto)
     except WebSocketDisconnect:
         pass
+    except SlowConsumer:
+        with suppress(Exception):
+            await ws.close(code=1013)
     except Exception as e:
         logger.warning("Events WS error: %s", e)
     finally:
@@ -172,40 +213,47 @@ async def events_stream(ws: WebSocket):
 
 @app.get("/status")
 async def status():
-    acct = get_account()
-    soft, hard = engine.daily_caps_state()
+    acct = await account.aget()
+    state = engine.snapshot_state()
     return {
-        "mode": getattr(engine, "mode", "paper"),
+        "mode": state["mode"],
         "equity": getattr(acct, "equity", None),
         "buying_power": getattr(acct, "buying_power", None),
         "ts": now_et().isoformat(),
         "windows": {"is_in_window": in_entry_window()},
-        "daily_caps": {
-            "soft_hit": soft,
-            "hard_hit": hard,
-            "realized_usd": getattr(engine, "daily_realized_usd", 0.0),
-            "soft_cap_pct": settings.soft_cap_pct,
-            "hard_cap_pct": settings.hard_cap_pct,
-        },
-        "concurrency": {"open_positions": len(engine.positions), "cap": settings.concurrency_cap},
-        "cooldowns": {
-            "global_last_entry": getattr(engine, "global_last_entry", None).isoformat() if getattr(engine, "global_last_entry", None) else None
-        },
+        "daily_caps": state["daily_caps"],
+        "concurrency": state["concurrency"],
+        "cooldowns": {"global_last_entry": state["cooldowns"]["global_last_entry"]},
+    }
+
+@app.get("/ratelimit")
+async def ratelimit():
+    return {
+        "usage": limiter.usage(),
+        "account_cache": account.stats(),
+        "plan": plan_request_budget(len(settings.watchlist), n_positions=len(engine.positions) or settings.concurrency_cap),
     }
 
 @app.get("/positions")
 async def positions():
-    rows = []
-    for ps in engine.positions:
-        rows.append({
-            "symbol": ps.symbol,
-            "entry_price": ps.entry_price,
-            "target_price": ps.target_price,
-            "qty": ps.qty,
-            "opened_at": ps.opened_at,
-            "bucket": ps.bucket,
-        })
-    return rows
+    return engine.snapshot_state()["positions"]
+
+@app.websocket("/state")
+async def state_stream(ws: WebSocket):
+    """Engine state snapshot on connect, then merge-patch deltas on change (see StateChannel)."""
+    await ws.accept()
+    try:
+        await state_channel.serve(ws)
+    except WebSocketDisconnect:
+        pass
+    except SlowConsumer:
+        with suppress(Exception):
+            await ws.close(code=1013)
+    except Exception as e:
+        logger.warning("State WS error: %s", e)
+    finally:
+        with suppress(Exception):
+            await ws.close()
 
 @app.post("/control")
 async def control(action: str = Query(...), token: Optional[str] = Query(None), authorization: Optional[str] = Header(None)):
@@ -280,6 +328,59 @@ async def prices_status():
         "subscribed": sorted(list(_prices_symbols)),
     }
 
+@app.get("/debug/loop")
+async def debug_loop(stalls: bool = Query(True)):
+    """Event loop lag percentiles; with LOOP_WATCHDOG, stacks of recent blocking callbacks."""
+    return loop_monitor.stats(stalls=stalls)
+
+def _collect_metrics():
+    """Scrape-time values for /metrics that the hubs, caches and monitors already track."""
+    hubs = {
+        "events": events_hub,
+        "prices": prices_hub,
+        "prices_raw": prices_raw_hub,
+        "state": state_channel.hub,
+    }
+    depths = {name: [s.depth for s in hub.subscribers] for name, hub in hubs.items()}
+    lag = loop_monitor.stats()
+    conflation = _prices_conflator.stats()
+    audit = engine.aud.stats()
+    return [
+        ("ws_clients", "gauge", "Connected WebSocket subscribers", [({"hub": n}, len(d)) for n, d in depths.items()]),
+        ("ws_queue_depth", "gauge", "Messages buffered across a hub's subscribers", [({"hub": n}, sum(d)) for n, d in depths.items()]),
+        ("ws_queue_depth_max", "gauge", "Deepest subscriber buffer of a hub", [({"hub": n}, max(d, default=0)) for n, d in depths.items()]),
+        ("ws_published_total", "counter", "Messages published to a hub", [({"hub": n}, h.published) for n, h in hubs.items()]),
+        ("ws_dropped_total", "counter", "Messages dropped for slow subscribers", [({"hub": n}, h.stats()["dropped"]) for n, h in hubs.items()]),
+        ("ws_disconnected_total", "counter", "Slow subscribers disconnected", [({"hub": n}, h.disconnected) for n, h in hubs.items()]),
+        ("prices_conflator_received_total", "counter", "Market data events received for /prices clients", [({}, conflation["received"])]),
+        ("prices_conflator_emitted_total", "counter", "Market data events sent on after conflation", [({}, conflation["emitted"])]),
+        ("engine_stream_queue_depth", "gauge", "Stream events waiting for the engine thread", [({}, engine._stream_events.qsize())]),
+        ("engine_stream_dropped_total", "counter", "Stream events dropped on a full engine queue", [({}, engine.stream_dropped)]),
+        ("audit_queue_depth", "gauge", "Audit records waiting to be written", [({}, audit["queued"])]),
+        ("audit_dropped_total", "counter", "Audit records dropped on a full queue", [({}, audit["dropped"])]),
+        ("account_cache_fetches_total", "counter", "Account fetches from Alpaca", [({}, account.fetches)]),
+        ("account_cache_hits_total", "counter", "Account reads served from the snapshot", [({}, account.hits)]),
+        ("event_loop_lag_seconds", "gauge", "Event loop lag over the monitor window",
+         [({"quantile": q}, lag[k] / 1000.0) for q, k in (("0.5", "p50_ms"), ("0.9", "p90_ms"), ("0.99", "p99_ms")) if lag[k] is not None]),
+        ("event_loop_lag_max_seconds", "gauge", "Largest event loop lag seen", [({}, lag["max_ms"] / 1000.0)]),
+    ]
+
+metrics.add_collector(_collect_metrics)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Counters, gauges and latency histograms in the Prometheus text format."""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/ws/stats")
+async def ws_stats():
+    return {
+        "events": events_hub.stats(),
+        "prices": prices_hub.stats(),
+        "prices_raw": prices_raw_hub.stats(),
+        "conflation": _prices_conflator.stats(),
+    }
+
 @app.post("/prices/reconnect")
 async def prices_reconnect():
     with suppress(Exception):
@@ -309,6 +410,8 @@ async def prices_unsub(symbol: str):
     # Allow alphanumeric plus dots and hyphens for symbols like BRK.A
     if not re.match(r'^[A-Z0-9.-]+$', sym):
         raise HTTPException(status_code=400, detail="invalid symbol format")
+    if settings.engine_mode == "stream" and sym in settings.watchlist:
+        raise HTTPException(status_code=400, detail="symbol is on the engine watchlist (stream mode)")
     with suppress(KeyError):
         _prices_symbols.remove(sym)
     await _prices_send({"action": "subscribe", "bars": list(_prices_symbols), "quotes": list(_prices_symbols), "trades": list(_prices_symbols)})
@@ -316,19 +419,28 @@ async def prices_unsub(symbol: str):
     return {"ok": True, "subscribed": sorted(list(_prices_symbols))}
 
 @app.websocket("/prices")
-async def prices_stream(ws: WebSocket):
+async def prices_stream(ws: WebSocket, symbols: Optional[str] = Query(None), raw: bool = Query(False), proto: Optional[str] = Query(None)):
+    """
+    Quotes/trades/bars, one event per message; quotes and trades are conflated
+    to PRICES_CONFLATE_HZ per symbol. `symbols=AAPL,MSFT` limits a client to
+    those symbols. With `raw=1` the client gets Alpaca's frames (JSON arrays of
+    events, every tick) as received instead. `proto=batch|msgpack` batches
+    messages into one frame per WS_BATCH_MS (see bot.api.wire).
+    """
+    try:
+        proto = negotiate(proto, raw)
+    except ValueError:
+        await ws.close(code=1003)
+        return
     await ws.accept()
     try:
-        while True:
-            ev = await _prices_queue.get()
-            try:
-                await ws.send_text(json.dumps(ev))
-            except WebSocketDisconnect:
-                break
-            except Exception:
-                pass
+        with (prices_raw_hub if raw else prices_hub).subscribe(_parse_symbols(symbols)) as sub:
+            await pump(ws, sub, proto, raw)
     except WebSocketDisconnect:
         pass
+    except SlowConsumer:
+        with suppress(Exception):
+            await ws.close(code=1013)
     except Exception as e:
         logger.warning("Prices UI WS error: %s", e)
     finally:
@@ -533,6 +645,9 @@ async def on_startup():
 
     if not _prices_task or _prices_task.done():
         _prices_task = asyncio.create_task(_prices_connect_loop())
+    _prices_conflator.start()
+    state_channel.start()
+    loop_monitor.start()
     logger.info("Server startup complete")
 
 @app.on_event("shutdown")
@@ -543,4 +658,13 @@ async def on_shutdown():
     with suppress(Exception):
         if _prices_task:
             _prices_task.cancel()
+    _prices_conflator.stop()
+    state_channel.stop()
+    loop_monitor.stop()
+    with suppress(Exception):
+        await alpaca_async.aclose()
+    with suppress(Exception):
+        await asyncio.to_thread(engine.aud.close)
+    with suppress(Exception):
+        await asyncio.to_thread(tracing.close)
     logger.info("Server shutdown complete")
\ No newline at end of file
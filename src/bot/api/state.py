@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+import logging
+
+from fastapi import WebSocket
+
+from bot.api.broadcast import BroadcastHub
+from bot.api.wire import pump
+from bot.broker.account import account
+from bot.config.settings import settings
+from bot.engine.state_machine import in_entry_window
+
+logger = logging.getLogger("limitless.state")
+
+
+def merge_patch(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    RFC 7386 JSON merge patch that turns `old` into `new`, or None if they are
+    equal. Nested dicts are diffed key by key; lists are replaced whole; a key
+    that is gone (or became None) is sent as null.
+    """
+    patch: Dict[str, Any] = {}
+    for k in old.keys() - new.keys():
+        patch[k] = None
+    for k, v in new.items():
+        if k not in old:
+            patch[k] = v
+        elif isinstance(v, dict) and isinstance(old[k], dict):
+            sub = merge_patch(old[k], v)
+            if sub is not None:
+                patch[k] = sub
+        elif v != old[k]:
+            patch[k] = v
+    return patch or None
+
+
+class StateChannel:
+    """
+    Server-push dashboard state for /state. A client gets {"type": "snapshot",
+    "seq", "state"} on connect, then {"type": "delta", "seq", "patch"} merge
+    patches, each seq one higher than the last. The engine's state_version is
+    checked every STATE_POLL_MS; everything else (account, settings edits,
+    entry window) every STATE_FULL_CHECK_SEC. Nothing is built or sent while
+    no client is connected or nothing changed. A client that falls behind is
+    disconnected and resyncs from a fresh snapshot on reconnect.
+    """
+
+    def __init__(self, engine, poll_sec: float = settings.state_poll_ms / 1000.0, full_check_sec: float = settings.state_full_check_sec):
+        self.engine = engine
+        self.poll_sec = max(0.01, poll_sec)
+        self.full_check_sec = full_check_sec
+        self.hub = BroadcastHub("state", policy="disconnect")
+        self.current: Optional[Dict[str, Any]] = None
+        self.seq = 0
+        self._seen_version = -1
+        self._last_full = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def build(self, fetch_account: bool = False) -> Dict[str, Any]:
+        state = self.engine.snapshot_state()
+        self._seen_version = state.pop("version")
+        acct = account.peek()
+        if fetch_account:
+            try:
+                acct = await account.aget()
+            except Exception as e:
+                logger.debug("State channel account refresh failed: %s", e)
+        state["account"] = {
+            "equity": getattr(acct, "equity", None),
+            "buying_power": getattr(acct, "buying_power", None),
+        }
+        state["windows"] = {"is_in_window": in_entry_window()}
+        return state
+
+    async def refresh(self, fetch_account: bool = False):
+        """Rebuild the state and publish a delta if anything changed."""
+        new = await self.build(fetch_account)
+        if self.current is None:
+            self.current = new
+            return
+        patch = merge_patch(self.current, new)
+        if patch is not None:
+            self.current = new
+            self.seq += 1
+            self.hub.publish({"type": "delta", "seq": self.seq, "patch": patch})
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.poll_sec)
+            if not self.hub.subscribers:
+                self.current = None
+                continue
+            try:
+                now = time.monotonic()
+                full = now - self._last_full >= self.full_check_sec
+                if full or self.engine.state_version != self._seen_version:
+                    if full:
+                        self._last_full = now
+                    await self.refresh(fetch_account=full)
+            except Exception as e:
+                logger.warning("State channel refresh failed: %s", e)
+
+    async def serve(self, ws: WebSocket):
+        with self.hub.subscribe() as sub:
+            if self.current is None:
+                self.current = await self.build(fetch_account=True)
+                self._last_full = time.monotonic()
+            await ws.send_json({"type": "snapshot", "seq": self.seq, "state": self.current})
+            await pump(ws, sub)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,68 @@
+import asyncio
+import json
+from typing import Any, List, Optional, Union
+import logging
+
+from fastapi import WebSocket
+
+from bot.api.broadcast import Subscriber
+from bot.config.settings import settings
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for ?proto=msgpack
+    msgpack = None
+
+logger = logging.getLogger("limitless.wire")
+
+# Wire protocols for the UI streams, picked by the client with ?proto=:
+#   json    - one message per text frame (the original protocol, the default)
+#   batch   - every message buffered during WS_BATCH_MS as one compact JSON array
+#   msgpack - the same batches as binary MessagePack frames
+# Raw /prices frames are already JSON arrays, so batches of them are spliced
+# together as text and msgpack falls back to batch.
+
+PROTOCOLS = ("json", "batch", "msgpack")
+
+
+def negotiate(proto: Optional[str], raw: bool = False) -> str:
+    p = (proto or "json").lower()
+    if p not in PROTOCOLS:
+        raise ValueError(f"proto must be one of {', '.join(PROTOCOLS)}")
+    if p == "msgpack" and (raw or msgpack is None):
+        if msgpack is None:
+            logger.warning("msgpack is not installed; serving proto=batch instead")
+        return "batch"
+    return p
+
+
+def merge_frames(frames: List[str]) -> str:
+    """Splice JSON-array frames into one array without decoding them."""
+    parts = [f.strip()[1:-1] for f in frames]
+    return "[" + ",".join(p for p in parts if p) + "]"
+
+
+def encode_batch(msgs: List[Any], proto: str, raw: bool = False) -> Union[str, bytes]:
+    if raw:
+        return merge_frames(msgs)
+    if proto == "msgpack":
+        return msgpack.packb(msgs, use_bin_type=True)
+    return json.dumps(msgs, separators=(",", ":"))
+
+
+async def pump(ws: WebSocket, sub: Subscriber, proto: str = "json", raw: bool = False, interval: float = settings.ws_batch_ms / 1000.0):
+    """Send a subscriber's messages to `ws` until it disconnects."""
+    while True:
+        if proto == "json":
+            msg = await sub.get()
+            frame = msg if isinstance(msg, str) else json.dumps(msg)
+        else:
+            frame = encode_batch(await sub.get_many(), proto, raw)
+        if isinstance(frame, bytes):
+            await ws.send_bytes(frame)
+        else:
+            await ws.send_text(frame)
+        sub.frames += 1
+        sub.bytes += len(frame)
+        if proto != "json":
+            await asyncio.sleep(interval)
@@ -0,0 +1,309 @@
+import dataclasses
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+import logging
+
+from bot.backtest.signals import SymbolSeries, TZ_ET, atr_series, entry_signals, prepare_symbol
+from bot.broker import alpaca_adapter
+from bot.config.settings import Settings, settings
+from bot.engine.state_machine import Engine, PositionState, friday_flatten_due
+from bot.logging import metrics, tracing
+from bot.logging.audit import Auditor
+from bot.storage.buckets_ledger import BucketsLedger
+from bot.strategy.batch_scan import ENTRY_FLAGS
+from bot.strategy.fast_rules import BarArrays, EntryEval
+
+logger = logging.getLogger("limitless.backtest")
+
+# Replays minute bars through the live Engine: window/cooldown/cap checks,
+# sizing, guardrails, stale-order cancels, exits and bucket settlement are the
+# Engine's own methods running against a simulated clock. Only market access
+# is replaced: entry inputs come from arrays precomputed for the whole history
+# (bot.backtest.signals), fills come from the bars, and nothing is logged,
+# published, written to disk or recorded in the process's metrics and traces.
+
+
+class MemoryLedger(BucketsLedger):
+    """Cash buckets kept in memory only."""
+
+    def __init__(self, total: float):
+        self.path = ""
+        half = round(total / 2.0, 2)
+        self.buckets = [
+            {"name": "A", "settled_cash": half, "unsettled": []},
+            {"name": "B", "settled_cash": half, "unsettled": []},
+        ]
+
+    def load(self):
+        pass
+
+    def save(self):
+        pass
+
+    def _commit(self, rec: Dict[str, Any]):
+        pass
+
+
+class NullAuditor(Auditor):
+    def __init__(self):
+        super().__init__(path="")
+
+    def log(self, event: str, payload: Dict[str, Any]):
+        pass
+
+
+@dataclass
+class Trade:
+    symbol: str
+    opened_at: str
+    closed_at: str
+    entry_price: float
+    exit_price: float
+    qty: int
+    reason: str
+    realized: float
+
+
+@dataclass
+class BacktestResult:
+    trades: List[Trade]
+    start_equity: float
+    end_equity: float
+    days: int
+    bars: int
+    settings: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        pnl = np.array([t.realized for t in self.trades], dtype=np.float64)
+        curve = np.cumsum(pnl) if len(pnl) else np.zeros(1)
+        drawdown = float((np.maximum.accumulate(np.concatenate([[0.0], curve])) - np.concatenate([[0.0], curve])).max())
+        return {
+            "trades": int(len(pnl)),
+            "wins": int((pnl > 0).sum()),
+            "win_rate": round(float((pnl > 0).mean()), 4) if len(pnl) else 0.0,
+            "realized_usd": round(float(pnl.sum()), 2),
+            "avg_trade_usd": round(float(pnl.mean()), 2) if len(pnl) else 0.0,
+            "max_drawdown_usd": round(drawdown, 2),
+            "return_pct": round((self.end_equity / self.start_equity - 1.0) * 100.0, 3) if self.start_equity else 0.0,
+            "days": self.days,
+            "bars": self.bars,
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([dataclasses.asdict(t) for t in self.trades], columns=[f.name for f in dataclasses.fields(Trade)])
+
+
+@dataclass
+class _Atr:
+    atr: float
+
+
+class _Snapshot:
+    """Stands in for MarketSnapshot inside Engine._manage_position."""
+
+    def __init__(self, bt: "BacktestEngine"):
+        self.bt = bt
+
+    def atr(self, symbol: str) -> float:
+        return float(self.bt.atr[symbol][self.bt.row[symbol]])
+
+
+class BacktestEngine(Engine):
+    def __init__(self, data: Mapping[str, SymbolSeries], start_equity: float):
+        super().__init__(ledger=MemoryLedger(start_equity), aud=NullAuditor(), refresh_earnings=False)
+        self.data = dict(data)
+        self.atr = {s: atr_series(series, settings.atr_len, settings.atr_mode) for s, series in self.data.items()}
+        self.signals = {s: entry_signals(series, settings) for s, series in self.data.items()}
+        self.equity = start_equity
+        self.row: Dict[str, int] = {}  # symbol -> index of the bar closing at the current minute
+        self.trades: List[Trade] = []
+        self._snap = _Snapshot(self)
+
+    # --- market access, replaced ---
+
+    def refresh_mode(self):
+        self.mode = "margin" if self.equity >= 25000 else "cash"
+        if self.daily_start_equity == 0.0:
+            self.daily_start_equity = self.equity
+
+    def _publish(self, message: str):
+        pass
+
+    def _fetch_candidate_bars(self, symbols: List[str]) -> Dict[str, List[Dict]]:
+        # scan_and_enter only checks that bars exist; the values come from _evaluate_entry
+        return {s: [{}] for s in symbols if s in self.row}
+
+    def _evaluate_entry(self, symbol: str, bars: List[Dict]):
+        s, i, sig = self.data[symbol], self.row[symbol], self.signals[symbol]
+        info: Dict[str, Any] = {k: bool(sig.flags[k][i]) for k in ENTRY_FLAGS}
+        info["price"] = float(s.close[i])
+        info["signal_bar_high"] = float(s.high[i])
+        ev = EntryEval(
+            info=info,
+            qualifies=bool(sig.qualifies[i]),
+            confirmed=bool(sig.confirmed[i]),
+            rvol=float(s.rvol[i]),
+            spread_pct=float(s.spread[i]),
+        )
+        return ev, _Atr(float(self.atr[symbol][i]))
+
+    def _promote_filled_orders(self):
+        for symbol, po in list(self.pending_orders.items()):
+            i = self.row.get(symbol)
+            if i is None or alpaca_adapter.now_et() <= po["placed_at"]:
+                continue
+            s, price = self.data[symbol], po["entry_price"]
+            if settings.entry_order_type == "buy_stop":
+                if s.high[i] < price:
+                    continue
+                fill = max(float(s.open[i]), price)
+            else:
+                if s.low[i] > price:
+                    continue
+                fill = min(float(s.open[i]), price)
+            with self._mutating():
+                self.positions.append(PositionState(
+                    symbol=symbol,
+                    entry_price=fill,
+                    target_price=po["target"],
+                    qty=po["qty"],
+                    opened_at=alpaca_adapter.now_et().isoformat(),
+                    bucket=po.get("bucket"),
+                ))
+                del self.pending_orders[symbol]
+
+    def reconcile_positions(self):
+        self._promote_filled_orders()
+        for ps in list(self.positions):
+            i = self.row.get(ps.symbol)
+            if i is None or ps.opened_at == alpaca_adapter.now_et().isoformat():
+                continue
+            s = self.data[ps.symbol]
+            # The take-profit leg rests at the broker, so it fills on any touch within the bar
+            if not friday_flatten_due() and s.high[i] >= ps.target_price:
+                self._close_position(ps, ps.target_price, "target_hit")
+                continue
+            self._manage_position(ps, float(s.close[i]), self._snap)
+
+    def _close_position(self, ps: PositionState, exit_price: float, reason: str):
+        if reason == "friday_flatten":
+            # The live engine books the flatten at the target; a replay has the real close
+            exit_price = float(self.data[ps.symbol].close[self.row[ps.symbol]])
+        super()._close_position(ps, exit_price, reason)
+        realized = (exit_price - ps.entry_price) * ps.qty
+        self.equity += realized
+        self.trades.append(Trade(
+            symbol=ps.symbol,
+            opened_at=ps.opened_at,
+            closed_at=alpaca_adapter.now_et().isoformat(),
+            entry_price=ps.entry_price,
+            exit_price=exit_price,
+            qty=ps.qty,
+            reason=reason,
+            realized=realized,
+        ))
+
+    def new_session(self):
+        """Daily caps are per day; the live engine gets this from a restart."""
+        self.daily_realized_usd = 0.0
+        self.daily_start_equity = self.equity
+
+
+@contextmanager
+def use_settings(cfg: Settings, **overrides) -> Iterator[Settings]:
+    """
+    Temporarily load `cfg` (plus overrides) into the global settings object the
+    engine reads, restoring the original values afterwards.
+    """
+    saved = dict(vars(settings))
+    vars(settings).update(vars(cfg))
+    vars(settings).update(overrides)
+    try:
+        yield settings
+    finally:
+        vars(settings).clear()
+        vars(settings).update(saved)
+
+
+@contextmanager
+def simulated_clock() -> Iterator[List[datetime]]:
+    """now_et() returns cell[0] until the block exits."""
+    cell = [datetime.now(TZ_ET)]
+    alpaca_adapter.set_clock(lambda: cell[0])
+    try:
+        yield cell
+    finally:
+        alpaca_adapter.set_clock(None)
+
+
+def prepare(bars_by_symbol: Mapping[str, Union[List[Dict[str, Any]], BarArrays]]) -> Dict[str, SymbolSeries]:
+    return {sym: prepare_symbol(sym, bars) for sym, bars in bars_by_symbol.items() if len(bars)}
+
+
+def run_backtest(
+    data: Mapping[str, Union[SymbolSeries, List[Dict[str, Any]], BarArrays]],
+    cfg: Optional[Settings] = None,
+    start_equity: Optional[float] = None,
+    **overrides,
+) -> BacktestResult:
+    """
+    Replay minute bars through Engine under `cfg` (default: current settings)
+    with any field overrides, e.g. run_backtest(bars, target_pct=0.004).
+    """
+    series = {s: d if isinstance(d, SymbolSeries) else prepare_symbol(s, d) for s, d in data.items() if len(d)}
+    cfg = dataclasses.replace(cfg or settings, **overrides)
+    start_equity = cfg.bucket_init_total_usd if start_equity is None else start_equity
+    symbols = list(series)
+    priority = [s for s in cfg.symbol_priority if s in series] + [s for s in symbols if s not in cfg.symbol_priority]
+
+    with use_settings(cfg, dry_run=True, symbol_priority=priority, batch_scan_min_symbols=1 << 30), simulated_clock() as clock, metrics.muted(), tracing.detached():
+        bt = BacktestEngine(series, start_equity)
+
+        # One shared minute grid; rows[k] maps each symbol to its bar at grid[k] (-1 if none)
+        grid = np.unique(np.concatenate([series[s].t for s in symbols])) if symbols else np.empty(0, np.int64)
+        rows = np.full((len(symbols), len(grid)), -1, dtype=np.int64)
+        go_by_sym = np.zeros((len(symbols), len(grid)), dtype=bool)
+        for j, s in enumerate(symbols):
+            at = np.searchsorted(grid, series[s].t)
+            rows[j, at] = np.arange(len(series[s]))
+            go_by_sym[j, at] = bt.signals[s].go
+        go = go_by_sym.any(axis=0)
+        grid_day = np.zeros(len(grid), dtype=np.int64)
+        for j, s in enumerate(symbols):
+            present = rows[j] >= 0
+            grid_day[present] = series[s].day[rows[j][present]]
+
+        day = None
+        for k in range(len(grid)):
+            if not (go[k] or bt.positions or bt.pending_orders):
+                continue
+            if grid_day[k] != day:
+                day = grid_day[k]
+                bt.new_session()
+            # Decisions on a bar happen once it has closed
+            clock[0] = datetime.fromtimestamp(grid[k] / 1e9 + 60.0, TZ_ET)
+            bt.row = {s: int(rows[j, k]) for j, s in enumerate(symbols) if rows[j, k] >= 0}
+            bt.cancel_stale_entries()
+            bt.reconcile_positions()
+            if go[k]:
+                bt.scan_and_enter(symbols=[s for j, s in enumerate(symbols) if go_by_sym[j, k]])
+
+        for ps in list(bt.positions):
+            s = series[ps.symbol]
+            bt.row = {ps.symbol: len(s) - 1}
+            clock[0] = datetime.fromtimestamp(s.t[-1] / 1e9 + 60.0, TZ_ET)
+            bt._close_position(ps, float(s.close[-1]), "end_of_data")
+
+        return BacktestResult(
+            trades=bt.trades,
+            start_equity=start_equity,
+            end_equity=bt.equity,
+            days=int(len(np.unique(grid_day))),
+            bars=int(sum(len(s) for s in series.values())),
+            settings={k: getattr(cfg, k) for k in overrides},
+        )
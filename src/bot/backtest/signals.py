@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import pandas as pd
+from zoneinfo import ZoneInfo
+
+from bot.config.settings import Settings, settings
+from bot.strategy.fast_rules import BarArrays, bars_to_arrays
+
+TZ_ET = ZoneInfo("America/New_York")
+NS_PER_DAY = 86_400_000_000_000
+OPEN_MINUTE = 9 * 60 + 30   # opening range is 09:30-09:45 ET, as in Engine
+OR_MINUTES = 15
+
+# Per-bar versions of the live entry inputs over a symbol's whole history.
+# Every value at index i is what the engine would see evaluating bar i with
+# bars[:i+1] in hand: EMAs carried from the first bar (like IndicatorState),
+# VWAP and the opening range restarting each ET session.
+
+
+@dataclass
+class SymbolSeries:
+    """
+    Settings-independent arrays for one symbol, one entry per minute bar.
+    """
+    symbol: str
+    t: np.ndarray       # int64 ns since epoch, UTC bar start
+    day: np.ndarray     # ET session as days since epoch
+    minute: np.ndarray  # ET minute of day
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    ema20: np.ndarray
+    ema50: np.ndarray
+    vwap: np.ndarray
+    orh: np.ndarray
+    tr: np.ndarray
+    rvol: np.ndarray
+    spread: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+
+ARRAY_FIELDS = ("t", "day", "minute", "open", "high", "low", "close", "volume",
+                "ema20", "ema50", "vwap", "orh", "tr", "rvol", "spread")
+
+
+def _rolling(x: np.ndarray, window: int, how: str) -> np.ndarray:
+    r = pd.Series(x).rolling(window, min_periods=1)
+    return getattr(r, how)().to_numpy()
+
+
+def prepare_symbol(symbol: str, bars: Union[List[Dict[str, Any]], BarArrays]) -> SymbolSeries:
+    a = bars if isinstance(bars, BarArrays) else bars_to_arrays(bars)
+    t = a.t.astype("datetime64[ns]").astype(np.int64)
+    et = pd.DatetimeIndex(a.t).tz_localize("UTC").tz_convert(TZ_ET)
+    day = et.tz_localize(None).normalize().asi8 // NS_PER_DAY
+    minute = np.asarray(et.hour * 60 + et.minute, dtype=np.int64)
+    high, low, close, volume = a.high, a.low, a.close, a.volume
+
+    c = pd.Series(close)
+    ema20 = c.ewm(span=20, adjust=False).mean().to_numpy()
+    ema50 = c.ewm(span=50, adjust=False).mean().to_numpy()
+
+    by_day = pd.Series(day)
+    tp = (high + low + close) / 3.0
+    cum_vp = pd.Series(tp * volume).groupby(by_day).cumsum().to_numpy()
+    cum_vol = pd.Series(volume).groupby(by_day).cumsum().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vwap = np.where(cum_vol == 0, np.nan, cum_vp / cum_vol)
+
+    in_or = (minute >= OPEN_MINUTE) & (minute < OPEN_MINUTE + OR_MINUTES)
+    orh = pd.Series(np.where(in_or, high, -np.inf)).groupby(by_day).cummax().to_numpy(copy=True)
+    orh[np.isneginf(orh)] = np.nan
+
+    prev_close = np.concatenate([[np.nan], close[:-1]])
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+    count = np.minimum(np.arange(1, len(volume) + 1), 50)
+    prior = _rolling(volume, 50, "sum") - volume
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = prior / np.maximum(count - 1, 1)
+        rvol = np.where((count >= 5) & (avg > 0), volume / avg, 1.0)
+        spread = np.where(close > 0, np.abs(high - low) / np.maximum(1e-6, close), 0.0)
+
+    return SymbolSeries(
+        symbol=symbol, t=t, day=day, minute=minute,
+        open=a.open, high=high, low=low, close=close, volume=volume,
+        ema20=ema20, ema50=ema50, vwap=vwap, orh=orh, tr=tr, rvol=rvol, spread=spread,
+    )
+
+
+def atr_series(s: SymbolSeries, length: int, mode: str = "sma") -> np.ndarray:
+    """ATR at every bar; 0.0 until IndicatorState would report one."""
+    n = len(s)
+    out = np.zeros(n)
+    if n < max(3, length):
+        return out
+    if mode == "wilder":
+        seed = s.tr[:length].mean()
+        out[length - 1:] = pd.Series(np.concatenate([[seed], s.tr[length:]])).ewm(alpha=1.0 / length, adjust=False).mean().to_numpy()
+    else:
+        out = pd.Series(s.tr).rolling(length, min_periods=length).mean().fillna(0.0).to_numpy(copy=True)
+    out[: max(3, length) - 1] = 0.0
+    return out
+
+
+@dataclass
+class EntrySignals:
+    flags: Dict[str, np.ndarray]
+    qualifies: np.ndarray
+    confirmed: np.ndarray
+    guard_ok: np.ndarray
+
+    @property
+    def go(self) -> np.ndarray:
+        """Bars on which the engine would place an entry (cooldowns/windows aside)."""
+        return self.confirmed & self.guard_ok
+
+
+def entry_signals(s: SymbolSeries, cfg: Settings = settings) -> EntrySignals:
+    close, low, vwap = s.close, s.low, s.vwap
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v = np.where(vwap == 0, np.nan, vwap)
+        dist = np.abs(np.abs(low - v) / v)
+        touched = (_rolling((low <= vwap).astype(np.float64), 3, "max") > 0) | (
+            _rolling(dist, 3, "min") <= cfg.vwap_touch_tolerance_pct
+        )
+        flags = {
+            "uptrend": s.ema20 > s.ema50,
+            "above_vwap": close > vwap,
+            "above_orh": close > s.orh,
+            "touched_vwap_recently": touched,
+            "close_back_above": close > vwap,
+            "not_extended": (close - vwap) / v <= cfg.vwap_extension_max_pct,
+        }
+    qualifies = np.logical_and.reduce(list(flags.values()))
+
+    confirmed = qualifies.copy()
+    if cfg.confirm_higher_low:
+        prev1 = np.concatenate([[np.nan], low[:-1]])
+        prev2 = np.concatenate([[np.nan, np.nan], low[:-2]])
+        hl = (low > prev1) & (np.fmin(prev2, prev1) <= prev1)
+        hl[:3] = False
+        confirmed &= hl
+    if cfg.confirm_vwap_reclaim:
+        confirmed &= close > vwap
+    if cfg.require_vwap_retest:
+        held = ((close > vwap) & (low >= vwap)).astype(np.float64)
+        confirmed &= _rolling(held, max(cfg.vwap_retest_lookback, 2), "max") > 0
+
+    guard_ok = (s.rvol >= cfg.rvol_min) & (s.spread <= cfg.spread_max_pct)
+    return EntrySignals(flags=flags, qualifies=qualifies, confirmed=confirmed, guard_ok=guard_ok)
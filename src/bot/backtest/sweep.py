@@ -0,0 +1,154 @@
+import csv
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+from bot.backtest.engine import run_backtest
+from bot.backtest.signals import ARRAY_FIELDS, SymbolSeries, prepare_symbol
+from bot.config.settings import Settings, settings
+
+logger = logging.getLogger("limitless.sweep")
+
+# Each symbol's precomputed arrays are copied once into a shared memory block;
+# workers map them read-only instead of unpickling or recomputing them per run.
+
+RESULT_COLUMNS = ["trades", "wins", "win_rate", "realized_usd", "avg_trade_usd", "max_drawdown_usd", "return_pct", "days", "bars", "error"]
+
+# symbol -> (block name, rows, [(field, dtype, byte offset)])
+Layout = Dict[str, Tuple[str, int, List[Tuple[str, str, int]]]]
+
+
+def grid(**params: Sequence[Any]) -> List[Dict[str, Any]]:
+    """Every combination: grid(target_pct=[0.003, 0.004], mae_k_atr=[1.0, 1.2])."""
+    keys = list(params)
+    return [dict(zip(keys, values)) for values in itertools.product(*(params[k] for k in keys))]
+
+
+def random_sample(space: Mapping[str, Union[Sequence[Any], Tuple[float, float]]], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    `n` random combinations. A (lo, hi) tuple draws uniformly (integers if both
+    ends are ints); a list picks one of its values.
+    """
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        combo = {}
+        for k, spec in space.items():
+            if isinstance(spec, tuple):
+                lo, hi = spec
+                combo[k] = rnd.randint(lo, hi) if isinstance(lo, int) and isinstance(hi, int) else rnd.uniform(lo, hi)
+            else:
+                combo[k] = rnd.choice(list(spec))
+        out.append(combo)
+    return out
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Pool workers share the parent's resource tracker, and the parent unlinks
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def share_series(series: Mapping[str, SymbolSeries]) -> Tuple[Layout, List[shared_memory.SharedMemory]]:
+    layout: Layout = {}
+    blocks = []
+    for sym, s in series.items():
+        arrays = [(f, np.ascontiguousarray(getattr(s, f))) for f in ARRAY_FIELDS]
+        size = sum(a.nbytes for _, a in arrays)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        fields, offset = [], 0
+        for f, a in arrays:
+            np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf, offset=offset)[:] = a
+            fields.append((f, a.dtype.str, offset))
+            offset += a.nbytes
+        layout[sym] = (shm.name, len(s), fields)
+        blocks.append(shm)
+    return layout, blocks
+
+
+def attach_series(layout: Layout) -> Tuple[Dict[str, SymbolSeries], List[shared_memory.SharedMemory]]:
+    series, blocks = {}, []
+    for sym, (name, n, fields) in layout.items():
+        shm = _attach(name)
+        blocks.append(shm)
+        arrays = {}
+        for f, dtype, offset in fields:
+            a = np.ndarray((n,), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            a.flags.writeable = False
+            arrays[f] = a
+        series[sym] = SymbolSeries(symbol=sym, **arrays)
+    return series, blocks
+
+
+# Worker process state, set once by _init_worker
+_series: Dict[str, SymbolSeries] = {}
+_blocks: List[shared_memory.SharedMemory] = []
+_base: Optional[Settings] = None
+
+
+def _init_worker(layout: Layout, base: Settings):
+    global _series, _blocks, _base
+    _series, _blocks = attach_series(layout)
+    _base = base
+
+
+def _run_one(run: int, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        summary = run_backtest(_series, cfg=_base, **overrides).summary()
+        return {"run": run, **overrides, **summary, "error": ""}
+    except Exception as e:
+        return {"run": run, **overrides, "error": f"{type(e).__name__}: {e}"}
+
+
+def run_sweep(
+    data: Mapping[str, Any],
+    combos: Iterable[Dict[str, Any]],
+    out_path: Optional[str] = "sweep_results.csv",
+    workers: Optional[int] = None,
+    cfg: Optional[Settings] = None,
+) -> pd.DataFrame:
+    """
+    Backtest every override dict in `combos` across a process pool. `data` is
+    bars or SymbolSeries per symbol. Rows are appended to `out_path` (CSV) as
+    runs finish, so a long sweep keeps its results if interrupted.
+    """
+    combos = list(combos)
+    series = {s: d if isinstance(d, SymbolSeries) else prepare_symbol(s, d) for s, d in data.items() if len(d)}
+    columns = ["run"] + list(dict.fromkeys(k for c in combos for k in c)) + RESULT_COLUMNS
+    layout, blocks = share_series(series)
+    rows: List[Dict[str, Any]] = []
+    writer, fh = None, None
+    try:
+        if out_path:
+            fh = open(out_path, "w", newline="", encoding="utf-8")
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(layout, cfg or settings)) as pool:
+            futures = [pool.submit(_run_one, i, c) for i, c in enumerate(combos)]
+            for n, fut in enumerate(as_completed(futures), 1):
+                row = fut.result()
+                rows.append(row)
+                if row["error"]:
+                    logger.warning("Sweep run failed %s", row)
+                if fh is not None:
+                    if writer is None:
+                        writer = csv.DictWriter(fh, fieldnames=columns, extrasaction="ignore")
+                        writer.writeheader()
+                    writer.writerow(row)
+                    if n % 50 == 0:
+                        fh.flush()
+                        logger.info("Sweep %d/%d", n, len(combos))
+    finally:
+        if fh is not None:
+            fh.close()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return pd.DataFrame(rows, columns=columns).sort_values("run").reset_index(drop=True)
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+import logging
+
+from bot.broker import alpaca_adapter, alpaca_async
+from bot.broker.alpaca_adapter import AccountInfo
+from bot.config.settings import settings
+
+logger = logging.getLogger("limitless.account")
+
+
+class AccountSnapshot:
+    """
+    One cached /v2/account result shared by the engine thread and the API's
+    event loop. A value younger than `ttl` seconds is served from memory;
+    otherwise the first caller fetches and every concurrent caller, sync or
+    async, waits on that same request (single-flight). invalidate() marks the
+    value stale after order activity so the next read refetches.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.account_ttl_sec,
+        fetch: Optional[Callable[[], AccountInfo]] = None,
+        afetch: Optional[Callable[[], Awaitable[AccountInfo]]] = None,
+    ):
+        self.ttl = ttl
+        self._fetch = fetch
+        self._afetch = afetch
+        self._lock = threading.Lock()
+        self._value: Optional[AccountInfo] = None
+        self._fetched_at = 0.0  # monotonic; 0 = stale
+        self._gen = 0  # bumped by invalidate() so an in-flight result isn't treated as fresh
+        self._inflight: Optional[Future] = None
+        self.fetches = 0
+        self.hits = 0
+
+    def _fresh(self, max_age: Optional[float]) -> bool:
+        age = self.ttl if max_age is None else max_age
+        return self._value is not None and self._fetched_at > 0 and time.monotonic() - self._fetched_at < age
+
+    def _claim(self, max_age: Optional[float]):
+        """
+        (value, None, gen) when the cache is fresh, else (None, future, gen)
+        where gen is None unless this caller must fetch and resolve the future.
+        """
+        with self._lock:
+            if self._fresh(max_age):
+                self.hits += 1
+                return self._value, None, None
+            if self._inflight is not None:
+                return None, self._inflight, None
+            self._inflight = Future()
+            self.fetches += 1
+            return None, self._inflight, self._gen
+
+    def _settle(self, fut: Future, gen: int, value: Optional[AccountInfo] = None, error: Optional[BaseException] = None):
+        with self._lock:
+            if error is None:
+                self._value = value
+                self._fetched_at = time.monotonic() if gen == self._gen else 0.0
+            self._inflight = None
+        if error is None:
+            fut.set_result(value)
+        else:
+            fut.set_exception(error)
+
+    def get(self, max_age: Optional[float] = None) -> AccountInfo:
+        value, fut, gen = self._claim(max_age)
+        if fut is None:
+            return value
+        if gen is None:
+            # No timeout: the owner's request may retry through a 429/5xx storm,
+            # and it always settles the future, even when it fails
+            return fut.result()
+        try:
+            value = (self._fetch or alpaca_adapter.get_account)()
+        except BaseException as e:  # waiters must not hang if the owner is cancelled
+            self._settle(fut, gen, error=e)
+            raise
+        self._settle(fut, gen, value)
+        return value
+
+    async def aget(self, max_age: Optional[float] = None) -> AccountInfo:
+        value, fut, gen = self._claim(max_age)
+        if fut is None:
+            return value
+        if gen is None:
+            return await asyncio.wrap_future(fut)
+        try:
+            value = await (self._afetch or alpaca_async.get_account)()
+        except BaseException as e:  # waiters must not hang if the owner is cancelled
+            self._settle(fut, gen, error=e)
+            raise
+        self._settle(fut, gen, value)
+        return value
+
+    def peek(self) -> Optional[AccountInfo]:
+        """Last fetched value, however old (None before the first fetch)."""
+        return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._gen += 1
+            self._fetched_at = 0.0
+
+    def stats(self) -> dict:
+        age = time.monotonic() - self._fetched_at if self._fetched_at else None
+        return {"fetches": self.fetches, "hits": self.hits, "age_sec": round(age, 3) if age is not None else None, "ttl_sec": self.ttl}
+
+
+account = AccountSnapshot()
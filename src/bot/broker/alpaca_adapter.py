@@ -1,11 +1,19 @@
 import os
+import threading
+import time
 import requests
-from typing import Any, Dict, List, Optional
-from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
+from bot.broker.rate_limit import PRIORITY_DATA, PRIORITY_ORDER, limiter
 from bot.config.settings import settings
+from bot.logging import metrics, tracing
+from bot.storage.bar_store import bar_store
 
 import logging
 logger = logging.getLogger("limitless.alpaca")
@@ -33,18 +41,24 @@ _ALPACA_BASE = (
 # Market data REST base (if you use it); keep existing settings if present
 _ALPACA_DATA_BASE = getattr(settings, "alpaca_data_base", "https://data.alpaca.markets")
 
+# Bumped whenever creds/bases change so other clients (e.g. alpaca_async) can rebuild
+_creds_generation = 0
+
 def set_alpaca_creds(key_id: str, secret_key: str, base_url: str, data_base_url: Optional[str] = None):
     """
     Allow the server to switch between paper/live at runtime by setting REST creds/base.
     Optionally update the market data REST base if provided.
     """
-    global _ALPACA_KEY_ID, _ALPACA_SECRET_KEY, _ALPACA_BASE, _ALPACA_DATA_BASE
+    global _ALPACA_KEY_ID, _ALPACA_SECRET_KEY, _ALPACA_BASE, _ALPACA_DATA_BASE, _creds_generation
     _ALPACA_KEY_ID = (key_id or "").strip()
     _ALPACA_SECRET_KEY = (secret_key or "").strip()
     _ALPACA_BASE = (base_url or _ALPACA_BASE).strip() or _ALPACA_BASE
     if data_base_url:
         _ALPACA_DATA_BASE = data_base_url
 
+    _reset_session()
+    _creds_generation += 1
+
     # Debug: log masked key and base to verify creds are set
     masked = _ALPACA_KEY_ID[:6] + ("..." if _ALPACA_KEY_ID else "")
     logger.info("Alpaca REST creds set: key=%s base=%s", masked, _ALPACA_BASE)
@@ -56,6 +70,127 @@ def http_headers():
         "Content-Type": "application/json",
     }
 
+# --- Pooled HTTP session ---
+# One keep-alive session shared by every call (and the bar fetch pool), so
+# requests reuse warm TCP+TLS connections instead of handshaking each time.
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def _build_session() -> requests.Session:
+    s = requests.Session()
+    # No transport-level retries: _request() retries itself so every attempt
+    # goes through the rate limiter
+    adapter = HTTPAdapter(
+        pool_connections=settings.http_pool_connections,
+        pool_maxsize=settings.http_pool_maxsize,
+        max_retries=0,
+    )
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    s.headers.update(http_headers())
+    return s
+
+def _http() -> requests.Session:
+    global _session
+    sess = _session
+    if sess is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+            sess = _session
+    return sess
+
+def _reset_session():
+    """Drop pooled connections (e.g. after switching paper/live creds)."""
+    global _session
+    with _session_lock:
+        old, _session = _session, None
+    if old is not None:
+        old.close()
+
+def _priority_for(method: str, url: str) -> str:
+    if method in ("POST", "DELETE") and "/v2/orders" in url:
+        return PRIORITY_ORDER
+    return PRIORITY_DATA
+
+# Labelled by the adapter function that made the call (the caller of _request)
+# and the HTTP status, or "error" when no response came back
+REQUEST_SECONDS = metrics.histogram(
+    "alpaca_request_seconds", "Alpaca REST call latency (including retries, excluding rate limiter waits)", ("client", "fn", "status")
+)
+
+# Only idempotent calls are retried; order placement (POST) never is
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+_RETRY_METHODS = ("GET", "DELETE")
+
+def _retry_delay(resp, attempt: int) -> float:
+    """Seconds before retry `attempt`: the response's Retry-After if present, else exponential backoff."""
+    if resp is not None:
+        ra = resp.headers.get("Retry-After")
+        if ra:
+            try:
+                return max(0.0, float(ra))
+            except ValueError:
+                pass
+    return 0.3 * (2 ** attempt)
+
+def _request(method: str, url: str, op: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", settings.http_timeout_sec)
+    retries = settings.http_retries if method in _RETRY_METHODS else 0
+    priority = _priority_for(method, url)
+    attempt = 0
+    waited = 0.0  # time spent in the rate limiter, left out of the latency metric
+    start = time.perf_counter()
+    status = "error"
+    with tracing.span(f"alpaca.{op}", method=method, path=urlsplit(url).path) as sp:
+        try:
+            while True:
+                t = time.perf_counter()
+                limiter.acquire(priority)  # every attempt spends a token
+                waited += time.perf_counter() - t
+                try:
+                    r = _http().request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt >= retries:
+                        raise
+                    time.sleep(_retry_delay(None, attempt))
+                    attempt += 1
+                    continue
+                if r.status_code == 429:
+                    limiter.note_throttled()
+                if r.status_code in _RETRY_STATUSES and attempt < retries:
+                    r.close()
+                    time.sleep(_retry_delay(r, attempt))
+                    attempt += 1
+                    continue
+                status = r.status_code
+                return r
+        finally:
+            REQUEST_SECONDS.labels("sync", op, status).observe(time.perf_counter() - start - waited)
+            if sp is not None:
+                sp.set(status=status, attempts=attempt + 1)
+
+def prewarm_connections():
+    """
+    Open pooled connections to the trading and market data hosts ahead of a
+    trading window, so the first bar fetch / order doesn't pay for a cold handshake.
+    """
+    if not _ALPACA_KEY_ID or not _ALPACA_SECRET_KEY:
+        return
+    calls = [("GET", f"{_ALPACA_BASE}/v2/clock", {})]
+    data_conns = max(1, min(settings.http_pool_maxsize, settings.bars_fetch_workers))
+    calls += [("GET", f"{_ALPACA_DATA_BASE}/v2/stocks/trades/latest", {"params": {"symbols": "SPY", "feed": _select_feed()}})] * data_conns
+    # Issue concurrently so the pool actually holds several open connections
+    futures = [tracing.submit(_get_bars_pool(), _request, m, url, "prewarm_connections", **kw) for m, url, kw in calls]
+    ok = 0
+    for fut in futures:
+        try:
+            fut.result()
+            ok += 1
+        except Exception as e:
+            logger.debug("Connection pre-warm request failed: %s", e)
+    logger.info("Pre-warmed %d/%d Alpaca connections", ok, len(futures))
+
 @dataclass
 class AccountInfo:
     equity: float
@@ -69,18 +204,23 @@ def _assert_creds():
 def get_account() -> AccountInfo:
     _assert_creds()
     url = f"{_ALPACA_BASE}/v2/account"
-    r = requests.get(url, headers=http_headers(), timeout=10)
+    r = _request("GET", url, "get_account")
     if r.status_code == 401:
-        masked = _ALPACA_KEY_ID[:6] + ("..." if _ALPACA_KEY_ID else "")
-        logger.error("Alpaca 401 Unauthorized calling %s (key=%s base=%s)", url, masked, _ALPACA_BASE)
+        _log_unauthorized(url)
     r.raise_for_status()
-    data = r.json()
+    return _account_from_json(r.json())
+
+def _account_from_json(data: Dict[str, Any]) -> AccountInfo:
     return AccountInfo(
         equity=float(data.get("equity", 0)),
         buying_power=float(data.get("buying_power", 0)),
         is_paper=bool(data.get("paper", True)),
     )
 
+def _log_unauthorized(url: str):
+    masked = _ALPACA_KEY_ID[:6] + ("..." if _ALPACA_KEY_ID else "")
+    logger.error("Alpaca 401 Unauthorized calling %s (key=%s base=%s)", url, masked, _ALPACA_BASE)
+
 def _select_feed() -> str:
     """
     Choose data feed for REST endpoints.
@@ -92,33 +232,143 @@ def _select_feed() -> str:
         return feed.lower()
     return "iex" if "paper-api" in _ALPACA_BASE else "sip"
 
-def get_bars(symbol: str, limit: int = 300) -> List[Dict[str, Any]]:
+def get_bars(symbol: str, limit: int = 300, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch 1-minute bars. If `start` (RFC3339) is given, only bars at or after it
+    (and at or before `end`) are returned, and completed days are read through
+    the local bar store.
+    """
+    if start and settings.bar_store_read_through:
+        return bar_store.read_through(symbol, limit, start, end, now_et().date(), _fetch_bars)
+    return _fetch_bars(symbol, limit, start, end)
+
+def _fetch_bars(symbol: str, limit: int, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
     _assert_creds()
     url = f"{_ALPACA_DATA_BASE}/v2/stocks/{symbol}/bars"
-    feed = _select_feed()
+    r = _request("GET", url, "get_bars", params=_bars_params(limit, start, end))
+    r.raise_for_status()
+    js = r.json().get("bars", [])
+    return js
+
+def get_bars_page(
+    symbol: str, start: str, end: Optional[str] = None, page_token: Optional[str] = None, limit: int = 10000,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of 1-minute bars for a date range, plus the token for the next
+    page (None on the last one). Always goes to the network.
+    """
+    _assert_creds()
+    url = f"{_ALPACA_DATA_BASE}/v2/stocks/{symbol}/bars"
+    params = _bars_params(limit, start, end)
+    if page_token:
+        params["page_token"] = page_token
+    r = _request("GET", url, "get_bars_page", params=params)
+    r.raise_for_status()
+    js = r.json()
+    return js.get("bars") or [], js.get("next_page_token")
+
+def _bars_params(limit: int, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
     params = {
         "timeframe": "1Min",
         "limit": limit,
         "adjustment": "raw",
-        "feed": feed,
+        "feed": _select_feed(),
     }
-    r = requests.get(url, headers=http_headers(), params=params, timeout=10)
-    r.raise_for_status()
-    js = r.json().get("bars", [])
-    return js
+    if start:
+        params["start"] = start
+    if end:
+        params["end"] = end
+    return params
+
+@dataclass
+class BarsBatch:
+    bars: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    latency_ms: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+_bars_pool: Optional[ThreadPoolExecutor] = None
+
+def _get_bars_pool() -> ThreadPoolExecutor:
+    global _bars_pool
+    if _bars_pool is None:
+        workers = max(1, int(getattr(settings, "bars_fetch_workers", 8)))
+        _bars_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bars")
+    return _bars_pool
+
+def _timed_get_bars(fetch: Callable[..., List[Dict[str, Any]]], symbol: str, limit: int):
+    t0 = time.perf_counter()
+    with tracing.span("bars", symbol=symbol) as sp:
+        try:
+            bars, err = fetch(symbol, limit=limit), None
+        except Exception as e:
+            bars, err = [], str(e)
+        if sp is not None:
+            sp.set(bars=len(bars), last_bar=bars[-1].get("t") if bars else None)
+            if err:
+                sp.error = err
+    return bars, err, (time.perf_counter() - t0) * 1000.0
+
+def get_bars_batch(
+    symbols: Iterable[str],
+    limit: int = 300,
+    fetch: Optional[Callable[..., List[Dict[str, Any]]]] = None,
+) -> BarsBatch:
+    """
+    Fetch bars for several symbols concurrently over a bounded thread pool.
+    Blocks until every symbol has returned (or failed); a failing symbol gets
+    an empty bar list and its error recorded instead of aborting the batch.
+    `fetch` defaults to get_bars; pass a cache's getter to read through it.
+    """
+    batch = BarsBatch()
+    syms = list(dict.fromkeys(symbols))
+    if not syms:
+        return batch
+    _assert_creds()
+    pool = _get_bars_pool()
+    futures = {sym: tracing.submit(pool, _timed_get_bars, fetch or get_bars, sym, limit) for sym in syms}
+    for sym, fut in futures.items():
+        bars, err, ms = fut.result()
+        batch.bars[sym] = bars
+        batch.latency_ms[sym] = ms
+        if err:
+            batch.errors[sym] = err
+    return batch
 
 def latest_trade_price(symbol: str) -> Optional[float]:
     _assert_creds()
     url = f"{_ALPACA_DATA_BASE}/v2/stocks/{symbol}/trades/latest"
     feed = _select_feed()
     params = {"feed": feed}
-    r = requests.get(url, headers=http_headers(), params=params, timeout=10)
+    r = _request("GET", url, "latest_trade_price", params=params)
     r.raise_for_status()
     p = r.json().get("trade", {}).get("p")
     return float(p) if p is not None else None
 
-def place_buy_stop(symbol: str, qty: int, stop_price: float, tp_limit: float) -> Dict[str, Any]:
-    payload = {
+def latest_trade_prices(symbols: Iterable[str]) -> Dict[str, float]:
+    """
+    Latest trade price for several symbols in one request. Symbols without a
+    trade are omitted from the result.
+    """
+    syms = list(dict.fromkeys(symbols))
+    if not syms:
+        return {}
+    _assert_creds()
+    url = f"{_ALPACA_DATA_BASE}/v2/stocks/trades/latest"
+    params = {"symbols": ",".join(syms), "feed": _select_feed()}
+    r = _request("GET", url, "latest_trade_prices", params=params)
+    r.raise_for_status()
+    return _prices_from_latest_trades(r.json())
+
+def _prices_from_latest_trades(js: Dict[str, Any]) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for sym, trade in (js.get("trades") or {}).items():
+        p = (trade or {}).get("p")
+        if p is not None:
+            out[sym] = float(p)
+    return out
+
+def buy_stop_payload(symbol: str, qty: int, stop_price: float, tp_limit: float) -> Dict[str, Any]:
+    return {
         "symbol": symbol,
         "side": "buy",
         "type": "stop_limit",
@@ -130,16 +380,19 @@ def place_buy_stop(symbol: str, qty: int, stop_price: float, tp_limit: float) ->
         "take_profit": {"limit_price": f"{tp_limit:.2f}"},
         # No stop_loss per spec
     }
+
+def place_buy_stop(symbol: str, qty: int, stop_price: float, tp_limit: float) -> Dict[str, Any]:
+    payload = buy_stop_payload(symbol, qty, stop_price, tp_limit)
     if getattr(settings, "dry_run", False):
         return {"id": "paper-order", "payload": payload}
     _assert_creds()
     url = f"{_ALPACA_BASE}/v2/orders"
-    r = requests.post(url, headers=http_headers(), json=payload, timeout=10)
+    r = _request("POST", url, "place_buy_stop", json=payload)
     r.raise_for_status()
     return r.json()
 
-def place_buy_limit(symbol: str, qty: int, limit_price: float, tp_limit: float) -> Dict[str, Any]:
-    payload = {
+def buy_limit_payload(symbol: str, qty: int, limit_price: float, tp_limit: float) -> Dict[str, Any]:
+    return {
         "symbol": symbol,
         "side": "buy",
         "type": "limit",
@@ -149,11 +402,14 @@ def place_buy_limit(symbol: str, qty: int, limit_price: float, tp_limit: float)
         "order_class": "bracket",
         "take_profit": {"limit_price": f"{tp_limit:.2f}"},
     }
+
+def place_buy_limit(symbol: str, qty: int, limit_price: float, tp_limit: float) -> Dict[str, Any]:
+    payload = buy_limit_payload(symbol, qty, limit_price, tp_limit)
     if getattr(settings, "dry_run", False):
         return {"id": "paper-order", "payload": payload}
     _assert_creds()
     url = f"{_ALPACA_BASE}/v2/orders"
-    r = requests.post(url, headers=http_headers(), json=payload, timeout=10)
+    r = _request("POST", url, "place_buy_limit", json=payload)
     r.raise_for_status()
     return r.json()
 
@@ -162,25 +418,42 @@ def cancel_order(order_id: str):
         return
     _assert_creds()
     url = f"{_ALPACA_BASE}/v2/orders/{order_id}"
-    r = requests.delete(url, headers=http_headers(), timeout=10)
+    r = _request("DELETE", url, "cancel_order")
     r.raise_for_status()
 
 def get_positions() -> List[Dict[str, Any]]:
     _assert_creds()
     url = f"{_ALPACA_BASE}/v2/positions"
-    r = requests.get(url, headers=http_headers(), timeout=10)
+    r = _request("GET", url, "get_positions")
     r.raise_for_status()
     return r.json()
 
 def get_open_orders(symbol: Optional[str] = None) -> List[Dict[str, Any]]:
     _assert_creds()
     url = f"{_ALPACA_BASE}/v2/orders"
+    r = _request("GET", url, "get_open_orders", params=_open_orders_params(symbol))
+    r.raise_for_status()
+    return r.json()
+
+def _open_orders_params(symbol: Optional[str]) -> Dict[str, Any]:
     params = {"status": "open"}
     if symbol:
         params["symbols"] = symbol
-    r = requests.get(url, headers=http_headers(), params=params, timeout=10)
-    r.raise_for_status()
-    return r.json()
+    return params
+
+_clock: Optional[Callable[[], datetime]] = None
+
+
+def set_clock(clock: Optional[Callable[[], datetime]]):
+    """
+    Replace the wall clock behind now_et() (e.g. with simulated time for a
+    backtest). Pass None to go back to real time.
+    """
+    global _clock
+    _clock = clock
+
 
 def now_et():
+    if _clock is not None:
+        return _clock()
     return datetime.now(timezone.utc).astimezone(TZ_ET)
\ No newline at end of file
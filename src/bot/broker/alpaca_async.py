@@ -0,0 +1,195 @@
+"""
+Async counterpart of alpaca_adapter for use on the server's event loop.
+
+Credentials, bases, feed selection, payloads and dry-run behaviour all come
+from alpaca_adapter, so set_alpaca_creds() switches both. Idempotent calls
+(GET/DELETE) retry on 429/5xx with the same policy as alpaca_adapter._request,
+taking a rate limiter token per attempt; order POSTs never retry.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+import logging
+
+import httpx
+
+from bot.broker import alpaca_adapter as sync
+from bot.broker.alpaca_adapter import (
+    REQUEST_SECONDS, _RETRY_METHODS, _RETRY_STATUSES, AccountInfo, BarsBatch, _account_from_json, _assert_creds,
+    _bars_params, _open_orders_params, _prices_from_latest_trades, _priority_for, _retry_delay, _select_feed,
+    buy_limit_payload, buy_stop_payload, http_headers,
+)
+from bot.broker.rate_limit import limiter
+from bot.config.settings import settings
+from bot.logging import tracing
+
+logger = logging.getLogger("limitless.alpaca_async")
+
+_client: Optional[httpx.AsyncClient] = None
+_client_generation = -1
+
+
+async def _http() -> httpx.AsyncClient:
+    """
+    Shared keep-alive client, rebuilt when set_alpaca_creds() changes creds/bases.
+    """
+    global _client, _client_generation
+    if _client is None or _client_generation != sync._creds_generation:
+        old = _client
+        _client = httpx.AsyncClient(
+            headers=http_headers(),
+            timeout=settings.http_timeout_sec,
+            limits=httpx.Limits(
+                max_connections=settings.http_pool_connections * settings.http_pool_maxsize,
+                max_keepalive_connections=settings.http_pool_maxsize,
+            ),
+        )
+        _client_generation = sync._creds_generation
+        if old is not None:
+            await old.aclose()
+    return _client
+
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _request(method: str, url: str, op: str, **kwargs) -> httpx.Response:
+    client = await _http()
+    retries = settings.http_retries if method in _RETRY_METHODS else 0
+    priority = _priority_for(method, url)
+    attempt = 0
+    waited = 0.0  # time spent in the rate limiter, left out of the latency metric
+    start = time.perf_counter()
+    status = "error"
+    with tracing.span(f"alpaca.{op}", method=method, path=urlsplit(url).path) as sp:
+        try:
+            while True:
+                t = time.perf_counter()
+                await limiter.acquire_async(priority)
+                waited += time.perf_counter() - t
+                try:
+                    r = await client.request(method, url, **kwargs)
+                except httpx.TransportError:
+                    if attempt >= retries:
+                        raise
+                    await asyncio.sleep(_retry_delay(None, attempt))
+                    attempt += 1
+                    continue
+                if r.status_code == 429:
+                    limiter.note_throttled()
+                if r.status_code in _RETRY_STATUSES and attempt < retries:
+                    await asyncio.sleep(_retry_delay(r, attempt))
+                    attempt += 1
+                    continue
+                status = r.status_code
+                return r
+        finally:
+            REQUEST_SECONDS.labels("async", op, status).observe(time.perf_counter() - start - waited)
+            if sp is not None:
+                sp.set(status=status, attempts=attempt + 1)
+
+
+async def get_account() -> AccountInfo:
+    _assert_creds()
+    url = f"{sync._ALPACA_BASE}/v2/account"
+    r = await _request("GET", url, "get_account")
+    if r.status_code == 401:
+        sync._log_unauthorized(url)
+    r.raise_for_status()
+    return _account_from_json(r.json())
+
+
+async def get_bars(symbol: str, limit: int = 300, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    _assert_creds()
+    url = f"{sync._ALPACA_DATA_BASE}/v2/stocks/{symbol}/bars"
+    r = await _request("GET", url, "get_bars", params=_bars_params(limit, start, end))
+    r.raise_for_status()
+    return r.json().get("bars", [])
+
+
+async def get_bars_batch(symbols: Iterable[str], limit: int = 300) -> BarsBatch:
+    """
+    Fetch bars for several symbols concurrently on the event loop.
+    """
+    batch = BarsBatch()
+    syms = list(dict.fromkeys(symbols))
+    if not syms:
+        return batch
+    _assert_creds()
+    loop = asyncio.get_running_loop()
+
+    async def one(sym: str):
+        t0 = loop.time()
+        try:
+            batch.bars[sym] = await get_bars(sym, limit=limit)
+        except Exception as e:
+            batch.bars[sym] = []
+            batch.errors[sym] = str(e)
+        batch.latency_ms[sym] = (loop.time() - t0) * 1000.0
+
+    await asyncio.gather(*(one(s) for s in syms))
+    return batch
+
+
+async def latest_trade_price(symbol: str) -> Optional[float]:
+    _assert_creds()
+    url = f"{sync._ALPACA_DATA_BASE}/v2/stocks/{symbol}/trades/latest"
+    r = await _request("GET", url, "latest_trade_price", params={"feed": _select_feed()})
+    r.raise_for_status()
+    p = r.json().get("trade", {}).get("p")
+    return float(p) if p is not None else None
+
+
+async def latest_trade_prices(symbols: Iterable[str]) -> Dict[str, float]:
+    syms = list(dict.fromkeys(symbols))
+    if not syms:
+        return {}
+    _assert_creds()
+    url = f"{sync._ALPACA_DATA_BASE}/v2/stocks/trades/latest"
+    r = await _request("GET", url, "latest_trade_prices", params={"symbols": ",".join(syms), "feed": _select_feed()})
+    r.raise_for_status()
+    return _prices_from_latest_trades(r.json())
+
+
+async def _submit_order(payload: Dict[str, Any], op: str) -> Dict[str, Any]:
+    if getattr(settings, "dry_run", False):
+        return {"id": "paper-order", "payload": payload}
+    _assert_creds()
+    r = await _request("POST", f"{sync._ALPACA_BASE}/v2/orders", op, json=payload)
+    r.raise_for_status()
+    return r.json()
+
+
+async def place_buy_stop(symbol: str, qty: int, stop_price: float, tp_limit: float) -> Dict[str, Any]:
+    return await _submit_order(buy_stop_payload(symbol, qty, stop_price, tp_limit), "place_buy_stop")
+
+
+async def place_buy_limit(symbol: str, qty: int, limit_price: float, tp_limit: float) -> Dict[str, Any]:
+    return await _submit_order(buy_limit_payload(symbol, qty, limit_price, tp_limit), "place_buy_limit")
+
+
+async def cancel_order(order_id: str):
+    if getattr(settings, "dry_run", False):
+        return
+    _assert_creds()
+    r = await _request("DELETE", f"{sync._ALPACA_BASE}/v2/orders/{order_id}", "cancel_order")
+    r.raise_for_status()
+
+
+async def get_positions() -> List[Dict[str, Any]]:
+    _assert_creds()
+    r = await _request("GET", f"{sync._ALPACA_BASE}/v2/positions", "get_positions")
+    r.raise_for_status()
+    return r.json()
+
+
+async def get_open_orders(symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+    _assert_creds()
+    r = await _request("GET", f"{sync._ALPACA_BASE}/v2/orders", "get_open_orders", params=_open_orders_params(symbol))
+    r.raise_for_status()
+    return r.json()
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+import logging
+
+from bot.config.settings import settings
+
+logger = logging.getLogger("limitless.ratelimit")
+
+PRIORITY_ORDER = "order"  # order placement / cancel
+PRIORITY_DATA = "data"    # market data, account, positions, open orders
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every Alpaca REST call.
+
+    Tokens refill at (limit - burst)/60 per second into a bucket of `burst`,
+    so no 60s window can exceed `limit` requests. Data calls must leave
+    `order_reserve` tokens in the bucket; order/cancel calls may drain it, so
+    a busy scan never makes an order wait behind market data.
+    """
+
+    def __init__(
+        self,
+        per_minute: int = settings.alpaca_rate_limit_per_min,
+        burst: int = settings.rate_limit_burst,
+        order_reserve: int = settings.rate_limit_order_reserve,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.per_minute = max(1, per_minute)
+        self.burst = max(1, min(burst, self.per_minute))
+        self.order_reserve = max(0, min(order_reserve, self.burst - 1))
+        self.rate = max(1, self.per_minute - self.burst) / 60.0  # tokens per second
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.tokens = float(self.burst)
+        self._last = clock()
+        self._recent: Deque[float] = deque()
+        self.granted: Dict[str, int] = {PRIORITY_ORDER: 0, PRIORITY_DATA: 0}
+        self.waits = 0
+        self.wait_sec = 0.0
+        self.throttled_429 = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(float(self.burst), self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, priority: str = PRIORITY_DATA) -> float:
+        """
+        Take a token if one is available for `priority`. Returns 0.0 on success,
+        otherwise the number of seconds until one should be.
+        """
+        floor = 0 if priority == PRIORITY_ORDER else self.order_reserve
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if self.tokens - 1.0 >= floor - 1e-9:
+                self.tokens -= 1.0
+                self.granted[priority] = self.granted.get(priority, 0) + 1
+                self._recent.append(now)
+                return 0.0
+            return (floor + 1.0 - self.tokens) / self.rate
+
+    def _note_wait(self, secs: float):
+        with self._lock:
+            self.waits += 1
+            self.wait_sec += secs
+
+    def acquire(self, priority: str = PRIORITY_DATA):
+        """Block the calling thread until a token is available."""
+        while True:
+            wait = self.try_acquire(priority)
+            if wait <= 0:
+                return
+            wait = min(wait, 1.0)
+            self._note_wait(wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, priority: str = PRIORITY_DATA):
+        while True:
+            wait = self.try_acquire(priority)
+            if wait <= 0:
+                return
+            wait = min(wait, 1.0)
+            self._note_wait(wait)
+            await asyncio.sleep(wait)
+
+    def note_throttled(self):
+        """Alpaca answered 429: we're out of sync with its window, so empty the bucket."""
+        with self._lock:
+            self.throttled_429 += 1
+            self.tokens = 0.0
+            self._last = self._clock()
+
+    def usage(self) -> Dict[str, object]:
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            while self._recent and now - self._recent[0] > 60.0:
+                self._recent.popleft()
+            return {
+                "limit_per_min": self.per_minute,
+                "burst": self.burst,
+                "order_reserve": self.order_reserve,
+                "tokens_available": round(self.tokens, 2),
+                "used_last_min": len(self._recent),
+                "granted": dict(self.granted),
+                "waits": self.waits,
+                "wait_sec": round(self.wait_sec, 3),
+                "throttled_429": self.throttled_429,
+            }
+
+
+def plan_request_budget(
+    n_symbols: int,
+    n_positions: Optional[int] = None,
+    tick_sec: Optional[float] = None,
+    ui_clients: int = 1,
+    ui_poll_sec: float = 5.0,
+    engine_mode: Optional[str] = None,
+    limit_per_min: Optional[int] = None,
+) -> Dict[str, object]:
+    """
+    Rough requests/minute the engine and dashboard will generate, against the limit.
+    Unset arguments are read from the current settings.
+    """
+    n_positions = settings.concurrency_cap if n_positions is None else n_positions
+    tick_sec = settings.engine_poll_sec if tick_sec is None else tick_sec
+    engine_mode = engine_mode or settings.engine_mode
+    limit = limit_per_min or settings.alpaca_rate_limit_per_min
+    ticks = 60.0 / max(0.5, tick_sec)
+    if engine_mode == "stream":
+        # Bars arrive by stream; REST is housekeeping plus one account read per evaluated bar
+        engine = ticks * 1 + n_symbols * 1
+    else:
+        # Per tick: account + one bar delta per symbol + positions + one latest-trades call
+        # + one bar delta per held symbol
+        engine = ticks * (1 + n_symbols + (2 + n_positions if n_positions else 1))
+    ui = ui_clients * (60.0 / max(0.5, ui_poll_sec))
+    total = engine + ui
+    return {
+        "engine_per_min": round(engine, 1),
+        "ui_per_min": round(ui, 1),
+        "total_per_min": round(total, 1),
+        "limit_per_min": limit,
+        "utilization": round(total / limit, 3) if limit else None,
+        "over_limit": total > limit,
+    }
+
+
+limiter = RateLimiter()
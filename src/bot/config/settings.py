@@ -106,10 +106,68 @@ class Settings:
     entry_cancel_minutes: int = _env_int("ENTRY_CANCEL_MINUTES", 2)
     entry_order_type: str = _env_str("ENTRY_ORDER_TYPE", "buy_stop")
 
+    # Engine cadence: "poll" runs a full tick every ENGINE_POLL_SEC; "stream" evaluates
+    # on streamed bars/trades and falls back to polling while the stream is down/stale
+    engine_mode: str = _env_str("ENGINE_MODE", "poll")
+    engine_poll_sec: float = _env_float("ENGINE_POLL_SEC", 5.0)
+    stream_stale_sec: float = _env_float("STREAM_STALE_SEC", 15.0)
+
+    # Alpaca REST connection pooling
+    http_pool_connections: int = _env_int("HTTP_POOL_CONNECTIONS", 4)  # host pools kept
+    http_pool_maxsize: int = _env_int("HTTP_POOL_MAXSIZE", 16)  # keep-alive connections per host
+    http_timeout_sec: float = _env_float("HTTP_TIMEOUT_SEC", 10.0)
+    http_retries: int = _env_int("HTTP_RETRIES", 2)
+    http_prewarm_lead_sec: int = _env_int("HTTP_PREWARM_LEAD_SEC", 30)
+    # Account snapshot shared by the engine and /status; order activity refreshes it early
+    account_ttl_sec: float = _env_float("ACCOUNT_TTL_SEC", 2.0)
+
+    # Alpaca REST request budget (shared by all adapter calls)
+    alpaca_rate_limit_per_min: int = _env_int("ALPACA_RATE_LIMIT_PER_MIN", 200)
+    rate_limit_burst: int = _env_int("RATE_LIMIT_BURST", 20)
+    rate_limit_order_reserve: int = _env_int("RATE_LIMIT_ORDER_RESERVE", 5)  # tokens only orders/cancels may use
+
+    # Market data fetching
+    bars_fetch_workers: int = _env_int("BARS_FETCH_WORKERS", 8)
+    bar_cache_window: int = _env_int("BAR_CACHE_WINDOW", 300)
+    # On-disk minute bar history; get_bars() serves stored days from here when given a start
+    bar_store_dir: str = _env_str("BAR_STORE_DIR", "data/bars")
+    bar_store_read_through: bool = _env_bool("BAR_STORE", True)
+    backfill_workers: int = _env_int("BACKFILL_WORKERS", 4)
+    backfill_chunk_days: int = _env_int("BACKFILL_CHUNK_DAYS", 20)  # days per paginated request range
+
+    # Audit log writer (background thread; the engine only enqueues)
+    audit_queue_size: int = _env_int("AUDIT_QUEUE_SIZE", 10000)
+    audit_flush_sec: float = _env_float("AUDIT_FLUSH_SEC", 1.0)
+    audit_fsync: str = _env_str("AUDIT_FSYNC", "interval")  # batch | interval | never
+    audit_rotate_mb: float = _env_float("AUDIT_ROTATE_MB", 50.0)
+    audit_rotate_hours: float = _env_float("AUDIT_ROTATE_HOURS", 24.0)
+    audit_keep: int = _env_int("AUDIT_KEEP", 14)  # rotated .gz segments kept
+    # Tracing: every engine tick is a trace; with TRACE_EXPORT its spans are appended to TRACE_FILE as JSON lines
+    trace_export: bool = _env_bool("TRACE_EXPORT", False)
+    trace_file: str = _env_str("TRACE_FILE", "traces.jsonl")
+
+    # UI WebSocket fan-out: messages buffered per client, and what to do when a client falls that far behind
+    ws_client_buffer: int = _env_int("WS_CLIENT_BUFFER", 1000)
+    ws_slow_policy: str = _env_str("WS_SLOW_POLICY", "drop_oldest")  # drop_oldest | disconnect
+    # Latest quote/trade per symbol sent to /prices clients at most this often (0 = every tick)
+    prices_conflate_hz: float = _env_float("PRICES_CONFLATE_HZ", 4.0)
+    ws_batch_ms: int = _env_int("WS_BATCH_MS", 250)  # flush interval for ?proto=batch|msgpack clients
+    ws_deflate: bool = _env_bool("WS_DEFLATE", True)  # offer permessage-deflate to WebSocket clients
+    # /state push channel: how often engine changes / everything else are checked while clients are connected
+    state_poll_ms: int = _env_int("STATE_POLL_MS", 250)
+    state_full_check_sec: float = _env_float("STATE_FULL_CHECK_SEC", 5.0)
+    # Event loop lag monitor; LOOP_WATCHDOG also captures the stack of callbacks blocking the loop >= LOOP_BLOCK_MS
+    loop_lag_interval_ms: int = _env_int("LOOP_LAG_INTERVAL_MS", 100)
+    loop_block_ms: float = _env_float("LOOP_BLOCK_MS", 100.0)
+    loop_watchdog: bool = _env_bool("LOOP_WATCHDOG", False)
+
     # Buckets (cash mode)
     bucket_file: str = _env_str("BUCKETS_FILE", "buckets.json")
     bucket_init_total_usd: float = _env_float("BUCKET_INIT_TOTAL_USD", 4000.0)
     bucket_utilization_pct: float = _env_float("BUCKET_UTILIZATION_PCT", 0.93)
+    # Append ledger mutations to <BUCKETS_FILE>.journal; compact into BUCKETS_FILE every N records
+    bucket_journal: bool = _env_bool("BUCKET_JOURNAL", True)
+    bucket_snapshot_every: int = _env_int("BUCKET_SNAPSHOT_EVERY", 200)
 
     # Margin mode
     concurrency_cap: int = _env_int("CONCURRENCY_CAP", 3)
@@ -132,10 +190,16 @@ class Settings:
     confirm_higher_low: bool = _env_bool("CONFIRM_HIGHER_LOW", True)
     confirm_timeframe_minutes: int = _env_int("CONFIRM_TIMEFRAME_MIN", 5)
     atr_len: int = _env_int("ATR_LEN", 14)
+    atr_mode: str = _env_str("ATR_MODE", "sma")  # sma | wilder
     atr_take_profit_k: float = _env_float("ATR_TP_K", 0.5)
     atr_trail_k: float = _env_float("ATR_TRAIL_K", 1.0)
     exit_in_power_window_only: bool = _env_bool("EXIT_IN_POWER_WINDOW_ONLY", True)
 
+    # Evaluate entries on NumPy arrays instead of pandas frames (same results, less overhead)
+    fast_rules: bool = _env_bool("FAST_RULES", True)
+    # Evaluate all candidates as one (symbols x bars) matrix once there are at least this many
+    batch_scan_min_symbols: int = _env_int("BATCH_SCAN_MIN_SYMBOLS", 40)
+
     # Hard guardrails
     rvol_min: float = _env_float("RVOL_MIN", 1.1)
     spread_max_pct: float = _env_float("SPREAD_MAX_PCT", 0.0015)
@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import logging
+
+import pandas as pd
+
+from bot.config.settings import settings
+from bot.storage.bar_store import BarStore, bar_store
+
+logger = logging.getLogger("limitless.backfill")
+TZ_ET = ZoneInfo("America/New_York")
+
+Bar = Dict[str, Any]
+PageFetch = Callable[..., Tuple[List[Bar], Optional[str]]]
+
+
+def _default_fetch_page(symbol: str, start: str, end: Optional[str] = None, page_token: Optional[str] = None) -> Tuple[List[Bar], Optional[str]]:
+    # Imported lazily so planning (and tests) don't need broker creds
+    from bot.broker.alpaca_adapter import get_bars_page
+    return get_bars_page(symbol, start, end, page_token=page_token)
+
+
+def _rfc3339(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _et_midnight(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=TZ_ET)
+
+
+@dataclass
+class BackfillJob:
+    symbol: str
+    days: List[date]  # consecutive missing weekdays, ascending
+
+
+@dataclass
+class BackfillReport:
+    jobs: int = 0
+    pages: int = 0
+    days_written: Dict[str, int] = field(default_factory=dict)
+    bars_written: Dict[str, int] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)  # "SYMBOL first..last" -> error
+
+
+def plan_backfill(
+    symbols: Iterable[str],
+    start: date,
+    end: date,
+    store: BarStore = bar_store,
+    today: Optional[date] = None,
+    chunk_days: int = settings.backfill_chunk_days,
+) -> List[BackfillJob]:
+    """
+    Jobs for every weekday in [start, end] (before today) the store doesn't
+    have yet, as runs of at most `chunk_days` consecutive missing days. Stored
+    days are skipped, which is what makes an interrupted backfill resumable.
+    """
+    today = today or datetime.now(TZ_ET).date()
+    last = min(end, today - timedelta(days=1))
+    jobs: List[BackfillJob] = []
+    for sym in dict.fromkeys(symbols):
+        run: List[date] = []
+        d = start
+        while d <= last:
+            if d.weekday() < 5:
+                if store.has_day(sym, d.isoformat()):
+                    if run:
+                        jobs.append(BackfillJob(sym, run))
+                    run = []
+                else:
+                    run.append(d)
+                    if len(run) >= max(1, chunk_days):
+                        jobs.append(BackfillJob(sym, run))
+                        run = []
+            d += timedelta(days=1)
+        if run:
+            jobs.append(BackfillJob(sym, run))
+    return jobs
+
+
+def run_job(job: BackfillJob, store: BarStore = bar_store, fetch_page: PageFetch = _default_fetch_page) -> Tuple[int, int, int]:
+    """
+    Page through one job's range, writing each day as soon as a later day's
+    bars (or the last page) show it is complete. Only the current page and
+    the day being assembled are held in memory. Returns (days, bars, pages).
+    """
+    start = _rfc3339(_et_midnight(job.days[0]))
+    end = _rfc3339(_et_midnight(job.days[-1] + timedelta(days=1)) - timedelta(seconds=1))
+    remaining = [d.isoformat() for d in job.days]
+    buf: List[Bar] = []
+    days = bars = pages = 0
+
+    def flush_until(day: Optional[str]):
+        nonlocal buf, days, bars
+        while remaining and (day is None or remaining[0] < day):
+            d = remaining.pop(0)
+            store.write_day(job.symbol, d, buf)
+            days += 1
+            bars += len(buf)
+            buf = []
+
+    token = None
+    while True:
+        page, token = fetch_page(job.symbol, start, end, page_token=token)
+        pages += 1
+        if page:
+            et_days = pd.DatetimeIndex([b["t"] for b in page]).tz_convert(TZ_ET).strftime("%Y-%m-%d")
+            for b, d in zip(page, et_days):
+                flush_until(d)
+                if remaining and remaining[0] == d:
+                    buf.append(b)
+        if not token:
+            break
+    flush_until(None)
+    return days, bars, pages
+
+
+def run_backfill(
+    symbols: Iterable[str],
+    start: date,
+    end: date,
+    workers: int = settings.backfill_workers,
+    store: BarStore = bar_store,
+    fetch_page: PageFetch = _default_fetch_page,
+    today: Optional[date] = None,
+    chunk_days: int = settings.backfill_chunk_days,
+) -> BackfillReport:
+    """
+    Download missing minute bars for `symbols` over [start, end] into the
+    store. Requests go through the shared Alpaca rate limiter, so `workers`
+    only bounds concurrency, never the request rate.
+    """
+    jobs = plan_backfill(symbols, start, end, store=store, today=today, chunk_days=chunk_days)
+    report = BackfillReport(jobs=len(jobs))
+    if not jobs:
+        return report
+    logger.info("Backfill: %d jobs, %d symbol-days", len(jobs), sum(len(j.days) for j in jobs))
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill") as pool:
+        futures = {pool.submit(run_job, job, store, fetch_page): job for job in jobs}
+        for fut in as_completed(futures):
+            job = futures[fut]
+            key = f"{job.symbol} {job.days[0].isoformat()}..{job.days[-1].isoformat()}"
+            try:
+                days, bars, pages = fut.result()
+            except Exception as e:
+                report.errors[key] = str(e)
+                logger.warning("Backfill %s failed: %s", key, e)
+                continue
+            report.pages += pages
+            report.days_written[job.symbol] = report.days_written.get(job.symbol, 0) + days
+            report.bars_written[job.symbol] = report.bars_written.get(job.symbol, 0) + bars
+            logger.info("Backfill %s: %d days, %d bars, %d pages", key, days, bars, pages)
+    return report
@@ -0,0 +1,113 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+from bot.config.settings import settings
+
+logger = logging.getLogger("limitless.bar_cache")
+
+Bar = Dict[str, Any]
+
+
+def _default_fetch(symbol: str, limit: int, start: Optional[str] = None) -> List[Bar]:
+    # Imported lazily so the cache can be used (and tested) without broker creds
+    from bot.broker.alpaca_adapter import get_bars
+    return get_bars(symbol, limit=limit, start=start)
+
+
+class BarCache:
+    """
+    Rolling in-memory 1-minute bar cache keyed by symbol.
+
+    The first read for a symbol backfills a full window. Later reads only ask
+    for bars at or after the last cached timestamp (the last bar is re-fetched
+    so late revisions to it are picked up), merge them in and trim to the window.
+    A delta that comes back truncated, or that no longer contains the last
+    cached bar, is treated as a gap and triggers a full backfill.
+    """
+
+    def __init__(self, window: int = settings.bar_cache_window, fetch: Callable[..., List[Bar]] = _default_fetch):
+        self.window = window
+        self._fetch = fetch
+        self._bars: Dict[str, List[Bar]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.gaps_backfilled = 0
+
+    def _lock_for(self, symbol: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(symbol)
+            if lock is None:
+                lock = self._locks[symbol] = threading.Lock()
+            return lock
+
+    def get(self, symbol: str, limit: Optional[int] = None) -> List[Bar]:
+        """
+        Bring `symbol` up to date and return (at most `limit` of) its newest bars.
+        """
+        with self._lock_for(symbol):
+            bars = self._sync(symbol)
+        if limit is not None and limit < len(bars):
+            return bars[-limit:]
+        return bars
+
+    def peek(self, symbol: str) -> List[Bar]:
+        """Cached bars without touching the network."""
+        return list(self._bars.get(symbol, []))
+
+    def symbols(self) -> List[str]:
+        """Symbols that have been backfilled."""
+        return [sym for sym, bars in list(self._bars.items()) if bars]
+
+    def ingest(self, symbol: str, bar: Bar) -> bool:
+        """
+        Merge one streamed bar without touching the network. Ignored until the
+        symbol has been backfilled, so a stream bar never seeds a sparse window.
+        """
+        with self._lock_for(symbol):
+            cached = self._bars.get(symbol)
+            if not cached or bar["t"] < cached[-1]["t"]:
+                return False
+            if bar["t"] == cached[-1]["t"]:
+                cached[-1] = bar
+            else:
+                cached.append(bar)
+                if len(cached) > self.window:
+                    del cached[: len(cached) - self.window]
+            return True
+
+    def invalidate(self, symbol: Optional[str] = None):
+        if symbol is None:
+            self._bars.clear()
+        else:
+            self._bars.pop(symbol, None)
+
+    def _backfill(self, symbol: str) -> List[Bar]:
+        bars = list(self._fetch(symbol, limit=self.window) or [])[-self.window:]
+        self._bars[symbol] = bars
+        return list(bars)
+
+    def _sync(self, symbol: str) -> List[Bar]:
+        cached = self._bars.get(symbol)
+        if not cached:
+            return self._backfill(symbol)
+
+        last_t = cached[-1]["t"]
+        delta = list(self._fetch(symbol, limit=self.window, start=last_t) or [])
+        if not delta:
+            return list(cached)
+        if len(delta) >= self.window or delta[0]["t"] != last_t:
+            # Either more bars are waiting beyond this page, or the bar we
+            # anchored on was revised away; either way we can't splice safely.
+            self.gaps_backfilled += 1
+            logger.info("Bar gap detected for %s after %s; backfilling", symbol, last_t)
+            return self._backfill(symbol)
+
+        merged = cached[:-1] + delta
+        if len(merged) > self.window:
+            merged = merged[-self.window:]
+        self._bars[symbol] = merged
+        return list(merged)
+
+
+bar_cache = BarCache()
@@ -0,0 +1,70 @@
+from typing import Callable, Dict, Iterable, List, Optional
+import logging
+
+from bot.broker.alpaca_adapter import get_bars_batch, latest_trade_prices
+from bot.data.bar_cache import bar_cache
+from bot.logging import tracing
+from bot.strategy.indicators import IndicatorState
+
+logger = logging.getLogger("limitless.snapshot")
+
+
+class MarketSnapshot:
+    """
+    Market data for one engine tick. Each symbol's price and bars are fetched
+    at most once and its ATR computed at most once, however many exit rules
+    ask for them.
+
+    With refresh=False nothing goes to the network: bars come from the bar
+    cache as-is and prices only from `prices` (e.g. the last streamed trade).
+    """
+
+    def __init__(
+        self,
+        indicators_for: Callable[[str, List[Dict]], IndicatorState],
+        refresh: bool = True,
+        prices: Optional[Dict[str, float]] = None,
+    ):
+        self._indicators_for = indicators_for
+        self.refresh = refresh
+        self._prices: Dict[str, float] = dict(prices or {})
+        self._bars: Dict[str, List[Dict]] = {}
+        self._atr: Dict[str, float] = {}
+
+    def prefetch(self, symbols: Iterable[str], bars: bool = True):
+        """
+        Fetch prices (one request) and, if `bars`, bars (concurrently) for all
+        `symbols` up front. Without `bars`, bars are only fetched per symbol if
+        bars()/atr() is actually called.
+        """
+        syms = [s for s in dict.fromkeys(symbols)]
+        if not self.refresh or not syms:
+            return
+        with tracing.span("prices", symbols=len(syms)) as sp:
+            try:
+                self._prices.update(latest_trade_prices(syms))
+            except Exception as e:
+                logger.warning("Latest trade prices failed for %s: %s", ",".join(syms), e)
+            if sp is not None:
+                # The prices exit decisions in this tick are based on
+                sp.set(prices={s: self._prices.get(s) for s in syms})
+        if not bars:
+            return
+        batch = get_bars_batch(syms, fetch=bar_cache.get)
+        for sym, err in batch.errors.items():
+            logger.warning("Bar fetch failed for %s: %s", sym, err)
+        self._bars.update(batch.bars)
+
+    def price(self, symbol: str) -> Optional[float]:
+        return self._prices.get(symbol)
+
+    def bars(self, symbol: str) -> List[Dict]:
+        if symbol not in self._bars:
+            self._bars[symbol] = bar_cache.get(symbol) if self.refresh else bar_cache.peek(symbol)
+        return self._bars[symbol]
+
+    def atr(self, symbol: str) -> float:
+        if symbol not in self._atr:
+            bars = self.bars(symbol)
+            self._atr[symbol] = self._indicators_for(symbol, bars).atr if bars else 0.0
+        return self._atr[symbol]
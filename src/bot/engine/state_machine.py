@@ -1,6 +1,9 @@
 import time
+import queue
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
 from zoneinfo import ZoneInfo
@@ -9,18 +12,36 @@ import logging
 
 from bot.config.settings import settings
 from bot.broker.alpaca_adapter import (
-    get_account, get_bars, latest_trade_price, place_buy_stop, place_buy_limit,
-    get_positions, get_open_orders, cancel_order, now_et,
+    get_bars_batch, place_buy_stop, place_buy_limit,
+    get_positions, get_open_orders, cancel_order, now_et, prewarm_connections,
 )
+from bot.broker.account import account
+from bot.broker.rate_limit import plan_request_budget
+from bot.data.bar_cache import bar_cache
+from bot.engine.snapshot import MarketSnapshot
 from bot.data.finnhub_earnings import earnings
-from bot.storage.buckets_ledger import BucketsLedger
-from bot.strategy.rules import build_indicators, opening_range, qualify_entry, qualifies_all
+from bot.storage.buckets_ledger import BucketsLedger, open_ledger
+from bot.strategy.batch_scan import PanelBuilder, scan_panel, verdict_to_eval
+from bot.strategy.fast_rules import EntryEval, bars_to_arrays, evaluate_entry_np, with_indicator_columns
+from bot.strategy.indicators import IndicatorState
+from bot.strategy.rules import opening_range, qualify_entry, qualifies_all
+from bot.logging import metrics, tracing
 from bot.logging.audit import Auditor
 from bot.logging.events import publish, format_skip, format_info, format_entry, format_close
 
 logger = logging.getLogger("limitless.engine")
 TZ_ET = ZoneInfo("America/New_York")
 
+TICK_SECONDS = metrics.histogram("engine_tick_seconds", "Duration of one full engine tick")
+STAGE_SECONDS = metrics.histogram("engine_stage_seconds", "Time spent in each engine stage", ("stage",))
+ORDERS_PLACED = metrics.counter("engine_entry_orders_total", "Entry orders placed", ("mode",))
+
+@contextmanager
+def _stage(name: str, **attrs):
+    """Time one engine stage: a span in the current trace plus the stage histogram."""
+    with tracing.span(name, **attrs), STAGE_SECONDS.labels(name).time():
+        yield
+
 def parse_time_et(hhmm: str, base_date: Optional[datetime] = None) -> datetime:
     t = now_et() if base_date is None else base_date
     h, m = [int(x) for x in hhmm.split(":")]
@@ -119,10 +140,17 @@ def _estimate_rvol(df: pd.DataFrame, base_len: int = 50) -> float:
         return 1.0
     return float(cur / avg)
 
+def _bars_to_df(bars: List[Dict]) -> pd.DataFrame:
+    df = pd.DataFrame(bars)
+    df["t"] = pd.to_datetime(df["t"], utc=True)
+    df["t_et"] = df["t"].dt.tz_convert(TZ_ET)
+    df = df.rename(columns={"o": "open", "h": "high", "l": "low", "c": "close", "v": "volume"})
+    return df[["t_et", "open", "high", "low", "close", "volume"]].reset_index(drop=True)
+
 class Engine:
-    def __init__(self):
-        self.aud = Auditor()
-        self.ledger = BucketsLedger()
+    def __init__(self, ledger: Optional[BucketsLedger] = None, aud: Optional[Auditor] = None, refresh_earnings: bool = True):
+        self.aud = aud if aud is not None else Auditor()
+        self.ledger = ledger if ledger is not None else open_ledger()
         self.positions: List[PositionState] = []
         self.pending_orders: Dict[str, Dict] = {}  # symbol -> {"id", "placed_at"}
         self.mode: str = "cash"  # cash | margin
@@ -130,9 +158,24 @@ class Engine:
         self.daily_start_equity: float = 0.0
         self.per_symbol_last_exit: Dict[str, datetime] = {}
         self.global_last_entry: Optional[datetime] = None
+        # Guards the fields above so snapshot_state() (API thread/loop) never sees a half-applied change
+        self.state_lock = threading.RLock()
+        self.state_version: int = 0  # bumped on every change snapshot_state() would show
+        self.bars_latency_ms: Dict[str, float] = {}  # symbol -> last bar fetch latency
+        self.indicators: Dict[str, IndicatorState] = {}  # symbol -> streaming indicator state
+        self.panel = PanelBuilder()  # converted bar windows for the batch scan
+        self._prewarmed: set = set()  # "YYYY-MM-DD:window" keys already pre-warmed
+        # Stream-driven mode (ENGINE_MODE=stream)
+        self._stream_events: "queue.Queue[Tuple[str, str, object]]" = queue.Queue(maxsize=10000)
+        self.stream_connected: bool = False
+        self.stream_last_msg: float = 0.0
+        self.stream_dropped: int = 0
+        self._stream_resync: bool = False
+        self.last_trade: Dict[str, float] = {}  # symbol -> last streamed trade price
         self._event_loop: Optional[asyncio.AbstractEventLoop] = None
-        for sym in settings.watchlist:
-            earnings.refresh_symbol(sym)
+        if refresh_earnings:
+            for sym in settings.watchlist:
+                earnings.refresh_symbol(sym)
     
     def set_event_loop(self, loop: asyncio.AbstractEventLoop):
         """Set the event loop to use for publishing events from the thread."""
@@ -142,18 +185,71 @@ class Engine:
         """Safely publish a message to the event queue from the engine thread."""
         if self._event_loop and self._event_loop.is_running():
             try:
-                asyncio.run_coroutine_threadsafe(publish(message), self._event_loop)
+                asyncio.run_coroutine_threadsafe(publish(message, tracing.current_trace_id()), self._event_loop)
             except Exception as e:
                 logger.debug("Failed to publish event: %s", e)
 
+    @contextmanager
+    def _mutating(self):
+        """Apply a change to dashboard-visible state under state_lock and bump state_version."""
+        with self.state_lock:
+            yield
+            self.state_version += 1
+
+    def snapshot_state(self) -> Dict[str, Any]:
+        """
+        JSON-ready copy of positions, pending orders, caps, cooldowns and mode,
+        taken under state_lock so it is consistent with one state_version.
+        """
+        with self.state_lock:
+            soft, hard = self.daily_caps_state()
+            return {
+                "version": self.state_version,
+                "mode": self.mode,
+                "positions": [
+                    {
+                        "symbol": ps.symbol,
+                        "entry_price": ps.entry_price,
+                        "target_price": ps.target_price,
+                        "qty": ps.qty,
+                        "opened_at": ps.opened_at,
+                        "bucket": ps.bucket,
+                    }
+                    for ps in self.positions
+                ],
+                "pending_orders": {
+                    sym: {
+                        "id": po["id"],
+                        "placed_at": po["placed_at"].isoformat(),
+                        "qty": po["qty"],
+                        "entry_price": po["entry_price"],
+                        "target": po["target"],
+                        "bucket": po.get("bucket"),
+                    }
+                    for sym, po in self.pending_orders.items()
+                },
+                "daily_caps": {
+                    "soft_hit": soft,
+                    "hard_hit": hard,
+                    "realized_usd": self.daily_realized_usd,
+                    "soft_cap_pct": settings.soft_cap_pct,
+                    "hard_cap_pct": settings.hard_cap_pct,
+                },
+                "concurrency": {"open_positions": len(self.positions), "cap": settings.concurrency_cap},
+                "cooldowns": {
+                    "global_last_entry": self.global_last_entry.isoformat() if self.global_last_entry else None,
+                    "per_symbol_last_exit": {sym: t.isoformat() for sym, t in self.per_symbol_last_exit.items()},
+                },
+            }
+
     def refresh_mode(self):
-        acct = get_account()
-        if acct.equity >= 25000:
-            self.mode = "margin"
-        else:
-            self.mode = "cash"
-        if self.daily_start_equity == 0.0:
-            self.daily_start_equity = acct.equity
+        acct = account.get()
+        mode = "margin" if acct.equity >= 25000 else "cash"
+        if mode != self.mode or self.daily_start_equity == 0.0:
+            with self._mutating():
+                self.mode = mode
+                if self.daily_start_equity == 0.0:
+                    self.daily_start_equity = acct.equity
 
     def earnings_skip(self, symbol: str) -> bool:
         today_iso = now_et().strftime("%Y-%m-%d")
@@ -225,52 +321,151 @@ class Engine:
         """
         Hard guardrails before sizing/ordering: RVOL, spread.
         """
-        rvol = _estimate_rvol(df)
+        return self._check_guardrails(symbol, _estimate_rvol(df), _estimate_spread_pct(df))
+
+    def _check_guardrails(self, symbol: str, rvol: float, spread_pct: float) -> bool:
         if rvol < settings.rvol_min:
             self.aud.log("entry_skipped_rvol", {"rvol": rvol, "min": settings.rvol_min})
             self._publish(format_skip(symbol, "insufficient relative volume", {"rvol": rvol, "min": settings.rvol_min}))
             return False
-        spread_pct = _estimate_spread_pct(df)
         if spread_pct > settings.spread_max_pct:
             self.aud.log("entry_skipped_spread", {"spread_pct": spread_pct, "max": settings.spread_max_pct})
             self._publish(format_skip(symbol, "spread too wide", {"spread_pct": spread_pct, "max": settings.spread_max_pct}))
             return False
         return True
 
-    def scan_and_enter(self):
-        self.refresh_mode()
-        for symbol in settings.symbol_priority:
-            if self.earnings_skip(symbol):
-                self._publish(format_skip(symbol, "earnings lockout"))
-                continue
-            if not self.can_open_new_position(symbol):
-                continue
+    def _indicators_for(self, symbol: str, bars: List[Dict]) -> IndicatorState:
+        """
+        Streaming indicators for `symbol`, caught up with `bars` (only unseen bars are applied).
+        """
+        state = self.indicators.get(symbol)
+        if state is None or state.atr_len != settings.atr_len or state.atr_mode != settings.atr_mode:
+            state = IndicatorState(atr_len=settings.atr_len, atr_mode=settings.atr_mode)
+            self.indicators[symbol] = state
+        return state.sync(bars)
 
-            bars = get_bars(symbol, limit=300)
+    def _evaluate_entry(self, symbol: str, bars: List[Dict]) -> Tuple[EntryEval, IndicatorState]:
+        """
+        Entry rules, confirmations and guardrail inputs for the newest bar.
+        Uses the NumPy path unless FAST_RULES is off; both give identical results.
+        """
+        ind = self._indicators_for(symbol, bars)
+        open_et = parse_time_et("09:30")
+        if settings.fast_rules:
+            a = with_indicator_columns(bars_to_arrays(bars), ind.columns(len(bars)))
+            return evaluate_entry_np(a, open_et), ind
+
+        df = _bars_to_df(bars)
+        orh, _ = opening_range(df, open_et)
+        for col, values in ind.columns(len(df)).items():
+            df[col] = values
+        info = qualify_entry(df, orh)
+        qualifies = qualifies_all(info)
+        ev = EntryEval(
+            info=info,
+            qualifies=qualifies,
+            confirmed=qualifies and self._apply_entry_confirmations(df),
+            rvol=_estimate_rvol(df),
+            spread_pct=_estimate_spread_pct(df),
+        )
+        return ev, ind
+
+    def _batch_verdicts(self, bars_by_symbol: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+        """
+        Evaluate every candidate in one pass over a (symbols x bars) matrix.
+        EMAs are seeded at the start of the window rather than carried in
+        IndicatorState, which only matters in the far decimals.
+        """
+        panel = self.panel.build(bars_by_symbol)
+        table = scan_panel(panel, parse_time_et("09:30"))
+        return table.to_dict("index")
+
+    def _fetch_candidate_bars(self, symbols: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Fetch bars for all candidates concurrently (through the bar cache) so one
+        slow symbol doesn't serialize the rest of the scan. Records per-symbol latency.
+        """
+        if self.stream_alive():
+            # Streamed bars already keep the cache current; only cold symbols need REST
+            cached = {sym: bar_cache.peek(sym) for sym in symbols}
+            symbols = [sym for sym, bars in cached.items() if not bars]
+            if not symbols:
+                return cached
+        else:
+            cached = {}
+        batch = get_bars_batch(symbols, limit=300, fetch=bar_cache.get)
+        self.bars_latency_ms.update(batch.latency_ms)
+        for symbol, err in batch.errors.items():
+            logger.warning("Bar fetch failed for %s: %s", symbol, err)
+        if batch.latency_ms:
+            slowest = max(batch.latency_ms, key=batch.latency_ms.get)
+            logger.debug("Fetched bars for %d symbols (slowest %s %.0fms)", len(batch.latency_ms), slowest, batch.latency_ms[slowest])
+        cached.update(batch.bars)
+        return cached
+
+    def _resync_bars(self):
+        """
+        Bring every cached symbol up to date over REST (after a stream reconnect),
+        so bars that closed while the stream was down are backfilled before
+        streamed bars are appended after the gap.
+        """
+        symbols = bar_cache.symbols()
+        if not symbols:
+            return
+        batch = get_bars_batch(symbols, limit=300, fetch=bar_cache.get)
+        self.bars_latency_ms.update(batch.latency_ms)
+        for symbol, err in batch.errors.items():
+            logger.warning("Bar resync failed for %s: %s", symbol, err)
+        logger.info("Resynced bars for %d symbols after stream reconnect", len(batch.bars))
+
+    def scan_and_enter(self, symbols: Optional[List[str]] = None):
+        with _stage("refresh_mode"):
+            self.refresh_mode()
+        candidates = []
+        with _stage("candidates"):
+            for symbol in settings.symbol_priority:
+                if symbols is not None and symbol not in symbols:
+                    continue
+                if self.earnings_skip(symbol):
+                    self._publish(format_skip(symbol, "earnings lockout"))
+                    continue
+                if not self.can_open_new_position(symbol):
+                    continue
+                candidates.append(symbol)
+        if not candidates:
+            return
+
+        with _stage("fetch_bars", symbols=len(candidates)):
+            bars_by_symbol = self._fetch_candidate_bars(candidates)
+        verdicts = None
+        if len(candidates) >= settings.batch_scan_min_symbols:
+            with _stage("evaluate", symbols=len(bars_by_symbol)):
+                verdicts = self._batch_verdicts(bars_by_symbol)
+        for symbol in candidates:
+            bars = bars_by_symbol.get(symbol)
             if not bars:
                 continue
-            df = pd.DataFrame(bars)
-            df["t"] = pd.to_datetime(df["t"], utc=True)
-            df["t_et"] = df["t"].dt.tz_convert(TZ_ET)
-            df = df.rename(columns={"o": "open", "h": "high", "l": "low", "c": "close", "v": "volume"})
-            df = df[["t_et", "open", "high", "low", "close", "volume"]].reset_index(drop=True)
-
-            orh, _ = opening_range(df, parse_time_et("09:30"))
-            df = build_indicators(df)
-            info = qualify_entry(df, orh)
+            if verdicts is not None:
+                row = verdicts[symbol]
+                ev, atr = verdict_to_eval(row), row["atr"]
+            else:
+                with _stage("evaluate", symbol=symbol):
+                    ev, ind = self._evaluate_entry(symbol, bars)
+                atr = ind.atr
+            info = ev.info
 
-            if not qualifies_all(info):
+            if not ev.qualifies:
                 self._publish(format_skip(symbol, "setup invalid against entry criteria"))
                 continue
 
             # Confirmations
-            if not self._apply_entry_confirmations(df):
+            if not ev.confirmed:
                 self.aud.log("entry_rejected_confirmation", {"symbol": symbol})
                 self._publish(format_skip(symbol, "confirmation not satisfied (VWAP/Higher-low/Retest)"))
                 continue
 
             # Guardrails
-            if not self._apply_pretrade_guardrails(symbol, df):
+            if not self._check_guardrails(symbol, ev.rvol, ev.spread_pct):
                 continue
 
             price = info["price"]
@@ -284,7 +479,6 @@ class Engine:
                     self._publish(format_skip(symbol, "signal exceeded — slippage limit breached", {"run_pct": run_pct, "max": settings.slippage_max_pct}))
                     continue
 
-            atr = _calc_atr(df, settings.atr_len)
             entry_price = signal_high if settings.entry_order_type == "buy_stop" else price
             tp = settings.target_pct
             if settings.atr_take_profit_k > 0 and atr > 0:
@@ -307,21 +501,25 @@ class Engine:
                 qty = self.compute_size_margin_mode(symbol, entry_price)
                 bucket = None
 
-            if settings.entry_order_type == "buy_stop":
-                order = place_buy_stop(symbol, qty, stop_price=signal_high, tp_limit=target)
-            else:
-                order = place_buy_limit(symbol, qty, limit_price=price, tp_limit=target)
+            with _stage("place_order", symbol=symbol, qty=qty, type=settings.entry_order_type):
+                if settings.entry_order_type == "buy_stop":
+                    order = place_buy_stop(symbol, qty, stop_price=signal_high, tp_limit=target)
+                else:
+                    order = place_buy_limit(symbol, qty, limit_price=price, tp_limit=target)
+            ORDERS_PLACED.labels(self.mode).inc()
 
+            account.invalidate()
             oid = order.get("id", f"paper-{symbol}-{int(time.time())}")
-            self.pending_orders[symbol] = {
-                "id": oid,
-                "placed_at": now_et(),
-                "qty": qty,
-                "entry_price": entry_price,
-                "target": target,
-                "bucket": bucket,
-            }
-            self.global_last_entry = now_et()
+            with self._mutating():
+                self.pending_orders[symbol] = {
+                    "id": oid,
+                    "placed_at": now_et(),
+                    "qty": qty,
+                    "entry_price": entry_price,
+                    "target": target,
+                    "bucket": bucket,
+                }
+                self.global_last_entry = now_et()
             self.aud.log("entry_order_placed", {"symbol": symbol, "qty": qty, "entry": entry_price, "target": target, "mode": self.mode})
             self._publish(format_entry(symbol, qty, entry_price, target, self.mode))
             break
@@ -339,18 +537,19 @@ class Engine:
                 cancel_order(oid)
             except Exception:
                 pass
+            account.invalidate()
             po = self.pending_orders[symbol]
             if po.get("bucket"):
-                for b in self.ledger.buckets:
-                    if b["name"] == po["bucket"]:
-                        b["settled_cash"] += po["qty"] * po["entry_price"]
-                        self.ledger.save()
-                        break
+                try:
+                    self.ledger.refund(po["bucket"], po["qty"] * po["entry_price"])
+                except RuntimeError:
+                    pass
             self.aud.log("entry_order_cancelled", {"symbol": symbol, "order_id": oid})
             self._publish(format_info(symbol, "entry cancelled — time expired", {"minutes": settings.entry_cancel_minutes}))
-            del self.pending_orders[symbol]
+            with self._mutating():
+                del self.pending_orders[symbol]
 
-    def reconcile_positions(self):
+    def _promote_filled_orders(self):
         pos_list = [] if settings.dry_run else get_positions()
 
         for symbol, po in list(self.pending_orders.items()):
@@ -364,103 +563,223 @@ class Engine:
                     opened_at=now_et().isoformat(),
                     bucket=po.get("bucket"),
                 )
-                self.positions.append(ps)
+                with self._mutating():
+                    self.positions.append(ps)
+                    del self.pending_orders[symbol]
+                account.invalidate()
                 self.aud.log("position_opened", {"symbol": symbol, "entry": ps.entry_price, "target": ps.target_price, "qty": ps.qty, "mode": self.mode})
                 self._publish(format_info(symbol, "position opened", {"entry": ps.entry_price, "target": ps.target_price, "qty": ps.qty}))
-                del self.pending_orders[symbol]
 
+    def _close_position(self, ps: PositionState, exit_price: float, reason: str):
+        proceeds = ps.qty * exit_price
+        if ps.bucket:
+            self.ledger.add_unsettled_on_sell(ps.bucket, proceeds, now_et())
+        realized = (exit_price - ps.entry_price) * ps.qty
+        with self._mutating():
+            self.daily_realized_usd += realized
+            self.per_symbol_last_exit[ps.symbol] = now_et()
+            self.positions.remove(ps)
+        account.invalidate()
+        self.aud.log("position_closed", {"symbol": ps.symbol, "exit_price": exit_price, "realized": realized, "reason": reason})
+        self._publish(format_close(ps.symbol, exit_price, realized, reason))
+
+    def _manage_position(self, ps: PositionState, lp: float, snap: MarketSnapshot):
+        """
+        Apply exit rules to one open position at last price `lp`, reading
+        bars/ATR from the tick's shared snapshot.
+        """
+        if ps.max_price is None:
+            ps.max_price = lp
+        else:
+            ps.max_price = max(ps.max_price, lp)
+
+        if friday_flatten_due():
+            self._close_position(ps, ps.target_price, "friday_flatten")
+            return
+
+        if lp >= ps.target_price:
+            self._close_position(ps, ps.target_price, "target_hit")
+            return
+
+        # MAE early cut: if price drops more than k*ATR below entry before target, exit early
+        if settings.mae_k_atr > 0:
+            a = snap.atr(ps.symbol)
+            if a > 0 and lp < (ps.entry_price - settings.mae_k_atr * a):
+                self._close_position(ps, lp, "mae_cut")
+                return
+
+        # ATR trailing stop (optional, mostly in power window)
+        if settings.atr_trail_k > 0:
+            if not settings.exit_in_power_window_only or in_power_window():
+                a = snap.atr(ps.symbol)
+                if a > 0:
+                    proposed = ps.max_price - settings.atr_trail_k * a
+                    ps.trail_stop = (proposed if ps.trail_stop is None else max(ps.trail_stop, proposed))
+                    if ps.trail_stop is not None and lp < ps.trail_stop and lp > ps.entry_price:
+                        self._close_position(ps, lp, "atr_trail_stop")
+                        return
+
+    def _atr_exits_active(self) -> bool:
+        trail = settings.atr_trail_k > 0 and (not settings.exit_in_power_window_only or in_power_window())
+        return settings.mae_k_atr > 0 or trail
+
+    def reconcile_positions(self):
+        self._promote_filled_orders()
+        if not self.positions:
+            return
+
+        # One price request and one bar fetch per held symbol, shared by every exit rule;
+        # bars are only fetched up front when an ATR-based exit can fire this tick
+        snap = MarketSnapshot(self._indicators_for)
+        snap.prefetch((ps.symbol for ps in self.positions), bars=self._atr_exits_active())
         for ps in list(self.positions):
-            lp = latest_trade_price(ps.symbol)
+            lp = snap.price(ps.symbol)
             if lp is None:
                 continue
+            self._manage_position(ps, lp, snap)
 
-            if ps.max_price is None:
-                ps.max_price = lp
-            else:
-                ps.max_price = max(ps.max_price, lp)
-
-            if friday_flatten_due():
-                exit_price = ps.target_price
-                proceeds = ps.qty * exit_price
-                if ps.bucket:
-                    self.ledger.add_unsettled_on_sell(ps.bucket, proceeds, now_et())
-                realized = (exit_price - ps.entry_price) * ps.qty
-                self.daily_realized_usd += realized
-                self.per_symbol_last_exit[ps.symbol] = now_et()
-                self.positions.remove(ps)
-                self.aud.log("position_closed", {"symbol": ps.symbol, "exit_price": exit_price, "realized": realized, "reason": "friday_flatten"})
-                self._publish(format_close(ps.symbol, exit_price, realized, "friday_flatten"))
-                continue
+    def _maybe_prewarm(self):
+        """
+        Warm pooled REST connections shortly before each entry window opens.
+        """
+        lead = settings.http_prewarm_lead_sec
+        t = now_et()
+        if lead <= 0 or t.weekday() >= 5:
+            return
+        for name, hhmm in (("morning", settings.morning_start), ("power", settings.power_start)):
+            key = f"{t.date().isoformat()}:{name}"
+            secs = (parse_time_et(hhmm) - t).total_seconds()
+            if 0 <= secs <= lead and key not in self._prewarmed:
+                self._prewarmed.add(key)
+                prewarm_connections()
+
+    def tick(self, resync: bool = False):
+        with tracing.trace("tick", mode=self.mode), TICK_SECONDS.time():
+            self._maybe_prewarm()
+            if resync:
+                with _stage("resync"):
+                    self._resync_bars()
+            with _stage("cancel_stale"):
+                self.cancel_stale_entries()
+            with _stage("reconcile"):
+                self.reconcile_positions()
+            with _stage("scan"):
+                self.scan_and_enter()
 
-            if lp >= ps.target_price:
-                exit_price = ps.target_price
-                proceeds = ps.qty * exit_price
-                if ps.bucket:
-                    self.ledger.add_unsettled_on_sell(ps.bucket, proceeds, now_et())
-                realized = (exit_price - ps.entry_price) * ps.qty
-                self.daily_realized_usd += realized
-                self.per_symbol_last_exit[ps.symbol] = now_et()
-                self.positions.remove(ps)
-                self.aud.log("position_closed", {"symbol": ps.symbol, "exit_price": exit_price, "realized": realized, "reason": "target_hit"})
-                self._publish(format_close(ps.symbol, exit_price, realized, "target_hit"))
-                continue
+    # --- Stream-driven mode ---
+
+    def on_stream_event(self, ev: dict):
+        """
+        Feed one Alpaca market data event (called from the server's event loop).
+        Only bars and trades are queued; the engine thread does the work.
+        """
+        if settings.engine_mode != "stream" or not isinstance(ev, dict):
+            return
+        self.stream_last_msg = time.monotonic()
+        kind = ev.get("T")
+        symbol = ev.get("S")
+        if not symbol:
+            return
+        try:
+            if kind in ("b", "u"):
+                bar = {k: ev[k] for k in ("t", "o", "h", "l", "c", "v") if k in ev}
+                self._stream_events.put_nowait((kind, symbol, bar))
+            elif kind == "t" and ev.get("p") is not None:
+                self.last_trade[symbol] = float(ev["p"])
+                if any(ps.symbol == symbol for ps in self.positions):
+                    self._stream_events.put_nowait(("t", symbol, float(ev["p"])))
+        except queue.Full:
+            self.stream_dropped += 1
+
+    def set_stream_connected(self, connected: bool):
+        self.stream_connected = connected
+        if connected:
+            self.stream_last_msg = time.monotonic()
+            # Bars may have closed while we were disconnected; resync caches over REST first
+            self._stream_resync = True
+
+    def stream_alive(self) -> bool:
+        return self.stream_connected and (time.monotonic() - self.stream_last_msg) < settings.stream_stale_sec
+
+    def _handle_stream_event(self, kind: str, symbol: str, payload):
+        if kind in ("b", "u"):
+            bar_cache.ingest(symbol, payload)
+            if kind == "b":
+                # A closed bar: evaluate this symbol now rather than on the next poll
+                with tracing.trace("stream_bar", symbol=symbol):
+                    self.scan_and_enter(symbols=[symbol])
+        elif kind == "t":
+            snap = MarketSnapshot(self._indicators_for, refresh=False)
+            with tracing.trace("stream_trade", symbol=symbol, price=payload):
+                for ps in list(self.positions):
+                    if ps.symbol == symbol:
+                        self._manage_position(ps, payload, snap)
+
+    def _stream_housekeeping(self):
+        with tracing.trace("housekeeping", mode=self.mode):
+            self._maybe_prewarm()
+            self.cancel_stale_entries()
+            self._promote_filled_orders()
+            # Time-based exits (e.g. Friday flatten) still need checking without new prints
+            snap = MarketSnapshot(self._indicators_for, refresh=False, prices=self.last_trade)
+            for ps in list(self.positions):
+                lp = snap.price(ps.symbol)
+                if lp is not None:
+                    self._manage_position(ps, lp, snap)
+
+    def _stream_loop(self):
+        next_poll = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_poll or self._stream_resync:
+                    if self.stream_alive() and not self._stream_resync:
+                        self._stream_housekeeping()
+                    else:
+                        resync, self._stream_resync = self._stream_resync, False
+                        self.tick(resync=resync)  # stream down, stale or just reconnected: poll over REST
+                    next_poll = time.monotonic() + settings.engine_poll_sec
+                try:
+                    kind, symbol, payload = self._stream_events.get(timeout=max(0.05, next_poll - time.monotonic()))
+                except queue.Empty:
+                    continue
+                self._handle_stream_event(kind, symbol, payload)
+            except KeyboardInterrupt:
+                break
+            except Exception as e:
+                self.aud.log("engine_error", {"msg": str(e)})
+                self._publish(f"engine: error — {e}")
+                time.sleep(2)
 
-            # MAE early cut: if price drops more than k*ATR below entry before target, exit early
-            if settings.mae_k_atr > 0:
-                bars = get_bars(ps.symbol, limit=max(50, settings.atr_len + 2)) or []
-                if bars:
-                    dfx = pd.DataFrame(bars).rename(columns={"h": "high", "l": "low", "c": "close"})
-                    atr = _calc_atr(dfx[["high", "low", "close"]], settings.atr_len)
-                    if atr > 0 and lp < (ps.entry_price - settings.mae_k_atr * atr):
-                        exit_price = lp
-                        proceeds = ps.qty * exit_price
-                        if ps.bucket:
-                            self.ledger.add_unsettled_on_sell(ps.bucket, proceeds, now_et())
-                        realized = (exit_price - ps.entry_price) * ps.qty
-                        self.daily_realized_usd += realized
-                        self.per_symbol_last_exit[ps.symbol] = now_et()
-                        self.positions.remove(ps)
-                        self.aud.log("position_closed", {"symbol": ps.symbol, "exit_price": exit_price, "realized": realized, "reason": "mae_cut"})
-                        self._publish(format_close(ps.symbol, exit_price, realized, "mae_cut"))
-                        continue
-
-            # ATR trailing stop (optional, mostly in power window)
-            if settings.atr_trail_k > 0:
-                if not settings.exit_in_power_window_only or in_power_window():
-                    bars = get_bars(ps.symbol, limit=max(50, settings.atr_len + 2)) or []
-                    if bars:
-                        dfx = pd.DataFrame(bars).rename(columns={"h": "high", "l": "low", "c": "close"})
-                        atr = _calc_atr(dfx[["high", "low", "close"]], settings.atr_len)
-                        if atr > 0:
-                            proposed = ps.max_price - settings.atr_trail_k * atr
-                            ps.trail_stop = (proposed if ps.trail_stop is None else max(ps.trail_stop, proposed))
-                            if ps.trail_stop is not None and lp < ps.trail_stop and lp > ps.entry_price:
-                                exit_price = lp
-                                proceeds = ps.qty * exit_price
-                                if ps.bucket:
-                                    self.ledger.add_unsettled_on_sell(ps.bucket, proceeds, now_et())
-                                realized = (exit_price - ps.entry_price) * ps.qty
-                                self.daily_realized_usd += realized
-                                self.per_symbol_last_exit[ps.symbol] = now_et()
-                                self.positions.remove(ps)
-                                self.aud.log("position_closed", {"symbol": ps.symbol, "exit_price": exit_price, "realized": realized, "reason": "atr_trail_stop"})
-                                self._publish(format_close(ps.symbol, exit_price, realized, "atr_trail_stop"))
-                                continue
+    def check_request_budget(self) -> Dict:
+        """
+        Warn if the configured watchlist and tick rate would exceed Alpaca's REST limit.
+        """
+        plan = plan_request_budget(len(settings.watchlist))
+        if plan["over_limit"]:
+            logger.warning("Projected Alpaca REST usage %s/min exceeds limit %s/min", plan["total_per_min"], plan["limit_per_min"])
+            self._publish(
+                f"system: projected API usage ~{plan['total_per_min']:.0f}/min exceeds the {plan['limit_per_min']}/min limit — "
+                "shrink the watchlist or raise ENGINE_POLL_SEC"
+            )
+        return plan
 
     def loop(self):
         self.refresh_mode()
         for sym in settings.watchlist:
             earnings.refresh_symbol(sym)
+        self.check_request_budget()
+
+        if settings.engine_mode == "stream":
+            self._stream_loop()
+            return
 
         while True:
             try:
-                self.cancel_stale_entries()
-                self.reconcile_positions()
-                self.scan_and_enter()
-                time.sleep(5)
+                self.tick()
+                time.sleep(settings.engine_poll_sec)
             except KeyboardInterrupt:
                 break
             except Exception as e:
                 self.aud.log("engine_error", {"msg": str(e)})
                 self._publish(f"engine: error — {e}")
-                time.sleep(2)
\ No newline at end of file
+                time.sleep(2)
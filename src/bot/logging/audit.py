@@ -1,12 +1,193 @@
+import atexit
+import glob
+import gzip
 import json
+import os
+import queue
+import shutil
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import logging
+
+from bot.config.settings import settings
+from bot.logging.tracing import current_trace_id
+
+logger = logging.getLogger("limitless.audit")
+
+_FLUSH = object()  # queue marker: write everything before it, then set the paired Event
+
 
 class Auditor:
-    def __init__(self, path: str = "bot_audit.log"):
+    """
+    Append-only JSON-lines audit log.
+
+    log() only timestamps the record and puts it on a bounded queue; a
+    background thread serializes and writes records in batches. fsync policy:
+    "batch" after every write, "interval" at most every AUDIT_FLUSH_SEC,
+    "never" leaves it to the OS. The file is rotated once it passes
+    AUDIT_ROTATE_MB or AUDIT_ROTATE_HOURS; rotated segments are gzipped and
+    only the newest AUDIT_KEEP are kept. If the queue is full the record is
+    dropped and counted rather than blocking the caller. Records logged inside
+    a trace carry its trace_id.
+    """
+
+    def __init__(
+        self,
+        path: str = "bot_audit.log",
+        max_queue: int = settings.audit_queue_size,
+        flush_sec: float = settings.audit_flush_sec,
+        fsync: str = settings.audit_fsync,
+        rotate_mb: float = settings.audit_rotate_mb,
+        rotate_hours: float = settings.audit_rotate_hours,
+        keep: int = settings.audit_keep,
+        batch: int = 512,
+    ):
         self.path = path
+        self.flush_sec = max(0.01, flush_sec)
+        self.fsync = fsync
+        self.rotate_bytes = int(rotate_mb * 1024 * 1024) if rotate_mb > 0 else 0
+        self.rotate_sec = rotate_hours * 3600.0 if rotate_hours > 0 else 0.0
+        self.keep = keep
+        self.batch = max(1, batch)
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self._fh = None
+        self._opened_at = 0.0
+        self._last_sync = 0.0
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
 
     def log(self, event: str, payload: Dict[str, Any]):
-        rec = {"ts": datetime.utcnow().isoformat() + "Z", "event": event, "payload": payload}
-        with open(self.path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(rec) + "\n")
\ No newline at end of file
+        if self._closed:
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self._q.put_nowait((datetime.utcnow().isoformat() + "Z", event, payload, current_trace_id()))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning("Audit queue full; %d records dropped", self.dropped)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything logged so far is written (and fsynced unless fsync=never)."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._q.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Drain the queue, close the file and stop the writer. Later log() calls are ignored."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None and self._thread.is_alive():
+            try:
+                self._q.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queued": self._q.qsize(), "written": self.written, "dropped": self.dropped, "rotations": self.rotations}
+
+    # --- writer thread ---
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _open(self):
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _run(self):
+        stop = False
+        while not stop:
+            try:
+                item = self._q.get(timeout=self.flush_sec)
+            except queue.Empty:
+                self._sync(force=False)
+                continue
+            items = [item]
+            while len(items) < self.batch:
+                try:
+                    items.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            lines: List[str] = []
+            waiters: List[threading.Event] = []
+            for it in items:
+                if it is None:
+                    stop = True
+                elif isinstance(it, tuple) and it[0] is _FLUSH:
+                    waiters.append(it[1])
+                else:
+                    ts, event, payload, trace_id = it
+                    rec = {"ts": ts, "event": event, "payload": payload}
+                    if trace_id:
+                        rec["trace_id"] = trace_id
+                    lines.append(json.dumps(rec, default=str))
+            try:
+                if lines:
+                    self._write(lines)
+                self._sync(force=bool(waiters) or stop or self.fsync == "batch")
+            except OSError as e:
+                logger.error("Audit write failed: %s", e)
+            for w in waiters:
+                w.set()
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def _write(self, lines: List[str]):
+        if self._fh is None:
+            self._open()
+        self._fh.write("\n".join(lines) + "\n")
+        self.written += len(lines)
+        if self._rotation_due():
+            self._rotate()
+
+    def _sync(self, force: bool):
+        if self._fh is None:
+            return
+        now = time.time()
+        if not force and now - self._last_sync < self.flush_sec:
+            return
+        self._fh.flush()
+        if self.fsync != "never":
+            os.fsync(self._fh.fileno())
+        self._last_sync = now
+
+    def _rotation_due(self) -> bool:
+        if self.rotate_bytes and self._fh.tell() >= self.rotate_bytes:
+            return True
+        return bool(self.rotate_sec) and time.time() - self._opened_at >= self.rotate_sec
+
+    def _rotate(self):
+        self._sync(force=True)
+        self._fh.close()
+        self._fh = None
+        # Microsecond stamps keep segment names unique and lexically ordered
+        segment = f"{self.path}.{datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')}"
+        os.replace(self.path, segment)
+        self._open()
+        self.rotations += 1
+        with open(segment, "rb") as src, gzip.open(segment + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(segment)
+        if self.keep > 0:
+            for old in sorted(glob.glob(f"{glob.escape(self.path)}.*.gz"))[:-self.keep]:
+                os.remove(old)
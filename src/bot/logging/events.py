@@ -1,24 +1,24 @@
-import asyncio
 from typing import Optional
 
-# Global async queue for human-readable operator log lines
-_EVENTS_QUEUE: "asyncio.Queue[str]" = asyncio.Queue()
+from bot.api.broadcast import BroadcastHub
+from bot.logging.tracing import current_trace_id
 
-async def publish(line: str):
+# Human-readable operator log lines, fanned out to every /events client
+hub = BroadcastHub("events")
+
+async def publish(line: str, trace_id: Optional[str] = None):
     """
-    Publish a single-line operator message.
+    Publish a single-line operator message. Lines raised inside a trace end
+    with "[trace <id>]" so they can be matched to audit records and spans.
     """
+    trace_id = trace_id or current_trace_id()
+    if trace_id:
+        line = f"{line} [trace {trace_id}]"
     try:
-        await _EVENTS_QUEUE.put(line)
+        hub.publish(line)
     except Exception:
         pass
 
-def get_queue() -> "asyncio.Queue[str]":
-    """
-    Expose the queue for server streaming.
-    """
-    return _EVENTS_QUEUE
-
 # --- Plain-English format helpers ---
 
 def fmt_skip(symbol: str, reason: str, details: Optional[dict] = None) -> str:
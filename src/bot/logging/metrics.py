@@ -0,0 +1,294 @@
+import contextvars
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# In-process metrics served at GET /metrics in the Prometheus text format.
+# Metrics are declared once at module level (like loggers) and recording is a
+# dict lookup plus a short locked update, cheap enough to stay on in
+# production. Values that already live elsewhere (hub depths, cache stats)
+# are read at scrape time by collectors instead of being recorded twice.
+
+# Latency buckets in seconds: REST calls and ticks sit between a few ms and a few s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Set by muted(): recording in this context (thread / task) is dropped
+_muted: contextvars.ContextVar[bool] = contextvars.ContextVar("limitless_metrics_muted", default=False)
+
+Sample = Tuple[Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]  # name, type, help, samples
+
+
+def _fmt_value(v: float) -> str:
+    if v != v:
+        return "NaN"
+    if v in (float("inf"), float("-inf")):
+        return "+Inf" if v > 0 else "-Inf"
+    if v == int(v) and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+class _Timer:
+    """Context manager that observes the elapsed time of its block in seconds."""
+
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        if _muted.get():
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float):
+        if _muted.get():
+            return
+        self.value = value
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        if _muted.get():
+            return
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Metric(ABC):
+    """
+    A named metric with optional labels. labels(*values) returns the child that
+    records for one label combination; a metric without labels records directly.
+    Hot paths can keep a reference to a child to skip the lookup.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        self._solo = None if self.labelnames else self.labels()
+
+    @abstractmethod
+    def _new_child(self):
+        ...
+
+    def labels(self, *values) -> object:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+            if not self.labelnames:
+                self._solo = self._children.setdefault((), self._new_child())
+
+    def _items(self):
+        with self._lock:
+            return list(self._children.items())
+
+    def samples(self) -> List[Sample]:
+        return [(dict(zip(self.labelnames, key)), child.value) for key, child in self._items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._solo.inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._solo.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._solo.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._solo.dec(amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self._solo.observe(value)
+
+    def time(self) -> _Timer:
+        return _Timer(self._solo)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, child in self._items():
+            labels = dict(zip(self.labelnames, key))
+            with child._lock:
+                counts, total, n = list(child.counts), child.sum, child.count
+            cum = 0
+            for bound, c in zip(self.bounds + (float("inf"),), counts):
+                cum += c
+                lines.append(f"{self.name}_bucket{_fmt_labels({**labels, 'le': _fmt_value(bound)})} {cum}")
+            lines.append(f"{self.name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(labels)} {n}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, help: str, labelnames: Sequence[str], **kw) -> Metric:
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, labelnames, **kw)
+            elif not isinstance(m, cls) or m.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered as a different {m.kind}")
+            return m
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def add_collector(self, fn: Callable[[], Iterable[Family]]):
+        """
+        Register fn() -> [(name, type, help, [(labels, value), ...]), ...],
+        called on every scrape for values that are tracked elsewhere.
+        """
+        with self._lock:
+            if fn not in self._collectors:
+                self._collectors.append(fn)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+            collectors = list(self._collectors)
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            if isinstance(m, Histogram):
+                lines.extend(m.render())
+            else:
+                lines.extend(f"{m.name}{_fmt_labels(labels)} {_fmt_value(v)}" for labels, v in m.samples())
+        for fn in collectors:
+            try:
+                families = list(fn())
+            except Exception as e:
+                lines.append(f"# collector {getattr(fn, '__name__', fn)} failed: {_escape(str(e))}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_fmt_labels(labels)} {_fmt_value(v)}" for labels, v in samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+add_collector = registry.add_collector
+
+
+@contextmanager
+def muted() -> Iterator[None]:
+    """
+    Drop metrics recorded inside the block (e.g. an in-process backtest), so
+    simulated work never shows up in the live /metrics. Other threads and
+    tasks keep recording.
+    """
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,153 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+import logging
+
+from bot.config.settings import settings
+
+logger = logging.getLogger("limitless.tracing")
+
+# Lightweight in-process tracing. Each engine tick runs inside trace(), which
+# opens a root span with a fresh trace ID; stages and adapter calls open child
+# spans with span(). The active span lives in a ContextVar, so it follows the
+# code across await points and asyncio.to_thread(); work handed to a thread
+# pool must go through submit() to carry it along. Outside a trace span() is a
+# no-op. Audit records and operator events are stamped with current_trace_id().
+# With TRACE_EXPORT on, finished spans are written as JSON lines to TRACE_FILE
+# (see scripts/trace_flame.py to turn them into folded stacks).
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("limitless_span", default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attrs", "start", "dur_ms", "error", "_t0")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self.dur_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self):
+        self.dur_ms = (time.perf_counter() - self._t0) * 1000.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "dur_ms": round(self.dur_ms, 3) if self.dur_ms is not None else None,
+            "thread": threading.current_thread().name,
+            "attrs": self.attrs,
+        }
+        if self.error:
+            d["error"] = self.error
+        return d
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def _export(sp: Span):
+    global _exporter
+    if not settings.trace_export:
+        return
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                # Spans share the audit log's batched, rotating writer; imported here
+                # because audit imports this module for current_trace_id()
+                from bot.logging.audit import Auditor
+                _exporter = Auditor(settings.trace_file, fsync="never")
+    _exporter.log("span", sp.to_dict())
+
+
+def close():
+    """Flush and close the span export file."""
+    if _exporter is not None:
+        _exporter.close()
+
+
+@contextmanager
+def _run(sp: Span) -> Iterator[Span]:
+    token = _current.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        sp.finish()
+        try:
+            _export(sp)
+        except Exception as e:
+            logger.debug("Span export failed: %s", e)
+
+
+@contextmanager
+def trace(name: str, **attrs) -> Iterator[Span]:
+    """Start a new trace whose root span covers the block."""
+    with _run(Span(name, _new_id(8), None, attrs)) as sp:
+        yield sp
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Optional[Span]]:
+    """Child span of the active span; yields None (and records nothing) outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    with _run(Span(name, parent.trace_id, parent.span_id, attrs)) as sp:
+        yield sp
+
+
+@contextmanager
+def detached() -> Iterator[None]:
+    """Run the block outside any active trace, so its spans record nothing."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    sp = _current.get()
+    return sp.trace_id if sp is not None else None
+
+
+def set_attrs(**attrs):
+    """Add attributes to the active span, if any."""
+    sp = _current.get()
+    if sp is not None:
+        sp.attrs.update(attrs)
+
+
+def submit(pool: Executor, fn: Callable[..., Any], *args, **kwargs) -> Future:
+    """pool.submit() that runs fn in a copy of the caller's context, so its spans join the caller's trace."""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
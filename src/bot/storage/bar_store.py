@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+import logging
+
+import numpy as np
+import pandas as pd
+
+from bot.config.settings import settings
+from bot.strategy.fast_rules import BarArrays
+
+logger = logging.getLogger("limitless.bar_store")
+TZ_ET = ZoneInfo("America/New_York")
+
+# Row order of a day file; prices/volume are float64 stored bit-for-bit in the int64 array
+COLUMNS = ("t", "o", "h", "l", "c", "v", "n", "vw")
+
+Bar = Dict[str, Any]
+
+
+def _default_feed() -> str:
+    # Imported lazily: the adapter reads through this store
+    from bot.broker.alpaca_adapter import _select_feed
+    return _select_feed()
+
+
+def _atomic_write(path: str, write: Callable[[Any], None], mode: str = "wb"):
+    tmp = f"{path}.tmp"
+    with open(tmp, mode) as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _parse_rfc3339(s: str) -> datetime:
+    return datetime.fromisoformat(s.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def _to_ns(dt: datetime) -> int:
+    return int(np.datetime64(dt.astimezone(timezone.utc).replace(tzinfo=None), "ns").astype(np.int64))
+
+
+def _et_midnight(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=TZ_ET)
+
+
+def bars_to_matrix(bars: List[Bar]) -> np.ndarray:
+    """Alpaca bar dicts -> (len(COLUMNS), n) int64 day matrix."""
+    m = np.empty((len(COLUMNS), len(bars)), dtype=np.int64)
+    m[0] = np.array([b["t"].replace("Z", "") for b in bars], dtype="datetime64[ns]").astype(np.int64)
+    vals = np.array([[b["o"], b["h"], b["l"], b["c"], b["v"], b.get("n", np.nan), b.get("vw", np.nan)] for b in bars], dtype=np.float64).reshape(-1, 7)
+    m[1:] = vals.T.view(np.int64)
+    return m
+
+
+def matrix_to_arrays(m: np.ndarray) -> BarArrays:
+    """Zero-copy column views over a day matrix (or a concatenation of them)."""
+    return BarArrays(
+        t=m[0].view("datetime64[ns]"),
+        open=m[1].view(np.float64),
+        high=m[2].view(np.float64),
+        low=m[3].view(np.float64),
+        close=m[4].view(np.float64),
+        volume=m[5].view(np.float64),
+    )
+
+
+def matrix_to_bars(m: np.ndarray) -> List[Bar]:
+    ts = np.datetime_as_string(m[0].view("datetime64[ns]"), unit="s")
+    vals = m[1:].view(np.float64).T.tolist()
+    out = []
+    for t, (o, h, l, c, v, n, vw) in zip(ts.tolist(), vals):
+        bar = {"t": t + "Z", "o": o, "h": h, "l": l, "c": c, "v": int(v) if v.is_integer() else v}
+        if n == n:
+            bar["n"] = int(n)
+        if vw == vw:
+            bar["vw"] = vw
+        out.append(bar)
+    return out
+
+
+class BarStore:
+    """
+    Minute bars on disk, one file per data feed, symbol and ET trading day:
+
+        <root>/<feed>/<SYMBOL>/<YYYY-MM-DD>.npy  int64 (8, n): t in ns UTC, then o/h/l/c/v/n/vw
+        <root>/<feed>/<SYMBOL>/index.json        {"YYYY-MM-DD": {"n": bars, "first": t, "last": t}}
+
+    The feed (iex | sip) is resolved on every access, so switching between
+    paper and live creds, or ALPACA_DATA_FEED, never serves one feed's bars
+    (and volume) as the other's.
+
+    Only complete days are stored (days with no bars, i.e. holidays, are
+    indexed with n=0 and no file). Day files are memory-mapped on read, so
+    columns come back as NumPy views without copying. Every file is written
+    to a temp name and renamed into place, so a crash never leaves a torn day.
+    """
+
+    def __init__(self, root: str = settings.bar_store_dir, feed: Callable[[], str] = _default_feed):
+        self.root = root
+        self._feed = feed
+        self._indexes: Dict[str, Dict[str, Dict[str, Any]]] = {}  # keyed by symbol dir
+        self._lock = threading.Lock()
+
+    def _dir(self, symbol: str) -> str:
+        return os.path.join(self.root, self._feed().lower(), symbol.upper())
+
+    def _index(self, symbol: str, d: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        d = d or self._dir(symbol)
+        idx = self._indexes.get(d)
+        if idx is None:
+            path = os.path.join(d, "index.json")
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    idx = json.load(f)
+            except FileNotFoundError:
+                idx = {}
+            except (OSError, ValueError) as e:
+                logger.warning("Unreadable bar index %s (%s); starting empty", path, e)
+                idx = {}
+            self._indexes[d] = idx
+        return idx
+
+    def days(self, symbol: str) -> List[str]:
+        with self._lock:
+            return sorted(self._index(symbol))
+
+    def has_day(self, symbol: str, day: str) -> bool:
+        with self._lock:
+            return day in self._index(symbol)
+
+    def read_day(self, symbol: str, day: str) -> Optional[np.ndarray]:
+        """Memory-mapped day matrix, an empty one for a stored holiday, or None if not stored."""
+        d = self._dir(symbol)
+        with self._lock:
+            meta = self._index(symbol, d).get(day)
+        if meta is None:
+            return None
+        if meta["n"] == 0:
+            return np.empty((len(COLUMNS), 0), dtype=np.int64)
+        return np.load(os.path.join(d, f"{day}.npy"), mmap_mode="r")
+
+    def read_range(self, symbol: str, start_day: str, end_day: str) -> BarArrays:
+        """
+        Stored bars for ET days start_day..end_day inclusive. A single day is a
+        view of the mapped file; several days are concatenated.
+        """
+        mats = [m for d in self.days(symbol) if start_day <= d <= end_day
+                for m in [self.read_day(symbol, d)] if m is not None and m.shape[1]]
+        if not mats:
+            return matrix_to_arrays(np.empty((len(COLUMNS), 0), dtype=np.int64))
+        return matrix_to_arrays(mats[0] if len(mats) == 1 else np.concatenate(mats, axis=1))
+
+    def write_day(self, symbol: str, day: str, bars: List[Bar]):
+        d = self._dir(symbol)
+        os.makedirs(d, exist_ok=True)
+        bars = sorted(bars, key=lambda b: b["t"])
+        if bars:
+            m = bars_to_matrix(bars)
+            _atomic_write(os.path.join(d, f"{day}.npy"), lambda f: np.save(f, m))
+            meta = {"n": len(bars), "first": bars[0]["t"], "last": bars[-1]["t"]}
+        else:
+            meta = {"n": 0}
+        with self._lock:
+            idx = self._index(symbol, d)
+            idx[day] = meta
+            snapshot = json.dumps(idx, sort_keys=True)
+            _atomic_write(os.path.join(d, "index.json"), lambda f: f.write(snapshot), mode="w")
+
+    def write_days(self, symbol: str, bars: List[Bar], days: Iterable[str]):
+        """Store `bars` for each ET day in `days` (days without bars are stored empty)."""
+        days = list(days)
+        if not days:
+            return
+        by_day: Dict[str, List[Bar]] = {d: [] for d in days}
+        if bars:
+            et_days = pd.DatetimeIndex([b["t"] for b in bars]).tz_convert(TZ_ET).strftime("%Y-%m-%d")
+            for b, d in zip(bars, et_days):
+                if d in by_day:
+                    by_day[d].append(b)
+        for d in days:
+            self.write_day(symbol, d, by_day[d])
+
+    def read_through(
+        self,
+        symbol: str,
+        limit: int,
+        start: str,
+        end: Optional[str],
+        today: date,
+        fetch: Callable[[str, int, str, Optional[str]], List[Bar]],
+    ) -> List[Bar]:
+        """
+        get_bars() for a start/end range: the leading run of stored days comes
+        from disk, the rest from `fetch`, and any past day the fetch fully
+        covered is stored for next time.
+        """
+        start_dt = _parse_rfc3339(start)
+        end_dt = _parse_rfc3339(end) if end else None
+        d = start_dt.astimezone(TZ_ET).date()
+        last_day = (end_dt.astimezone(TZ_ET).date() if end_dt else today)
+        start_ns = _to_ns(start_dt)
+        end_ns = _to_ns(end_dt) if end_dt else None
+
+        out: List[Bar] = []
+        while d < today and d <= last_day and len(out) < limit:
+            if d.weekday() < 5:
+                m = self.read_day(symbol, d.isoformat())
+                if m is None:
+                    break
+                keep = m[0] >= start_ns
+                if end_ns is not None:
+                    keep &= m[0] <= end_ns
+                out.extend(matrix_to_bars(m[:, keep]))
+            d += timedelta(days=1)
+        if len(out) >= limit or d > last_day:
+            return out[:limit]
+
+        fetch_start = max(start_dt, _et_midnight(d).astimezone(timezone.utc))
+        want = limit - len(out)
+        fetched = fetch(symbol, want, fetch_start.strftime("%Y-%m-%dT%H:%M:%SZ"), end)
+
+        # Past days the fetch saw from their first minute through their last
+        covered = []
+        reached = _parse_rfc3339(fetched[-1]["t"]).astimezone(TZ_ET).date() if fetched else None
+        x = d if fetch_start <= _et_midnight(d) else d + timedelta(days=1)
+        while x < today and x <= last_day:
+            day_end = _et_midnight(x + timedelta(days=1))
+            through = (reached is not None and reached > x) or (len(fetched) < want and (end_dt is None or end_dt >= day_end))
+            if not through:
+                break
+            if x.weekday() < 5:
+                covered.append(x.isoformat())
+            x += timedelta(days=1)
+        if covered:
+            try:
+                self.write_days(symbol, fetched, covered)
+            except OSError as e:
+                logger.warning("Bar store write failed for %s: %s", symbol, e)
+        return out + fetched
+
+
+bar_store = BarStore()
@@ -2,13 +2,20 @@ import json
 import os
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import Any, List, Dict, Tuple
 from zoneinfo import ZoneInfo
+import logging
 
 from bot.config.settings import settings
+from bot.logging import metrics
 
+logger = logging.getLogger("limitless.ledger")
 TZ_ET = ZoneInfo("America/New_York")
 
+LEDGER_WRITES = metrics.counter("ledger_writes_total", "Ledger mutations persisted", ("backend", "op"))
+# kind: "snapshot" (whole file rewritten) or "append" (one journal line)
+LEDGER_WRITE_SECONDS = metrics.histogram("ledger_write_seconds", "Time to persist a ledger write, fsync included", ("backend", "kind"))
+
 def next_settlement_time_et(now_et: datetime) -> datetime:
     # T+1 settlement at ~09:00 ET next business day
     nxt = now_et + timedelta(days=1)
@@ -16,12 +23,42 @@ def next_settlement_time_et(now_et: datetime) -> datetime:
         nxt += timedelta(days=1)
     return nxt.replace(hour=9, minute=0, second=0, microsecond=0)
 
+def _default_buckets() -> List[Dict]:
+    # Two buckets split by total
+    half = round(settings.bucket_init_total_usd / 2.0, 2)
+    return [
+        {"name": "A", "settled_cash": half, "unsettled": []},
+        {"name": "B", "settled_cash": half, "unsettled": []},
+    ]
+
+def _read_snapshot(path: str) -> Tuple[int, List[Dict]]:
+    # Snapshots are {"seq": n, "buckets": [...]}; a bare list is the pre-journal format
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return 0, data
+    return int(data.get("seq", 0)), data["buckets"]
+
+def _atomic_write_json(path: str, obj: Any, **kw):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, **kw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
 @dataclass
 class Lot:
     amount: float
     settles_at_iso: str
 
 class BucketsLedger:
+    """
+    Cash buckets persisted as one JSON file, rewritten (atomically) on every
+    change. Every mutation is expressed as a record applied by _apply() and
+    persisted by _commit(), so other backends only change how records are stored.
+    """
+
     def __init__(self, path: str = settings.bucket_file):
         self.path = path
         self.buckets: List[Dict] = []
@@ -29,36 +66,22 @@ class BucketsLedger:
 
     def load(self):
         if os.path.exists(self.path):
-            with open(self.path, "r", encoding="utf-8") as f:
-                self.buckets = json.load(f)
+            _, self.buckets = _read_snapshot(self.path)
         else:
-            # Initialize two buckets split by total
-            total = settings.bucket_init_total_usd
-            half = round(total / 2.0, 2)
-            self.buckets = [
-                {"name": "A", "settled_cash": half, "unsettled": []},
-                {"name": "B", "settled_cash": half, "unsettled": []},
-            ]
+            self.buckets = _default_buckets()
             self.save()
 
     def save(self):
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(self.buckets, f, indent=2)
+        with LEDGER_WRITE_SECONDS.labels("file", "snapshot").time():
+            _atomic_write_json(self.path, self.buckets, indent=2)
+
+    def close(self):
+        pass
 
     def release_settled(self, now: datetime):
-        changed = False
-        for b in self.buckets:
-            still_unsettled = []
-            for lot in b.get("unsettled", []):
-                settles_at = datetime.fromisoformat(lot["settles_at_iso"])
-                if now >= settles_at:
-                    b["settled_cash"] += lot["amount"]
-                    changed = True
-                else:
-                    still_unsettled.append(lot)
-            b["unsettled"] = still_unsettled
-        if changed:
-            self.save()
+        rec = {"op": "release", "now": now.isoformat()}
+        if self._apply(rec):
+            self._commit(rec)
 
     def pick_bucket(self, needed_cash: float) -> Dict:
         # Return first bucket with sufficient settled cash
@@ -68,23 +91,151 @@ class BucketsLedger:
         return {}
 
     def consume_on_buy(self, bucket_name: str, cash_used: float):
-        for b in self.buckets:
-            if b["name"] == bucket_name:
-                if b["settled_cash"] < cash_used:
-                    raise RuntimeError("Insufficient settled cash.")
-                b["settled_cash"] -= cash_used
-                self.save()
-                return
-        raise RuntimeError("Bucket not found.")
+        rec = {"op": "buy", "bucket": bucket_name, "amount": cash_used}
+        self._apply(rec)
+        self._commit(rec)
+
+    def refund(self, bucket_name: str, amount: float):
+        """Return cash reserved by consume_on_buy for an entry that never filled."""
+        rec = {"op": "refund", "bucket": bucket_name, "amount": amount}
+        self._apply(rec)
+        self._commit(rec)
 
     def add_unsettled_on_sell(self, bucket_name: str, amount: float, now: datetime):
+        rec = {"op": "sell", "bucket": bucket_name, "amount": amount, "settles_at_iso": next_settlement_time_et(now).isoformat()}
+        self._apply(rec)
+        self._commit(rec)
+
+    def _bucket(self, name: str) -> Dict:
         for b in self.buckets:
-            if b["name"] == bucket_name:
-                settles_at = next_settlement_time_et(now)
-                b.setdefault("unsettled", []).append({
-                    "amount": amount,
-                    "settles_at_iso": settles_at.isoformat(),
-                })
-                self.save()
-                return
-        raise RuntimeError("Bucket not found.")
\ No newline at end of file
+            if b["name"] == name:
+                return b
+        raise RuntimeError("Bucket not found.")
+
+    def _apply(self, rec: Dict[str, Any]) -> bool:
+        """Apply one mutation record to self.buckets; False if it changed nothing."""
+        op = rec["op"]
+        if op == "release":
+            now = datetime.fromisoformat(rec["now"])
+            changed = False
+            for b in self.buckets:
+                still_unsettled = []
+                for lot in b.get("unsettled", []):
+                    if now >= datetime.fromisoformat(lot["settles_at_iso"]):
+                        b["settled_cash"] += lot["amount"]
+                        changed = True
+                    else:
+                        still_unsettled.append(lot)
+                b["unsettled"] = still_unsettled
+            return changed
+        b = self._bucket(rec["bucket"])
+        if op == "buy":
+            if b["settled_cash"] < rec["amount"]:
+                raise RuntimeError("Insufficient settled cash.")
+            b["settled_cash"] -= rec["amount"]
+        elif op == "refund":
+            b["settled_cash"] += rec["amount"]
+        elif op == "sell":
+            b.setdefault("unsettled", []).append({"amount": rec["amount"], "settles_at_iso": rec["settles_at_iso"]})
+        else:
+            raise ValueError(f"Unknown ledger op: {op}")
+        return True
+
+    def _commit(self, rec: Dict[str, Any]):
+        LEDGER_WRITES.labels("file", rec["op"]).inc()
+        self.save()
+
+class JournaledBucketsLedger(BucketsLedger):
+    """
+    Ledger that appends each mutation to `<path>.journal` as one fsynced JSON
+    line instead of rewriting the file. Every `snapshot_every` records the
+    state is compacted into `path` (write-then-rename) and the journal is
+    truncated. Loading replays the journal records newer than the snapshot's
+    seq; a torn final line from a crash mid-append is discarded.
+    """
+
+    def __init__(self, path: str = settings.bucket_file, snapshot_every: int = settings.bucket_snapshot_every):
+        self.journal_path = f"{path}.journal"
+        self.snapshot_every = max(1, snapshot_every)
+        self.seq = 0
+        self.pending = 0  # journal records since the last snapshot
+        self._journal = None
+        super().__init__(path)
+
+    def load(self):
+        if os.path.exists(self.path):
+            self.seq, self.buckets = _read_snapshot(self.path)
+        else:
+            self.seq, self.buckets = 0, _default_buckets()
+        snap_seq = self.seq
+        self.pending = 0
+        good = 0  # bytes of the journal that parsed cleanly
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        rec = None
+                    if rec is None:
+                        logger.warning("Discarding torn ledger journal tail at byte %d", good)
+                        break
+                    good += len(line)
+                    if rec["seq"] <= snap_seq:
+                        continue  # already in the snapshot (crash between snapshot and truncate)
+                    self._apply(rec)
+                    self.seq = rec["seq"]
+                    self.pending += 1
+            if good < os.path.getsize(self.journal_path):
+                os.truncate(self.journal_path, good)
+        if not os.path.exists(self.path) or self.pending >= self.snapshot_every:
+            self.save()
+        else:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def save(self):
+        """Compact: snapshot the current state, then start an empty journal."""
+        with LEDGER_WRITE_SECONDS.labels("journal", "snapshot").time():
+            _atomic_write_json(self.path, {"seq": self.seq, "buckets": self.buckets}, indent=2)
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = open(self.journal_path, "w", encoding="utf-8")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        self.pending = 0
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _commit(self, rec: Dict[str, Any]):
+        self.seq += 1
+        LEDGER_WRITES.labels("journal", rec["op"]).inc()
+        with LEDGER_WRITE_SECONDS.labels("journal", "append").time():
+            if self._journal is None:
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+            self._journal.write(json.dumps({"seq": self.seq, **rec}, separators=(",", ":")) + "\n")
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        self.pending += 1
+        if self.pending >= self.snapshot_every:
+            self.save()
+
+def open_ledger(path: str = settings.bucket_file) -> BucketsLedger:
+    """
+    The ledger backend selected by BUCKET_JOURNAL. When the plain backend is
+    selected, a journal left by an earlier journaled run is replayed into the
+    snapshot and removed first, so its committed records are not lost.
+    """
+    if settings.bucket_journal:
+        return JournaledBucketsLedger(path)
+    journal_path = f"{path}.journal"
+    if os.path.exists(journal_path):
+        leftover = JournaledBucketsLedger(path)
+        if leftover.pending:
+            logger.warning("BUCKET_JOURNAL is off; folding %d journaled ledger records into %s", leftover.pending, path)
+            leftover.save()
+        leftover.close()
+        os.remove(journal_path)
+    return BucketsLedger(path)
@@ -0,0 +1,283 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+from zoneinfo import ZoneInfo
+
+from bot.config.settings import Settings, settings
+from bot.strategy.fast_rules import EntryEval
+from bot.strategy.indicators import _ema_alpha
+
+TZ_ET = ZoneInfo("America/New_York")
+
+# Whole-watchlist evaluation: every symbol's window is stacked into one
+# (symbols x bars) matrix, right-aligned so the newest bar of each symbol sits
+# in the last column (shorter histories are NaN-padded on the left). Every
+# indicator and rule is then a handful of array passes over the whole matrix,
+# so per-tick cost barely moves as the watchlist grows.
+
+ENTRY_FLAGS = ("uptrend", "above_vwap", "above_orh", "touched_vwap_recently", "close_back_above", "not_extended")
+
+
+@dataclass
+class Panel:
+    symbols: List[str]
+    t: np.ndarray       # (S, N) datetime64[ns] UTC, NaT where padded
+    open: np.ndarray    # (S, N) float64, NaN where padded
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    lengths: np.ndarray  # (S,) real bars per symbol
+
+
+def _convert(bars: List[Dict[str, Any]]):
+    t = np.array([b["t"].replace("Z", "") for b in bars], dtype="datetime64[ns]")
+    ohlcv = np.array([[b["o"], b["h"], b["l"], b["c"], b["v"]] for b in bars], dtype=np.float64).reshape(-1, 5).T
+    return t, ohlcv
+
+
+def _assemble(symbols: List[str], rows: List[tuple]) -> Panel:
+    lengths = np.array([len(t) for t, _ in rows], dtype=np.int64)
+    S, N = len(symbols), int(lengths.max()) if rows else 0
+    ohlcv = np.full((5, S, N), np.nan, dtype=np.float64)
+    t = np.full((S, N), np.datetime64("NaT"), dtype="datetime64[ns]")
+    for i, (ti, vi) in enumerate(rows):
+        n = len(ti)
+        t[i, N - n:] = ti
+        ohlcv[:, i, N - n:] = vi
+    return Panel(symbols, t, ohlcv[0], ohlcv[1], ohlcv[2], ohlcv[3], ohlcv[4], lengths)
+
+
+def stack_bars(bars_by_symbol: Dict[str, List[Dict[str, Any]]], window: int = settings.bar_cache_window) -> Panel:
+    symbols = [s for s, bars in bars_by_symbol.items() if bars]
+    return _assemble(symbols, [_convert(bars_by_symbol[s][-window:]) for s in symbols])
+
+
+class PanelBuilder:
+    """
+    stack_bars() that remembers each symbol's converted window, so a tick only
+    converts the bars that are new (plus the last one, which may have been
+    revised). Anything that doesn't line up with the cached window is rebuilt.
+    """
+
+    def __init__(self, window: int = settings.bar_cache_window):
+        self.window = window
+        self._rows: Dict[str, tuple] = {}
+        self._last_t: Dict[str, str] = {}
+
+    def _row(self, symbol: str, bars: List[Dict[str, Any]]) -> tuple:
+        bars = bars[-self.window:]
+        cached, last_t = self._rows.get(symbol), self._last_t.get(symbol)
+        row = None
+        if cached is not None:
+            n, j = len(bars), len(bars) - 1
+            while j > 0 and bars[j]["t"] > last_t:
+                j -= 1
+            start = len(cached[0]) - 1 - j  # cached index of bars[0]
+            if bars[j]["t"] == last_t and start >= 0 and cached[0][start] == np.datetime64(bars[0]["t"].replace("Z", ""), "ns"):
+                t_new, v_new = _convert(bars[j:])
+                row = (
+                    np.concatenate([cached[0][start:start + j], t_new]),
+                    np.concatenate([cached[1][:, start:start + j], v_new], axis=1),
+                )
+        if row is None:
+            row = _convert(bars)
+        self._rows[symbol] = row
+        self._last_t[symbol] = bars[-1]["t"]
+        return row
+
+    def build(self, bars_by_symbol: Dict[str, List[Dict[str, Any]]]) -> Panel:
+        symbols = [s for s, bars in bars_by_symbol.items() if bars]
+        return _assemble(symbols, [self._row(s, bars_by_symbol[s]) for s in symbols])
+
+    def drop(self, symbol: str):
+        self._rows.pop(symbol, None)
+        self._last_t.pop(symbol, None)
+
+
+def ema_panel(x: np.ndarray, span: int) -> np.ndarray:
+    """
+    Row-wise ewm(span, adjust=False).mean(), seeded at each row's first value.
+    Loops over bars (columns), not symbols.
+    """
+    alpha = _ema_alpha(span)
+    old_wt = 1.0 - alpha
+    out = np.empty_like(x)
+    prev = np.full(x.shape[0], np.nan)
+    for j in range(x.shape[1]):
+        cur = x[:, j]
+        stepped = (old_wt * prev + alpha * cur) / (old_wt + alpha)
+        prev = np.where(np.isnan(prev), cur, np.where(np.isnan(cur) | (prev == cur), prev, stepped))
+        out[:, j] = prev
+    return out
+
+
+def session_ids(t: np.ndarray) -> np.ndarray:
+    """ET trading date of each cell as an integer day number (-1 where padded)."""
+    flat = pd.DatetimeIndex(t.ravel()).tz_localize("UTC").tz_convert(TZ_ET)
+    days = flat.tz_localize(None).normalize().asi8 // 86_400_000_000_000
+    days = np.where(pd.isna(flat), -1, days)
+    return days.reshape(t.shape)
+
+
+def session_vwap_panel(p: Panel, sessions: np.ndarray) -> np.ndarray:
+    """
+    Cumulative VWAP that restarts at every ET session boundary.
+    """
+    tp = (p.high + p.low + p.close) / 3.0
+    vp = np.nan_to_num(tp * p.volume)
+    vol = np.nan_to_num(p.volume)
+    cum_vp = np.cumsum(vp, axis=1)
+    cum_vol = np.cumsum(vol, axis=1)
+    # Index of the first bar of each cell's session, carried forward
+    N = sessions.shape[1]
+    starts = np.ones_like(sessions, dtype=bool)
+    starts[:, 1:] = sessions[:, 1:] != sessions[:, :-1]
+    first = np.maximum.accumulate(np.where(starts, np.arange(N), 0), axis=1)
+    base_vp = np.take_along_axis(cum_vp - vp, first, axis=1)
+    base_vol = np.take_along_axis(cum_vol - vol, first, axis=1)
+    s_vol = cum_vol - base_vol
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vwap = (cum_vp - base_vp) / s_vol
+    vwap[(s_vol == 0) | np.isnan(p.close)] = np.nan
+    return vwap
+
+
+def true_range_panel(p: Panel) -> np.ndarray:
+    prev_close = np.full_like(p.close, np.nan)
+    prev_close[:, 1:] = p.close[:, :-1]
+    hl = p.high - p.low
+    with np.errstate(invalid="ignore"):
+        tr = np.fmax(hl, np.fmax(np.abs(p.high - prev_close), np.abs(p.low - prev_close)))
+    return tr
+
+
+def wilder_panel_last(tr: np.ndarray, length: int) -> np.ndarray:
+    """
+    Row-wise Wilder ATR of the newest bar: seeded with the mean of each row's
+    first `length` true ranges, then atr = (atr * (length - 1) + tr) / length.
+    Loops over bars (columns), not symbols; NaN where a row is too short.
+    """
+    seen = np.zeros(tr.shape[0], dtype=np.int64)
+    acc = np.zeros(tr.shape[0])
+    atr = np.full(tr.shape[0], np.nan)
+    for j in range(tr.shape[1]):
+        cur = tr[:, j]
+        real = ~np.isnan(cur)
+        seen += real
+        acc = np.where(real & (seen <= length), acc + cur, acc)
+        stepped = (atr * (length - 1) + cur) / length
+        atr = np.where(real & (seen == length), acc / length, np.where(real & (seen > length), stepped, atr))
+    return atr
+
+
+def atr_last(p: Panel, length: int, mode: str = "sma") -> np.ndarray:
+    """ATR (sma | wilder) of the newest bar, 0.0 where fewer than max(3, length) bars exist."""
+    tr = true_range_panel(p)
+    if mode == "wilder":
+        atr = wilder_panel_last(tr, length)
+    else:
+        atr = tr[:, -length:].mean(axis=1) if length <= tr.shape[1] else np.full(len(p.symbols), np.nan)
+    return np.where((p.lengths >= max(3, length)) & ~np.isnan(atr), atr, 0.0)
+
+
+def opening_range_panel(p: Panel, start_et: datetime) -> np.ndarray:
+    start = np.datetime64(int(start_et.timestamp() * 1_000_000), "us").astype("datetime64[ns]")
+    end = np.datetime64(int((start_et + timedelta(minutes=15)).timestamp() * 1_000_000), "us").astype("datetime64[ns]")
+    mask = (p.t >= start) & (p.t < end) & ~np.isnan(p.high)
+    orh = np.where(mask, p.high, -np.inf).max(axis=1, initial=-np.inf)
+    return np.where(mask.any(axis=1), orh, np.nan)
+
+
+def _tail(x: np.ndarray, k: int) -> np.ndarray:
+    return x[:, -k:] if x.shape[1] >= k else x
+
+
+def scan_panel(
+    p: Panel,
+    open_et: datetime,
+    cfg: Settings = settings,
+    ema20: Optional[np.ndarray] = None,
+    ema50: Optional[np.ndarray] = None,
+    vwap: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    Evaluate the newest bar of every symbol. Returns a verdict table indexed by
+    symbol with each entry flag, qualifies/confirmed, price, signal high, RVOL,
+    spread and ATR.
+    """
+    if not p.symbols:
+        return pd.DataFrame(columns=[*ENTRY_FLAGS, "qualifies", "confirmed", "price", "signal_bar_high", "rvol", "spread_pct", "atr"])
+    ema20 = ema_panel(p.close, 20) if ema20 is None else ema20
+    ema50 = ema_panel(p.close, 50) if ema50 is None else ema50
+    vwap = session_vwap_panel(p, session_ids(p.t)) if vwap is None else vwap
+    orh = opening_range_panel(p, open_et)
+
+    close, high, low, v_last = p.close[:, -1], p.high[:, -1], p.low[:, -1], vwap[:, -1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        low3, vwap3 = _tail(p.low, 3), _tail(vwap, 3)
+        touch = (low3 <= vwap3).any(axis=1)
+        v3 = np.where(vwap3 == 0, np.nan, vwap3)
+        dist = np.abs(np.abs(low3 - v3) / v3)
+        near = np.where(np.isnan(dist), np.inf, dist).min(axis=1) <= cfg.vwap_touch_tolerance_pct
+        extension = (close - v_last) / np.where(v_last == 0, np.nan, v_last)
+
+        flags = {
+            "uptrend": ema20[:, -1] > ema50[:, -1],
+            "above_vwap": close > v_last,
+            "above_orh": close > orh,
+            "touched_vwap_recently": touch | near,
+            "close_back_above": close > v_last,
+            "not_extended": extension <= cfg.vwap_extension_max_pct,
+        }
+        qualifies = np.logical_and.reduce([flags[k] for k in ENTRY_FLAGS])
+
+        confirmed = qualifies.copy()
+        if cfg.confirm_higher_low:
+            lows = _tail(p.low, 4)
+            hl = (p.lengths >= 4)
+            if lows.shape[1] == 4:
+                hl &= (lows[:, -1] > lows[:, -2]) & (np.fmin(lows[:, -3], lows[:, -2]) <= lows[:, -2])
+            else:
+                hl &= False
+            confirmed &= hl
+        if cfg.confirm_vwap_reclaim:
+            confirmed &= close > v_last
+        if cfg.require_vwap_retest:
+            w = max(cfg.vwap_retest_lookback, 2)
+            cw, lw, vw = _tail(p.close, w), _tail(p.low, w), _tail(vwap, w)
+            confirmed &= ((cw > vw) & (lw >= vw)).any(axis=1)
+
+        recent = _tail(p.volume, 50)
+        n_recent = np.minimum(p.lengths, recent.shape[1])
+        prior_sum = np.nansum(recent[:, :-1], axis=1)
+        avg = prior_sum / np.maximum(n_recent - 1, 1)
+        rvol = np.where((n_recent >= 5) & (avg > 0), recent[:, -1] / np.where(avg > 0, avg, 1.0), 1.0)
+
+        spread = np.where(close > 0, np.abs(high - low) / np.maximum(1e-6, close), 0.0)
+
+    table = pd.DataFrame({k: flags[k].astype(bool) for k in ENTRY_FLAGS}, index=pd.Index(p.symbols, name="symbol"))
+    table["qualifies"] = qualifies
+    table["confirmed"] = confirmed
+    table["price"] = close
+    table["signal_bar_high"] = high
+    table["rvol"] = rvol
+    table["spread_pct"] = spread
+    table["atr"] = atr_last(p, cfg.atr_len, cfg.atr_mode)
+    return table
+
+
+def verdict_to_eval(row: Mapping[str, Any]) -> EntryEval:
+    info = {k: bool(row[k]) for k in ENTRY_FLAGS}
+    info["price"] = float(row["price"])
+    info["signal_bar_high"] = float(row["signal_bar_high"])
+    return EntryEval(
+        info=info,
+        qualifies=bool(row["qualifies"]),
+        confirmed=bool(row["confirmed"]),
+        rvol=float(row["rvol"]),
+        spread_pct=float(row["spread_pct"]),
+    )
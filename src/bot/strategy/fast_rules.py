@@ -0,0 +1,199 @@
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bot.config.settings import Settings, settings
+from bot.strategy.indicators import _ema_alpha, ema_step
+
+# NumPy versions of strategy.rules and the engine's confirmation/guardrail
+# helpers. Each function returns exactly what its pandas counterpart returns
+# for the same bars (see tests/tests_test_fast_rules.py); they just skip the
+# per-call DataFrame/Series overhead, which dominates on 300-row frames.
+
+
+@dataclass
+class BarArrays:
+    t: np.ndarray  # datetime64[ns], UTC
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    ema20: Optional[np.ndarray] = None
+    ema50: Optional[np.ndarray] = None
+    vwap: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+
+def bars_to_arrays(bars: List[Dict[str, Any]]) -> BarArrays:
+    """Alpaca bar dicts -> contiguous float64 columns."""
+    n = len(bars)
+    t = np.array([b["t"].replace("Z", "") for b in bars], dtype="datetime64[ns]")
+    cols = np.empty((5, n), dtype=np.float64)
+    for i, b in enumerate(bars):
+        cols[0, i] = b["o"]
+        cols[1, i] = b["h"]
+        cols[2, i] = b["l"]
+        cols[3, i] = b["c"]
+        cols[4, i] = b["v"]
+    return BarArrays(t=t, open=cols[0], high=cols[1], low=cols[2], close=cols[3], volume=cols[4])
+
+
+def ema_np(values: np.ndarray, span: int) -> np.ndarray:
+    alpha = _ema_alpha(span)
+    out = np.empty(len(values), dtype=np.float64)
+    prev = math.nan
+    for i, v in enumerate(values.tolist()):
+        prev = ema_step(prev, v, alpha)
+        out[i] = prev
+    return out
+
+
+def compute_vwap_np(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    tp = (high + low + close) / 3.0
+    cum_vp = np.cumsum(tp * volume)
+    cum_vol = np.cumsum(volume)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cum_vol == 0, np.nan, cum_vp / np.where(cum_vol == 0, 1.0, cum_vol))
+
+
+def build_indicators_np(a: BarArrays) -> BarArrays:
+    a.ema20 = ema_np(a.close, 20)
+    a.ema50 = ema_np(a.close, 50)
+    a.vwap = compute_vwap_np(a.high, a.low, a.close, a.volume)
+    return a
+
+
+def with_indicator_columns(a: BarArrays, cols: Dict[str, List[float]]) -> BarArrays:
+    """Attach precomputed ema20/ema50/vwap columns (e.g. IndicatorState.columns)."""
+    a.ema20 = np.asarray(cols["ema20"], dtype=np.float64)
+    a.ema50 = np.asarray(cols["ema50"], dtype=np.float64)
+    a.vwap = np.asarray(cols["vwap"], dtype=np.float64)
+    return a
+
+
+def _to_utc64(dt: datetime) -> np.datetime64:
+    return np.datetime64(int(dt.timestamp() * 1_000_000), "us").astype("datetime64[ns]")
+
+
+def opening_range_np(a: BarArrays, start_et: datetime) -> Tuple[float, float]:
+    start = _to_utc64(start_et)
+    end = _to_utc64(start_et + timedelta(minutes=15))
+    mask = (a.t >= start) & (a.t < end)
+    if not mask.any():
+        return float("nan"), float("nan")
+    return float(np.nanmax(a.high[mask])), float(np.nanmin(a.low[mask]))
+
+
+def qualify_entry_np(a: BarArrays, orh: float, cfg: Settings = settings) -> Dict[str, Any]:
+    close, high, vwap = a.close[-1], a.high[-1], a.vwap[-1]
+    low3, vwap3 = a.low[-3:], a.vwap[-3:]
+    uptrend = a.ema20[-1] > a.ema50[-1]
+    above_vwap = close > vwap
+    above_orh = close > orh
+    vwap_touch = bool((low3 <= vwap3).any())
+    v = np.where(vwap3 == 0, np.nan, vwap3)
+    dist = np.abs(np.abs(low3 - v) / v)
+    dist = dist[~np.isnan(dist)]
+    near_touch = dist.size > 0 and dist.min() <= cfg.vwap_touch_tolerance_pct
+    touched = bool(vwap_touch or near_touch)
+    close_back_above = close > vwap
+    vwap_val = vwap if vwap != 0 else math.nan
+    extension = (close - vwap) / vwap_val
+    not_extended = extension <= cfg.vwap_extension_max_pct
+    return {
+        "uptrend": bool(uptrend),
+        "above_vwap": bool(above_vwap),
+        "above_orh": bool(above_orh),
+        "touched_vwap_recently": bool(touched),
+        "close_back_above": bool(close_back_above),
+        "not_extended": bool(not_extended),
+        "price": float(close),
+        "signal_bar_high": float(high),
+    }
+
+
+def has_higher_low_np(low: np.ndarray, lookback: int = 3) -> bool:
+    if len(low) < (lookback + 1):
+        return False
+    lows = low[-(lookback + 1):]
+    return bool(lows[-1] > lows[-2] and min(lows[-3:-1]) <= lows[-2])
+
+
+def vwap_reclaim_np(a: BarArrays) -> bool:
+    if len(a) == 0 or a.vwap is None:
+        return False
+    return bool(a.close[-1] > a.vwap[-1])
+
+
+def vwap_retest_np(a: BarArrays, lookback: int) -> bool:
+    if len(a) == 0 or a.vwap is None:
+        return False
+    w = max(lookback, 2)
+    return bool(((a.close[-w:] > a.vwap[-w:]) & (a.low[-w:] >= a.vwap[-w:])).any())
+
+
+def estimate_spread_pct_np(a: BarArrays) -> float:
+    if len(a) == 0:
+        return 0.0
+    close = a.close[-1]
+    if close <= 0:
+        return 0.0
+    return float(abs(a.high[-1] - a.low[-1]) / max(1e-6, close))
+
+
+def estimate_rvol_np(volume: np.ndarray, base_len: int = 50) -> float:
+    recent = volume[-base_len:]
+    if len(recent) < 5:
+        return 1.0
+    avg = recent[:-1].mean()
+    cur = recent[-1]
+    if avg <= 0:
+        return 1.0
+    return float(cur / avg)
+
+
+def confirmations_ok_np(a: BarArrays, cfg: Settings = settings) -> bool:
+    if len(a) == 0:
+        return False
+    ok = True
+    if cfg.confirm_higher_low:
+        ok = ok and has_higher_low_np(a.low, lookback=3)
+    if cfg.confirm_vwap_reclaim:
+        ok = ok and vwap_reclaim_np(a)
+    if cfg.require_vwap_retest:
+        ok = ok and vwap_retest_np(a, lookback=cfg.vwap_retest_lookback)
+    return ok
+
+
+@dataclass
+class EntryEval:
+    info: Dict[str, Any]
+    qualifies: bool
+    confirmed: bool
+    rvol: float
+    spread_pct: float
+
+
+def evaluate_entry_np(a: BarArrays, open_et: datetime, cfg: Settings = settings) -> EntryEval:
+    """
+    Full entry pipeline (opening range, qualify_entry, confirmations, RVOL and
+    spread) on arrays. `a` must carry ema20/ema50/vwap.
+    """
+    orh, _ = opening_range_np(a, open_et)
+    info = qualify_entry_np(a, orh, cfg)
+    qualifies = all(info[k] for k in (
+        "uptrend", "above_vwap", "above_orh", "touched_vwap_recently", "close_back_above", "not_extended",
+    ))
+    return EntryEval(
+        info=info,
+        qualifies=qualifies,
+        confirmed=qualifies and confirmations_ok_np(a, cfg),
+        rvol=estimate_rvol_np(a.volume),
+        spread_pct=estimate_spread_pct_np(a),
+    )
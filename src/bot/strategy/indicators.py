@@ -0,0 +1,182 @@
+import math
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from bot.config.settings import settings
+
+TZ_ET = ZoneInfo("America/New_York")
+
+
+def _ema_alpha(span: int) -> float:
+    # Same derivation pandas uses for ewm(span=...)
+    com = (span - 1) / 2.0
+    return 1.0 / (1.0 + com)
+
+
+def ema_step(prev: float, cur: float, alpha: float) -> float:
+    """
+    One step of ewm(adjust=False).mean(), written the way pandas evaluates it so
+    streaming and batch values are bit-identical.
+    """
+    if prev != prev:  # NaN: first observation seeds the average
+        return cur
+    if cur != cur:
+        return prev
+    if prev == cur:
+        return prev
+    old_wt = 1.0 - alpha
+    return (old_wt * prev + alpha * cur) / (old_wt + alpha)
+
+
+def _session_key(t: str) -> str:
+    dt = datetime.fromisoformat(t.replace("Z", "+00:00"))
+    return dt.astimezone(TZ_ET).strftime("%Y-%m-%d")
+
+
+@dataclass
+class IndicatorValues:
+    t: str
+    ema20: float
+    ema50: float
+    vwap: float
+    atr: float
+
+
+class IndicatorState:
+    """
+    Streaming EMA20/EMA50, session VWAP and ATR for one symbol, updated in O(1)
+    per bar. Values match strategy.rules.build_indicators and the engine's
+    _calc_atr over the same bars (VWAP resets at each new ET session).
+
+    Re-sending the most recent bar (same `t`) replaces it, so revised bars from
+    a delta fetch can be applied without replaying history.
+    """
+
+    def __init__(self, atr_len: int = settings.atr_len, atr_mode: str = settings.atr_mode, history: int = settings.bar_cache_window):
+        self.atr_len = atr_len
+        self.atr_mode = atr_mode
+        self.history: Deque[IndicatorValues] = deque(maxlen=history)
+        self._a20 = _ema_alpha(20)
+        self._a50 = _ema_alpha(50)
+        self.last_t: Optional[str] = None
+        self._reset_scalars()
+        self._undo: Optional[tuple] = None
+
+    def _reset_scalars(self):
+        self.ema20 = math.nan
+        self.ema50 = math.nan
+        self._session: Optional[str] = None
+        self._cum_vp = 0.0
+        self._cum_vol = 0.0
+        self._prev_close = math.nan
+        self._trs: Deque[float] = deque(maxlen=self.atr_len)
+        self._wilder = math.nan
+        self.count = 0
+
+    def reset(self):
+        self.history.clear()
+        self.last_t = None
+        self._undo = None
+        self._reset_scalars()
+
+    def _save(self) -> tuple:
+        return (
+            self.ema20, self.ema50, self._session, self._cum_vp, self._cum_vol,
+            self._prev_close, tuple(self._trs), self._wilder, self.count, self.last_t,
+        )
+
+    def _restore(self, snap: tuple):
+        (self.ema20, self.ema50, self._session, self._cum_vp, self._cum_vol,
+         self._prev_close, trs, self._wilder, self.count, self.last_t) = snap
+        self._trs = deque(trs, maxlen=self.atr_len)
+
+    @property
+    def vwap(self) -> float:
+        return self._cum_vp / self._cum_vol if self._cum_vol != 0 else math.nan
+
+    @property
+    def atr(self) -> float:
+        if self.count < max(3, self.atr_len) or len(self._trs) < self.atr_len:
+            return 0.0
+        if self.atr_mode == "wilder":
+            return float(self._wilder)
+        return float(sum(self._trs) / len(self._trs))
+
+    def update(self, bar: Dict[str, Any]) -> Optional[IndicatorValues]:
+        """
+        Apply one Alpaca-shaped bar ({t, o, h, l, c, v}). Bars older than the
+        last one seen are ignored.
+        """
+        t = bar["t"]
+        if self.last_t is not None and t < self.last_t:
+            return None
+        if t == self.last_t and self._undo is not None:
+            self._restore(self._undo)
+            self.history.pop()
+        self._undo = self._save()
+
+        high, low, close, volume = float(bar["h"]), float(bar["l"]), float(bar["c"]), float(bar["v"])
+
+        self.ema20 = ema_step(self.ema20, close, self._a20)
+        self.ema50 = ema_step(self.ema50, close, self._a50)
+
+        session = _session_key(t)
+        if session != self._session:
+            self._session = session
+            self._cum_vp = 0.0
+            self._cum_vol = 0.0
+        tp = (high + low + close) / 3.0
+        self._cum_vp += tp * volume
+        self._cum_vol += volume
+
+        tr = high - low
+        if self._prev_close == self._prev_close:
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._trs.append(tr)
+        self._prev_close = close
+        self.count += 1
+        if len(self._trs) == self.atr_len:
+            if self._wilder != self._wilder:
+                self._wilder = sum(self._trs) / self.atr_len
+            else:
+                self._wilder = (self._wilder * (self.atr_len - 1) + tr) / self.atr_len
+
+        self.last_t = t
+        vals = IndicatorValues(t=t, ema20=self.ema20, ema50=self.ema50, vwap=self.vwap, atr=self.atr)
+        self.history.append(vals)
+        return vals
+
+    def sync(self, bars: List[Dict[str, Any]]) -> "IndicatorState":
+        """
+        Catch up with a window of bars (e.g. from the bar cache), feeding only
+        bars not seen yet. If the window starts after our last bar we've missed
+        data, so replay it from scratch.
+        """
+        if not bars:
+            return self
+        if self.last_t is None or self.last_t < bars[0]["t"]:
+            self.reset()
+            start = 0
+        else:
+            start = len(bars)
+            while start > 0 and bars[start - 1]["t"] >= self.last_t:
+                start -= 1
+        for bar in bars[start:]:
+            self.update(bar)
+        return self
+
+    def columns(self, n: int) -> Dict[str, List[float]]:
+        """
+        ema20/ema50/vwap for the newest `n` bars, NaN-padded at the front if
+        fewer have been seen.
+        """
+        tail = list(self.history)[-n:] if n > 0 else []
+        pad = [math.nan] * (n - len(tail))
+        return {
+            "ema20": pad + [v.ema20 for v in tail],
+            "ema50": pad + [v.ema50 for v in tail],
+            "vwap": pad + [v.vwap for v in tail],
+        }
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bot.broker.account import AccountSnapshot
+from bot.broker.alpaca_adapter import AccountInfo
+from bot.config.settings import settings
+
+
+class SlowFetch:
+    def __init__(self, delay=0.05):
+        self.calls = 0
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return AccountInfo(equity=1000.0 + self.calls, buying_power=2000.0, is_paper=True)
+
+    async def aio(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return AccountInfo(equity=1000.0 + self.calls, buying_power=2000.0, is_paper=True)
+
+def test_ttl_serves_cached_value():
+    fetch = SlowFetch(0)
+    snap = AccountSnapshot(ttl=0.2, fetch=fetch)
+    assert snap.get().equity == 1001.0
+    assert snap.get().equity == 1001.0 and fetch.calls == 1
+    time.sleep(0.25)
+    assert snap.get().equity == 1002.0
+    assert snap.get(max_age=0).equity == 1003.0
+
+def test_concurrent_threads_share_one_request():
+    fetch = SlowFetch()
+    snap = AccountSnapshot(ttl=5, fetch=fetch)
+    with ThreadPoolExecutor(8) as pool:
+        got = list(pool.map(lambda _: snap.get().equity, range(16)))
+    assert fetch.calls == 1 and set(got) == {1001.0}
+
+def test_waiters_outlast_an_owner_that_is_retrying(monkeypatch):
+    monkeypatch.setattr(settings, "http_timeout_sec", 0.01)
+    fetch = SlowFetch(0.1)  # well past 2x the per-request timeout, as with retries and backoff
+    snap = AccountSnapshot(ttl=5, fetch=fetch)
+    with ThreadPoolExecutor(4) as pool:
+        got = list(pool.map(lambda _: snap.get().equity, range(4)))
+    assert fetch.calls == 1 and set(got) == {1001.0}
+
+def test_async_and_thread_callers_share_one_request():
+    fetch = SlowFetch()
+    snap = AccountSnapshot(ttl=5, fetch=fetch, afetch=fetch.aio)
+    async def run():
+        owner = asyncio.ensure_future(snap.aget())
+        await asyncio.sleep(0.01)
+        from_thread = asyncio.to_thread(snap.get)
+        return await asyncio.gather(owner, snap.aget(), from_thread)
+    got = asyncio.run(run())
+    assert fetch.calls == 1 and {a.equity for a in got} == {1001.0}
+
+def test_invalidate_forces_refetch_even_mid_flight():
+    fetch = SlowFetch()
+    snap = AccountSnapshot(ttl=5, fetch=fetch)
+    t = threading.Thread(target=snap.get)
+    t.start()
+    time.sleep(0.01)
+    snap.invalidate()  # an order went out while the old request was in flight
+    t.join()
+    assert snap.peek().equity == 1001.0
+    assert snap.get().equity == 1002.0
+    assert snap.get().equity == 1002.0 and fetch.calls == 2
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    calls = []
+    def boom():
+        calls.append(1)
+        time.sleep(0.05)
+        raise RuntimeError("503")
+    snap = AccountSnapshot(ttl=5, fetch=boom)
+    with ThreadPoolExecutor(4) as pool:
+        futs = [pool.submit(snap.get) for _ in range(4)]
+    for f in futs:
+        with pytest.raises(RuntimeError):
+            f.result()
+    assert len(calls) == 1
+    with pytest.raises(RuntimeError):
+        snap.get()
+    assert len(calls) == 2
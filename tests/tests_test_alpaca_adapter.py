@@ -0,0 +1,178 @@
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from bot.backtest.engine import MemoryLedger, NullAuditor
+from bot.broker import alpaca_adapter
+from bot.config.settings import settings
+from bot.engine import state_machine
+from bot.logging import tracing
+
+
+@pytest.fixture
+def creds(monkeypatch):
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_KEY_ID", "k")
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_SECRET_KEY", "s")
+
+def test_bars_batch_isolates_a_failing_symbol(creds):
+    def fetch(symbol, limit):
+        if symbol == "MSFT":
+            raise RuntimeError("HTTP 500")
+        time.sleep(0.01)
+        return [{"t": "2024-01-02T15:00:00Z", "c": 1.0}] * limit
+
+    batch = alpaca_adapter.get_bars_batch(["AAPL", "MSFT", "NVDA"], limit=3, fetch=fetch)
+    assert batch.bars["AAPL"] == batch.bars["NVDA"] and len(batch.bars["AAPL"]) == 3
+    assert batch.bars["MSFT"] == []
+    assert batch.errors == {"MSFT": "HTTP 500"}
+    assert set(batch.latency_ms) == {"AAPL", "MSFT", "NVDA"}
+    assert batch.latency_ms["AAPL"] >= 10.0
+
+def test_bars_batch_keeps_symbol_order_and_dedupes(creds):
+    syms = ["TSLA", "AAPL", "MSFT", "AAPL", "AMD"]
+    batch = alpaca_adapter.get_bars_batch(syms, fetch=lambda symbol, limit: [{"S": symbol}])
+    assert list(batch.bars) == ["TSLA", "AAPL", "MSFT", "AMD"]
+    assert all(batch.bars[s] == [{"S": s}] for s in batch.bars)
+
+def test_bars_batch_pool_is_bounded(creds, monkeypatch):
+    monkeypatch.setattr(settings, "bars_fetch_workers", 2)
+    monkeypatch.setattr(alpaca_adapter, "_bars_pool", None)
+    lock = threading.Lock()
+    active = peak = 0
+
+    def fetch(symbol, limit):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return []
+
+    batch = alpaca_adapter.get_bars_batch([f"S{i}" for i in range(8)], fetch=fetch)
+    alpaca_adapter._bars_pool.shutdown()
+    assert len(batch.bars) == 8 and peak == 2
+
+@pytest.fixture
+def restore_creds(monkeypatch):
+    for name in ("_ALPACA_KEY_ID", "_ALPACA_SECRET_KEY", "_ALPACA_BASE", "_ALPACA_DATA_BASE", "_creds_generation", "_session"):
+        monkeypatch.setattr(alpaca_adapter, name, getattr(alpaca_adapter, name))
+
+def test_set_creds_drops_the_pooled_session(restore_creds):
+    alpaca_adapter.set_alpaca_creds("paper-key", "paper-secret", "https://paper-api.alpaca.markets")
+    old = alpaca_adapter._http()
+    closed = []
+    old.close = lambda: closed.append(True)
+    gen = alpaca_adapter._creds_generation
+
+    alpaca_adapter.set_alpaca_creds("live-key", "live-secret", "https://api.alpaca.markets")
+    new = alpaca_adapter._http()
+    assert closed == [True]
+    assert new is not old and alpaca_adapter._http() is new
+    assert new.headers["APCA-API-KEY-ID"] == "live-key"
+    assert alpaca_adapter._creds_generation == gen + 1
+
+def test_prewarm_opens_trading_and_data_connections(creds, monkeypatch):
+    monkeypatch.setattr(settings, "http_pool_maxsize", 3)
+    monkeypatch.setattr(settings, "bars_fetch_workers", 8)
+    calls = []
+    monkeypatch.setattr(alpaca_adapter, "_request", lambda method, url, op, **kw: calls.append(url))
+    alpaca_adapter.prewarm_connections()
+    assert sum("/v2/clock" in u for u in calls) == 1
+    assert sum("/trades/latest" in u for u in calls) == 3
+
+def test_prewarm_runs_once_per_window(monkeypatch):
+    tz = ZoneInfo("America/New_York")
+    now = {"t": datetime(2024, 1, 2, 9, 44, tzinfo=tz)}  # a Tuesday, a minute before the morning window
+    monkeypatch.setattr(state_machine, "now_et", lambda: now["t"])
+    monkeypatch.setattr(settings, "http_prewarm_lead_sec", 120)
+    monkeypatch.setattr(settings, "morning_start", "09:45")
+    monkeypatch.setattr(settings, "power_start", "15:00")
+    warmed = []
+    monkeypatch.setattr(state_machine, "prewarm_connections", lambda: warmed.append(now["t"]))
+    eng = state_machine.Engine(ledger=MemoryLedger(4000.0), aud=NullAuditor(), refresh_earnings=False)
+
+    for _ in range(3):
+        eng._maybe_prewarm()
+    assert len(warmed) == 1
+    now["t"] = now["t"].replace(hour=10)  # inside the window, past the lead time
+    eng._maybe_prewarm()
+    now["t"] = now["t"].replace(hour=14, minute=59)
+    eng._maybe_prewarm()
+    eng._maybe_prewarm()
+    assert len(warmed) == 2
+    now["t"] = datetime(2024, 1, 3, 9, 44, tzinfo=tz)  # next day's morning window
+    eng._maybe_prewarm()
+    assert len(warmed) == 3
+    now["t"] = datetime(2024, 1, 6, 9, 44, tzinfo=tz)  # Saturday
+    eng._maybe_prewarm()
+    assert len(warmed) == 3
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class FakeWire:
+    """Records limiter tokens, throttle notes and backoff sleeps."""
+
+    def __init__(self, monkeypatch, *responses):
+        self.responses = list(responses)
+        self.sent = []
+        self.tokens = []
+        self.throttled = 0
+        self.sleeps = []
+        wire = self
+
+        class Session:
+            def request(self, method, url, **kw):
+                wire.sent.append(method)
+                return wire.responses.pop(0)
+
+        monkeypatch.setattr(alpaca_adapter, "_http", lambda: Session())
+        monkeypatch.setattr(alpaca_adapter.limiter, "acquire", self.tokens.append)
+        monkeypatch.setattr(alpaca_adapter.limiter, "note_throttled", self.note_throttled)
+        monkeypatch.setattr(alpaca_adapter.time, "sleep", self.sleeps.append)
+        monkeypatch.setattr(settings, "http_retries", 2)
+
+    def note_throttled(self):
+        self.throttled += 1
+
+def test_session_does_no_transport_retries():
+    adapter = alpaca_adapter._build_session().get_adapter("https://data.alpaca.markets")
+    assert adapter.max_retries.total == 0 and not adapter.max_retries.status_forcelist
+
+def test_429_then_200_spends_two_tokens(monkeypatch):
+    lim = FakeWire(monkeypatch, FakeResponse(429, {"Retry-After": "2"}), FakeResponse(200))
+    r = alpaca_adapter._request("GET", "https://data.alpaca.markets/v2/stocks/AAPL/bars", op="get_bars")
+    assert r.status_code == 200
+    assert len(lim.tokens) == 2 and lim.sent == ["GET", "GET"]
+    assert lim.throttled == 1
+    assert lim.sleeps == [2.0]
+
+def test_retries_are_bounded_and_orders_never_retry(monkeypatch):
+    lim = FakeWire(monkeypatch, *[FakeResponse(503) for _ in range(5)])
+    assert alpaca_adapter._request("GET", "https://paper-api.alpaca.markets/v2/positions", op="get_positions").status_code == 503
+    assert len(lim.tokens) == 3 and lim.sleeps == [0.3, 0.6]
+
+    lim = FakeWire(monkeypatch, FakeResponse(429), FakeResponse(200))
+    r = alpaca_adapter._request("POST", "https://paper-api.alpaca.markets/v2/orders", op="place_buy_stop", json={})
+    assert r.status_code == 429
+    assert len(lim.tokens) == 1 and lim.throttled == 1 and lim.sleeps == []
+
+def test_request_span_records_status_and_attempts(monkeypatch):
+    FakeWire(monkeypatch, FakeResponse(503), FakeResponse(200))
+    spans = []
+    monkeypatch.setattr(tracing, "_export", spans.append)
+    with tracing.trace("tick"):
+        alpaca_adapter._request("GET", "https://paper-api.alpaca.markets/v2/positions", "get_positions")
+    sp = next(sp for sp in spans if sp.name == "alpaca.get_positions")
+    assert sp.attrs["status"] == 200 and sp.attrs["attempts"] == 2
@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import pytest
+
+from bot.broker import alpaca_adapter as sync
+from bot.broker import alpaca_async
+from bot.config.settings import settings
+
+
+class Upstream:
+    """MockTransport handler replaying canned responses and recording requests."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        resp = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(resp, Exception):
+            raise resp
+        return resp
+
+@pytest.fixture
+def env(monkeypatch):
+    """Route the shared client through a MockTransport and count limiter calls and backoff sleeps."""
+    state = {"acquired": [], "throttled": 0, "sleeps": [], "upstream": Upstream(httpx.Response(200, json={}))}
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(alpaca_async.httpx, "AsyncClient", lambda **kw: real_client(transport=httpx.MockTransport(lambda r: state["upstream"](r)), **kw))
+    monkeypatch.setattr(alpaca_async, "_client", None)
+    monkeypatch.setattr(alpaca_async, "_client_generation", -1)
+    monkeypatch.setattr(settings, "http_retries", 2)
+
+    async def acquire_async(priority):
+        state["acquired"].append(priority)
+
+    def note_throttled():
+        state["throttled"] += 1
+    monkeypatch.setattr(alpaca_async.limiter, "acquire_async", acquire_async)
+    monkeypatch.setattr(alpaca_async.limiter, "note_throttled", note_throttled)
+
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay, *a, **kw):
+        state["sleeps"].append(delay)
+        await real_sleep(0)
+    monkeypatch.setattr(alpaca_async.asyncio, "sleep", sleep)
+    return state
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await alpaca_async.aclose()
+    return asyncio.run(main())
+
+def test_client_rebuilt_when_creds_change(env, monkeypatch):
+    async def go():
+        first = await alpaca_async._http()
+        assert await alpaca_async._http() is first
+        monkeypatch.setattr(sync, "_creds_generation", sync._creds_generation + 1)
+        second = await alpaca_async._http()
+        return first, second
+    first, second = run(go())
+    assert second is not first
+    assert first.is_closed
+
+def test_order_post_is_never_retried(env):
+    env["upstream"] = Upstream(httpx.Response(503), httpx.Response(200, json={"id": "x"}))
+    r = run(alpaca_async._request("POST", f"{sync._ALPACA_BASE}/v2/orders", op="place_order", json={}))
+    assert r.status_code == 503
+    assert len(env["upstream"].requests) == 1
+    assert env["sleeps"] == []
+
+def test_get_retries_honouring_retry_after_with_a_token_per_attempt(env):
+    env["upstream"] = Upstream(
+        httpx.Response(429, headers={"Retry-After": "1.5"}),
+        httpx.Response(503),
+        httpx.Response(200, json={"ok": True}),
+    )
+    r = run(alpaca_async._request("GET", f"{sync._ALPACA_BASE}/v2/positions", op="get_positions"))
+    assert r.status_code == 200
+    assert len(env["upstream"].requests) == 3
+    assert len(env["acquired"]) == 3
+    assert env["throttled"] == 1
+    assert env["sleeps"] == [1.5, 0.6]  # Retry-After, then exponential backoff for attempt 1
+
+def test_get_gives_up_after_http_retries(env):
+    env["upstream"] = Upstream(httpx.Response(500))
+    r = run(alpaca_async._request("GET", f"{sync._ALPACA_BASE}/v2/positions", op="get_positions"))
+    assert r.status_code == 500
+    assert len(env["upstream"].requests) == 1 + settings.http_retries
+
+def test_get_retries_transport_errors(env):
+    env["upstream"] = Upstream(httpx.ConnectError("reset"), httpx.Response(200, json={}))
+    r = run(alpaca_async._request("GET", f"{sync._ALPACA_BASE}/v2/clock", op="get_clock"))
+    assert r.status_code == 200 and len(env["acquired"]) == 2
+
+def test_aclose_closes_and_forgets_the_client(env):
+    async def go():
+        client = await alpaca_async._http()
+        await alpaca_async.aclose()
+        return client
+    client = asyncio.run(go())
+    assert client.is_closed and alpaca_async._client is None
@@ -0,0 +1,68 @@
+import gzip
+import json
+import threading
+
+from bot.logging.audit import Auditor
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_log_enqueues_and_flush_writes_in_order(tmp_path):
+    path = str(tmp_path / "audit.log")
+    aud = Auditor(path=path, fsync="never")
+    for i in range(250):
+        aud.log("tick", {"i": i})
+    assert aud.flush()
+    recs = _lines(path)
+    assert [r["payload"]["i"] for r in recs] == list(range(250))
+    assert recs[0]["event"] == "tick" and recs[0]["ts"].endswith("Z")
+    aud.close()
+    aud.log("late", {})
+    assert len(_lines(path)) == 250
+
+def test_unserializable_payload_is_stringified(tmp_path):
+    path = str(tmp_path / "audit.log")
+    aud = Auditor(path=path)
+    aud.log("obj", {"x": object()})
+    aud.close()
+    assert _lines(path)[0]["payload"]["x"].startswith("<object")
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    path = str(tmp_path / "audit.log")
+    aud = Auditor(path=path, max_queue=5, fsync="never")
+    entered, gate = threading.Event(), threading.Event()
+    real_write = aud._write
+    aud._write = lambda lines: (entered.set(), gate.wait(5), real_write(lines))
+    aud.log("first", {})  # taken by the writer, which then blocks in _write
+    assert entered.wait(5)
+    for i in range(20):
+        aud.log("burst", {"i": i})
+    assert aud.dropped == 15
+    gate.set()
+    aud.close()
+    assert len(_lines(path)) == 6
+    assert aud.stats()["written"] == 6
+
+def test_size_rotation_gzips_and_keeps_newest(tmp_path):
+    path = str(tmp_path / "audit.log")
+    aud = Auditor(path=path, rotate_mb=0.001, keep=2, batch=1, fsync="never")  # ~1KB segments
+    for i in range(100):
+        aud.log("tick", {"i": i, "pad": "x" * 64})
+    aud.close()
+    segments = sorted(tmp_path.glob("audit.log.*.gz"))
+    assert aud.rotations > 2
+    assert len(segments) == 2
+    with gzip.open(segments[-1], "rt", encoding="utf-8") as f:
+        rotated = [json.loads(line) for line in f]
+    current = _lines(path)
+    assert rotated[-1]["payload"]["i"] + 1 == (current[0]["payload"]["i"] if current else 100)
+
+def test_null_path_auditor_never_opens_a_file(tmp_path, monkeypatch):
+    from bot.backtest.engine import NullAuditor
+    monkeypatch.chdir(tmp_path)
+    aud = NullAuditor()
+    aud.log("x", {})
+    aud.close()
+    assert list(tmp_path.iterdir()) == []
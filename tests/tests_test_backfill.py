@@ -0,0 +1,62 @@
+from datetime import date
+
+from bot.data.backfill import plan_backfill, run_backfill
+from bot.storage.bar_store import BarStore
+
+from tests_test_backtest import session_bars
+
+TODAY = date(2025, 1, 20)
+
+def _data():
+    bars = session_bars(10, 0)  # 2025-01-06 .. 2025-01-17
+    return [b for b in bars if not b["t"].startswith("2025-01-09")]  # market holiday
+
+class FakePages:
+    def __init__(self, bars, page_size=500, fail_after=None):
+        self.bars = bars
+        self.page_size = page_size
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def __call__(self, symbol, start, end=None, page_token=None):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise RuntimeError("connection reset")
+        rows = [b for b in self.bars if start <= b["t"] <= end]
+        i = int(page_token or 0)
+        nxt = i + self.page_size
+        return rows[i:nxt], (str(nxt) if nxt < len(rows) else None)
+
+def test_plan_skips_stored_days_weekends_and_today(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write_day("AAPL", "2025-01-08", [])
+    jobs = plan_backfill(["AAPL"], date(2025, 1, 6), date(2025, 1, 31), store=store, today=TODAY, chunk_days=3)
+    assert [[d.isoformat() for d in j.days] for j in jobs] == [
+        ["2025-01-06", "2025-01-07"],
+        ["2025-01-09", "2025-01-10", "2025-01-13"],
+        ["2025-01-14", "2025-01-15", "2025-01-16"],
+        ["2025-01-17"],
+    ]
+
+def test_backfill_pages_to_disk_and_resumes(tmp_path):
+    bars = _data()
+    store = BarStore(str(tmp_path))
+    flaky = FakePages(bars, fail_after=3)
+    report = run_backfill(["AAPL"], date(2025, 1, 6), date(2025, 1, 17), workers=1, store=store, fetch_page=flaky, today=TODAY, chunk_days=5)
+    assert report.errors
+    partial = store.days("AAPL")
+    assert 0 < len(partial) < 10
+
+    fake = FakePages(bars)
+    report = run_backfill(["AAPL"], date(2025, 1, 6), date(2025, 1, 17), workers=2, store=store, fetch_page=fake, today=TODAY, chunk_days=5)
+    assert not report.errors
+    assert report.days_written["AAPL"] == 10 - len(partial)
+    assert len(store.days("AAPL")) == 10
+    assert store.read_day("AAPL", "2025-01-09").shape[1] == 0
+    a = store.read_range("AAPL", "2025-01-06", "2025-01-17")
+    assert a.close.tolist() == [b["c"] for b in bars]
+
+    # Nothing left to do
+    fake.calls = 0
+    assert run_backfill(["AAPL"], date(2025, 1, 6), date(2025, 1, 17), store=store, fetch_page=fake, today=TODAY).jobs == 0
+    assert fake.calls == 0
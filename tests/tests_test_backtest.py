@@ -0,0 +1,76 @@
+import random
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from bot.backtest import signals as sig
+from bot.backtest.engine import run_backtest, simulated_clock
+from bot.broker.alpaca_adapter import now_et
+from bot.config.settings import settings
+from bot.engine.state_machine import Engine
+from bot.logging import metrics, tracing
+from bot.logging.audit import Auditor
+from bot.storage.buckets_ledger import BucketsLedger
+
+TZ_ET = sig.TZ_ET
+
+def session_bars(days, seed, drift=0.004):
+    """Regular-hours minute bars for `days` weekdays starting 2025-01-06."""
+    rnd = random.Random(seed)
+    out, px = [], 100.0 + seed
+    for d in pd.bdate_range("2025-01-06", periods=days):
+        for t in pd.date_range(d + pd.Timedelta(hours=14, minutes=30), periods=390, freq="1min", tz="UTC"):
+            o = px
+            c = max(1.0, o + rnd.gauss(drift, 0.08))
+            h = max(o, c) + abs(rnd.gauss(0, 0.03))
+            l = min(o, c) - abs(rnd.gauss(0, 0.03))
+            out.append({"t": t.strftime("%Y-%m-%dT%H:%M:%SZ"), "o": o, "h": h, "l": l, "c": c, "v": rnd.randint(1000, 90000)})
+            px = c
+    return out
+
+def test_signals_match_live_evaluation(tmp_path):
+    bars = session_bars(3, 1)
+    s = sig.prepare_symbol("AAPL", bars)
+    signals = sig.entry_signals(s)
+    atr = sig.atr_series(s, settings.atr_len, settings.atr_mode)
+    eng = Engine(ledger=BucketsLedger(str(tmp_path / "b.json")), aud=Auditor(str(tmp_path / "a.log")), refresh_earnings=False)
+    checked = 0
+    with simulated_clock() as clock:
+        for i in range(0, len(bars), 7):
+            clock[0] = datetime.fromtimestamp(s.t[i] / 1e9 + 60.0, TZ_ET)
+            ev, ind = eng._evaluate_entry("AAPL", bars[: i + 1])
+            for k, v in signals.flags.items():
+                assert bool(v[i]) == ev.info[k], (i, k)
+            assert (bool(signals.qualifies[i]), bool(signals.confirmed[i])) == (ev.qualifies, ev.confirmed), i
+            assert s.rvol[i] == pytest.approx(ev.rvol, rel=1e-9)
+            assert s.spread[i] == ev.spread_pct
+            assert atr[i] == pytest.approx(ind.atr, rel=1e-9)
+            checked += ev.qualifies
+    assert checked > 0
+
+def test_run_backtest_replays_trades_and_restores_globals():
+    data = {"AAPL": session_bars(10, 0), "MSFT": session_bars(10, 1)}
+    before = dict(vars(settings))
+    res = run_backtest(data, target_pct=0.004)
+    assert vars(settings) == before
+    assert abs((now_et() - datetime.now(TZ_ET)).total_seconds()) < 5
+
+    assert res.trades and res.days == 10
+    assert res.settings == {"target_pct": 0.004}
+    assert res.end_equity == pytest.approx(res.start_equity + sum(t.realized for t in res.trades))
+    assert {t.reason for t in res.trades} <= {"target_hit", "mae_cut", "atr_trail_stop", "friday_flatten", "end_of_data"}
+    assert all(t.opened_at < t.closed_at for t in res.trades)
+    # Deterministic
+    assert run_backtest(data, target_pct=0.004).summary() == res.summary()
+
+def test_backtest_leaves_live_metrics_and_traces_alone(monkeypatch):
+    data = {"AAPL": session_bars(3, 0)}
+    spans = []
+    monkeypatch.setattr(tracing, "_export", spans.append)
+    before = metrics.registry.render()
+    with tracing.trace("request"):
+        res = run_backtest(data, target_pct=0.004)
+    assert res.trades
+    assert metrics.registry.render() == before
+    assert [sp.name for sp in spans] == ["request"]
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+from bot.data.bar_cache import BarCache
+
+T0 = datetime(2025, 1, 7, 14, 30, tzinfo=timezone.utc)
+
+def make_bar(i, close=100.0):
+    t = (T0 + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {"t": t, "o": close, "h": close, "l": close, "c": close, "v": 1000}
+
+class FakeFeed:
+    def __init__(self, n):
+        self.bars = [make_bar(i) for i in range(n)]
+        self.calls = []
+
+    def __call__(self, symbol, limit, start=None):
+        self.calls.append(start)
+        rows = [b for b in self.bars if start is None or b["t"] >= start]
+        return rows[:limit] if start else rows[-limit:]
+
+def test_delta_fetch_merges_and_trims():
+    feed = FakeFeed(10)
+    cache = BarCache(window=5, fetch=feed)
+    assert [b["t"] for b in cache.get("AAPL")] == [b["t"] for b in feed.bars[-5:]]
+    feed.bars[-1] = make_bar(9, close=101.0)  # last bar revised
+    feed.bars.append(make_bar(10))
+    bars = cache.get("AAPL")
+    assert feed.calls[-1] == feed.bars[9]["t"]
+    assert len(bars) == 5
+    assert bars[-2]["c"] == 101.0
+    assert bars[-1]["t"] == feed.bars[10]["t"]
+    assert cache.gaps_backfilled == 0
+
+def test_truncated_delta_triggers_backfill():
+    feed = FakeFeed(10)
+    cache = BarCache(window=5, fetch=feed)
+    cache.get("AAPL")
+    feed.bars.extend(make_bar(i) for i in range(10, 20))
+    bars = cache.get("AAPL")
+    assert cache.gaps_backfilled == 1
+    assert [b["t"] for b in bars] == [b["t"] for b in feed.bars[-5:]]
@@ -0,0 +1,86 @@
+import os
+from datetime import date
+
+import numpy as np
+
+from bot.storage.bar_store import BarStore
+
+from tests_test_backtest import session_bars
+
+BARS = session_bars(3, 0)  # 2025-01-06 .. 2025-01-08, 390 bars each
+TODAY = date(2025, 1, 9)
+
+class FakeAlpaca:
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def __call__(self, symbol, limit, start, end=None):
+        self.calls.append((limit, start, end))
+        out = [b for b in self.bars if b["t"] >= start and (end is None or b["t"] <= end)]
+        return out[:limit]
+
+def test_day_round_trip_is_memory_mapped(tmp_path):
+    store = BarStore(str(tmp_path), feed=lambda: "iex")
+    store.write_day("AAPL", "2025-01-06", BARS[:390])
+    store.write_day("AAPL", "2025-01-01", [])
+    assert not [f for f in os.listdir(tmp_path / "iex" / "AAPL") if f.endswith(".tmp")]
+
+    fresh = BarStore(str(tmp_path), feed=lambda: "iex")
+    assert fresh.days("AAPL") == ["2025-01-01", "2025-01-06"]
+    m = fresh.read_day("AAPL", "2025-01-06")
+    assert isinstance(m, np.memmap)
+    a = fresh.read_range("AAPL", "2025-01-01", "2025-01-31")
+    assert isinstance(a.close, np.memmap)  # a view of the mapped file, not a copy
+    assert a.close.tolist() == [b["c"] for b in BARS[:390]]
+    assert a.volume.tolist() == [b["v"] for b in BARS[:390]]
+    assert str(a.t[0]) == "2025-01-06T14:30:00.000000000"
+    assert fresh.read_day("AAPL", "2025-01-01").shape[1] == 0
+    assert fresh.read_day("AAPL", "2025-01-07") is None
+
+def test_read_through_stores_covered_days_and_serves_them(tmp_path):
+    store = BarStore(str(tmp_path))
+    fake = FakeAlpaca(BARS)
+    start = "2025-01-06T05:00:00Z"  # midnight ET
+    first = store.read_through("AAPL", 10000, start, None, TODAY, fake)
+    assert first == fake(None, 10000, start)
+    assert store.days("AAPL") == ["2025-01-06", "2025-01-07", "2025-01-08"]
+
+    fake.calls.clear()
+    end = "2025-01-08T21:00:00Z"
+    again = store.read_through("AAPL", 10000, start, end, TODAY, fake)
+    assert fake.calls == []
+    assert again == first
+
+    # Mid-day start and a limit are honoured from disk too
+    part = store.read_through("AAPL", 5, "2025-01-07T15:00:00Z", end, TODAY, fake)
+    assert fake.calls == []
+    assert [b["t"] for b in part] == [b["t"] for b in BARS if b["t"] >= "2025-01-07T15:00:00Z"][:5]
+
+def test_truncated_or_partial_fetch_only_stores_whole_days(tmp_path):
+    store = BarStore(str(tmp_path))
+    fake = FakeAlpaca(BARS)
+    # A mid-day start can't vouch for the first day; the page limit stops inside the third
+    store.read_through("AAPL", 600, "2025-01-06T20:00:00Z", None, TODAY, fake)
+    assert store.days("AAPL") == ["2025-01-07"]
+    # Today is never stored
+    store.read_through("AAPL", 10000, "2025-01-08T05:00:00Z", None, date(2025, 1, 8), fake)
+    assert "2025-01-08" not in store.days("AAPL")
+
+def test_days_are_stored_per_feed(tmp_path, monkeypatch):
+    feed = {"name": "iex"}
+    store = BarStore(str(tmp_path), feed=lambda: feed["name"])
+    fake = FakeAlpaca(BARS)
+    start = "2025-01-06T05:00:00Z"
+    store.read_through("AAPL", 10000, start, None, TODAY, fake)
+    assert store.days("AAPL") == ["2025-01-06", "2025-01-07", "2025-01-08"]
+
+    feed["name"] = "sip"  # e.g. paper -> live: IEX days must not be served as SIP
+    fake.calls.clear()
+    assert store.days("AAPL") == [] and store.read_day("AAPL", "2025-01-06") is None
+    store.read_through("AAPL", 10000, start, None, TODAY, fake)
+    assert len(fake.calls) == 1
+    assert sorted(os.listdir(tmp_path)) == ["iex", "sip"]
+
+    monkeypatch.setenv("ALPACA_DATA_FEED", "SIP")
+    assert BarStore(str(tmp_path)).days("AAPL") == store.days("AAPL")
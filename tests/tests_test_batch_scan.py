@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from bot.backtest.engine import MemoryLedger, NullAuditor
+from bot.config.settings import settings
+from bot.engine.state_machine import Engine
+from bot.strategy import batch_scan as bs
+from bot.strategy import fast_rules as fr
+from bot.strategy.indicators import IndicatorState
+
+from tests_test_fast_rules import CORPUS, OPEN_ET, make_bars
+
+ATR_LEN = 14
+
+def _corpus():
+    return {f"S{i}": make_bars(n, seed, zv, drift) for i, (n, seed, zv, drift) in enumerate(CORPUS)}
+
+def test_panel_is_right_aligned_and_padded():
+    panel = bs.stack_bars({"A": make_bars(5, 1), "B": make_bars(2, 2), "C": []})
+    assert panel.symbols == ["A", "B"]
+    assert panel.close.shape == (2, 5)
+    assert panel.lengths.tolist() == [5, 2]
+    assert np.isnan(panel.close[1, :3]).all()
+    assert panel.close[1, -1] == make_bars(2, 2)[-1]["c"]
+
+def test_verdicts_match_per_symbol_pipeline():
+    by_symbol = _corpus()
+    table = bs.scan_panel(bs.stack_bars(by_symbol), OPEN_ET).to_dict("index")
+    assert any(row["qualifies"] for row in table.values())
+    for sym, bars in by_symbol.items():
+        a = fr.build_indicators_np(fr.bars_to_arrays(bars))
+        want = fr.evaluate_entry_np(a, OPEN_ET)
+        got = bs.verdict_to_eval(table[sym])
+        assert got.info == want.info, sym
+        assert (got.qualifies, got.confirmed) == (want.qualifies, want.confirmed), sym
+        assert got.spread_pct == want.spread_pct
+        assert got.rvol == pytest.approx(want.rvol, rel=1e-12)
+        state = IndicatorState(atr_len=ATR_LEN, history=300)
+        state.sync(bars)
+        assert table[sym]["atr"] == pytest.approx(state.atr, rel=1e-12)
+
+def test_vwap_restarts_each_session():
+    day1 = make_bars(30, 3)
+    day2 = [dict(b, t=b["t"].replace("2025-01-07", "2025-01-08")) for b in make_bars(30, 4)]
+    panel = bs.stack_bars({"X": day1 + day2})
+    vwap = bs.session_vwap_panel(panel, bs.session_ids(panel.t))
+    a = fr.build_indicators_np(fr.bars_to_arrays(day2))
+    assert vwap[0, -30:].tolist() == pytest.approx(a.vwap.tolist(), rel=1e-12)
+
+def test_wilder_atr_matches_indicator_state():
+    by_symbol = _corpus()
+    panel = bs.stack_bars(by_symbol)
+    atr = dict(zip(panel.symbols, bs.atr_last(panel, ATR_LEN, "wilder")))
+    sma = dict(zip(panel.symbols, bs.atr_last(panel, ATR_LEN)))
+    for sym, bars in by_symbol.items():
+        state = IndicatorState(atr_len=ATR_LEN, atr_mode="wilder", history=300)
+        state.sync(bars)
+        assert atr[sym] == pytest.approx(state.atr, rel=1e-12), sym
+    assert any(atr[s] != sma[s] for s in atr)
+
+@pytest.mark.parametrize("atr_mode", ["sma", "wilder"])
+def test_engine_batch_verdicts_match_evaluate_entry(monkeypatch, atr_mode):
+    monkeypatch.setattr(settings, "atr_mode", atr_mode)
+    eng = Engine(ledger=MemoryLedger(4000.0), aud=NullAuditor(), refresh_earnings=False)
+    by_symbol = {"AAPL": make_bars(120, 35, 0, 0.01), "MSFT": make_bars(300, 2, 3, 0.0)}
+    verdicts = eng._batch_verdicts(by_symbol)
+    for sym, bars in by_symbol.items():
+        ev, ind = eng._evaluate_entry(sym, bars)
+        got = bs.verdict_to_eval(verdicts[sym])
+        assert (got.info, got.qualifies, got.confirmed) == (ev.info, ev.qualifies, ev.confirmed)
+        assert verdicts[sym]["atr"] == pytest.approx(ind.atr, rel=1e-12)
+
+def test_panel_builder_converts_incrementally():
+    full = {"A": make_bars(310, 1), "B": make_bars(200, 2)}
+    pb = bs.PanelBuilder(window=300)
+    pb.build({k: v[:-5] for k, v in full.items()})
+    revised = dict(full["A"][-1], c=full["A"][-1]["c"] + 1.0)
+    step = {"A": full["A"][:-1] + [revised], "B": full["B"]}
+    got, want = pb.build(step), bs.stack_bars(step, window=300)
+    assert (got.t.astype("int64") == want.t.astype("int64")).all()
+    for col in ("open", "high", "low", "close", "volume"):
+        assert np.array_equal(getattr(got, col), getattr(want, col), equal_nan=True)
+    # A window that no longer lines up with the cache is rebuilt
+    other = {"A": make_bars(50, 9)}
+    assert pb.build(other).close.tolist() == bs.stack_bars(other).close.tolist()
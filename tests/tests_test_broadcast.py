@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from bot.api.broadcast import BroadcastHub, SlowConsumer
+
+
+def test_every_subscriber_gets_every_message():
+    async def run():
+        hub = BroadcastHub("t", maxlen=10)
+        a, b = hub.subscribe(), hub.subscribe()
+        for i in range(3):
+            hub.publish(i)
+        return [await a.get() for _ in range(3)], await b.get_many()
+    assert asyncio.run(run()) == ([0, 1, 2], [0, 1, 2])
+
+def test_symbol_filter_passes_unsymboled_messages():
+    async def run():
+        hub = BroadcastHub("t", maxlen=10)
+        sub = hub.subscribe(["aapl"])
+        hub.publish({"S": "AAPL"}, "AAPL")
+        hub.publish({"S": "MSFT"}, "MSFT")
+        hub.publish({"T": "success"})
+        return await sub.get_many()
+    assert asyncio.run(run()) == [{"S": "AAPL"}, {"T": "success"}]
+
+def test_drop_oldest_keeps_buffer_bounded():
+    async def run():
+        hub = BroadcastHub("t", maxlen=3, policy="drop_oldest")
+        sub = hub.subscribe()
+        for i in range(10):
+            hub.publish(i)
+        return await sub.get_many(), hub.stats()
+    got, stats = asyncio.run(run())
+    assert got == [7, 8, 9]
+    assert stats["dropped"] == 7 and stats["subscribers"][0]["max_depth"] == 3
+
+def test_disconnect_policy_closes_slow_subscriber():
+    async def run():
+        hub = BroadcastHub("t", maxlen=2, policy="disconnect")
+        slow, fast = hub.subscribe(), hub.subscribe(maxlen=100)
+        for i in range(5):
+            hub.publish(i)
+        assert hub.subscribers == [fast] and hub.stats()["disconnected"] == 1
+        assert await slow.get_many() == [0, 1]
+        with pytest.raises(SlowConsumer):
+            await slow.get()
+        return await fast.get_many()
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+
+def test_get_waits_for_publish_and_nothing_is_kept_without_subscribers():
+    async def run():
+        hub = BroadcastHub("t", maxlen=10)
+        hub.publish("nobody")
+        with hub.subscribe() as sub:
+            waiter = asyncio.ensure_future(sub.get())
+            await asyncio.sleep(0)
+            assert not waiter.done()
+            hub.publish("hello")
+            got = await asyncio.wait_for(waiter, 1)
+        return got, hub.stats()
+    got, stats = asyncio.run(run())
+    assert got == "hello"
+    assert stats["clients"] == 0 and stats["published"] == 2
+
+def test_publish_filtered_selects_once_per_distinct_filter():
+    calls = []
+    def select(symbols):
+        calls.append(symbols)
+        return None if symbols == {"NVDA"} else f"for {sorted(symbols) if symbols else 'all'}"
+    async def run():
+        hub = BroadcastHub("t", maxlen=10)
+        subs = [hub.subscribe(["AAPL"]), hub.subscribe(["aapl"]), hub.subscribe(), hub.subscribe(["NVDA"])]
+        hub.publish_filtered(select)
+        return [s.depth for s in subs], await subs[1].get(), await subs[2].get()
+    depths, aapl, everything = asyncio.run(run())
+    assert depths == [1, 1, 1, 0] and len(calls) == 3
+    assert aapl == "for ['AAPL']" and everything == "for all"
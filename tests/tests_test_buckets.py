@@ -1,7 +1,10 @@
+import json
+import os
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-from bot.storage.buckets_ledger import BucketsLedger, next_settlement_time_et
+from bot.config.settings import settings
+from bot.storage.buckets_ledger import BucketsLedger, JournaledBucketsLedger, next_settlement_time_et, open_ledger
 
 TZ_ET = ZoneInfo("America/New_York")
 
@@ -21,4 +24,79 @@ def test_buckets_settlement():
     later = next_settlement_time_et(now) + timedelta(minutes=1)
     ledger.release_settled(later)
     b = [b for b in ledger.buckets if b["name"] == bucket["name"]][0]
-    assert len(b["unsettled"]) == 0
\ No newline at end of file
+    assert len(b["unsettled"]) == 0
+
+def _state(ledger):
+    return json.loads(json.dumps(ledger.buckets))
+
+def test_journal_replays_after_restart_and_compacts(tmp_path):
+    path = str(tmp_path / "b.json")
+    now = datetime(2025, 1, 7, 10, 0, tzinfo=TZ_ET)
+    ledger = JournaledBucketsLedger(path, snapshot_every=4)
+    ledger.consume_on_buy("A", 100.0)
+    ledger.refund("A", 40.0)
+    ledger.add_unsettled_on_sell("B", 55.5, now)
+    ledger.release_settled(now)  # nothing settles: not journaled
+    assert ledger.seq == 3
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["seq"] == 0  # snapshot untouched, changes only in the journal
+    reopened = JournaledBucketsLedger(path, snapshot_every=4)
+    assert _state(reopened) == _state(ledger)
+
+    ledger.release_settled(next_settlement_time_et(now))  # 4th record triggers compaction
+    with open(path, encoding="utf-8") as f:
+        snap = json.load(f)
+    assert snap["seq"] == 4 and snap["buckets"] == _state(ledger)
+    assert os.path.getsize(ledger.journal_path) == 0
+    ledger.close()
+    assert _state(JournaledBucketsLedger(path)) == _state(ledger)
+
+def test_journal_survives_torn_write_and_stale_records(tmp_path):
+    path = str(tmp_path / "b.json")
+    ledger = JournaledBucketsLedger(path)
+    ledger.consume_on_buy("A", 10.0)
+    ledger.consume_on_buy("B", 20.0)
+    expected = _state(ledger)
+    ledger.close()
+    with open(ledger.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"seq":3,"op":"buy","bucket":"A","amo')  # killed mid-append
+    reopened = JournaledBucketsLedger(path)
+    assert _state(reopened) == expected
+    reopened.consume_on_buy("A", 1.0)  # appends cleanly after the truncated tail
+    reopened.close()
+    # Crash after compaction but before the journal was truncated: replay must not double-apply
+    compacted = JournaledBucketsLedger(path)
+    stale = open(compacted.journal_path, encoding="utf-8").read()
+    compacted.save()
+    with open(compacted.journal_path, "w", encoding="utf-8") as f:
+        f.write(stale)
+    compacted.close()
+    final = JournaledBucketsLedger(path)
+    assert final.buckets[0]["settled_cash"] == expected[0]["settled_cash"] - 1.0
+    assert final.buckets[1]["settled_cash"] == expected[1]["settled_cash"]
+
+def test_plain_ledger_reads_journaled_snapshot(tmp_path):
+    path = str(tmp_path / "b.json")
+    ledger = JournaledBucketsLedger(path, snapshot_every=1)
+    ledger.consume_on_buy("A", 5.0)
+    ledger.close()
+    assert BucketsLedger(path).buckets == ledger.buckets
+
+def test_plain_backend_folds_in_a_leftover_journal(tmp_path, monkeypatch):
+    path = str(tmp_path / "b.json")
+    ledger = JournaledBucketsLedger(path, snapshot_every=100)
+    ledger.consume_on_buy("A", 25.0)
+    ledger.refund("A", 5.0)
+    ledger.close()  # records are only in the journal
+
+    monkeypatch.setattr(settings, "bucket_journal", False)
+    plain = open_ledger(path)
+    assert type(plain) is BucketsLedger and plain.buckets == ledger.buckets
+    assert not os.path.exists(ledger.journal_path)
+    plain.consume_on_buy("B", 1.0)
+
+    # Switching back must not replay the old records on top of the plain snapshot
+    monkeypatch.setattr(settings, "bucket_journal", True)
+    again = open_ledger(path)
+    assert again.buckets == plain.buckets
+    again.close()
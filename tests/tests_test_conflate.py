@@ -0,0 +1,41 @@
+import asyncio
+
+from bot.api.conflate import Conflator
+
+
+def test_keeps_latest_quote_and_trade_per_symbol():
+    out = []
+    c = Conflator(out.append, hz=4)
+    for i in range(100):
+        c.push({"T": "q", "S": "SPY", "bp": i})
+        c.push({"T": "t", "S": "SPY", "p": i})
+        c.push({"T": "q", "S": "QQQ", "bp": -i})
+    c.push({"T": "b", "S": "SPY", "c": 1.0})
+    c.push({"T": "success", "msg": "connected"})
+    assert [e["T"] for e in out] == ["b", "success"]  # pass straight through
+    c.flush()
+    assert out[2:] == [{"T": "q", "S": "SPY", "bp": 99}, {"T": "t", "S": "SPY", "p": 99}, {"T": "q", "S": "QQQ", "bp": -99}]
+    assert c.stats() == {"hz": 4.0, "received": 302, "emitted": 5, "pending": 0}
+    c.flush()
+    assert len(out) == 5
+
+def test_zero_hz_passes_every_tick():
+    out = []
+    c = Conflator(out.append, hz=0)
+    for i in range(3):
+        c.push({"T": "q", "S": "SPY", "bp": i})
+    assert len(out) == 3
+    c.start()  # no task without a rate
+    assert c._task is None
+
+def test_background_flush():
+    async def run():
+        out = []
+        c = Conflator(out.append, hz=100)
+        c.start()
+        c.push({"T": "q", "S": "SPY", "bp": 1})
+        c.push({"T": "q", "S": "SPY", "bp": 2})
+        await asyncio.sleep(0.05)
+        c.stop()
+        return out
+    assert asyncio.run(run()) == [{"T": "q", "S": "SPY", "bp": 2}]
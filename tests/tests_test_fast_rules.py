@@ -0,0 +1,79 @@
+import math
+import random
+import pandas as pd
+import pytest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from bot.engine.state_machine import (
+    _bars_to_df, _estimate_rvol, _estimate_spread_pct, _has_higher_low, _vwap_reclaim, _vwap_retest,
+)
+from bot.strategy import fast_rules as fr
+from bot.strategy.rules import build_indicators, opening_range, qualify_entry, qualifies_all
+
+TZ_ET = ZoneInfo("America/New_York")
+OPEN_ET = datetime(2025, 1, 7, 9, 30, tzinfo=TZ_ET)
+
+def make_bars(n, seed, zero_vol_every=0, drift=0.02):
+    rnd = random.Random(seed)
+    times = pd.date_range("2025-01-07 14:20", periods=n, freq="1min", tz="UTC")
+    bars, px = [], 50.0 + seed
+    for i, t in enumerate(times):
+        o = px
+        c = max(1.0, o + rnd.gauss(drift, 0.2))
+        h = max(o, c) + abs(rnd.gauss(0, 0.05))
+        l = min(o, c) - abs(rnd.gauss(0, 0.05))
+        v = 0 if zero_vol_every and i % zero_vol_every == 0 else rnd.randint(100, 90000)
+        bars.append({"t": t.strftime("%Y-%m-%dT%H:%M:%SZ"), "o": o, "h": h, "l": l, "c": c, "v": v})
+        px = c
+    return bars
+
+CORPUS = [(n, seed, zv, drift) for n in (1, 3, 4, 6, 30, 120, 300) for seed in range(6) for zv, drift in ((0, 0.02), (3, 0.0), (0, -0.03))]
+# Seeds whose last bar passes every entry rule (some also pass confirmations)
+CORPUS += [(60, seed, 0, 0.01) for seed in (35, 84, 195)] + [(120, seed, 0, 0.01) for seed in (6, 35, 214)]
+
+def same(a, b):
+    return a == b or (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b))
+
+@pytest.mark.parametrize("n,seed,zv,drift", CORPUS)
+def test_numpy_pipeline_is_bit_compatible(n, seed, zv, drift):
+    bars = make_bars(n, seed, zv, drift)
+    df = _bars_to_df(bars)
+    orh, orl = opening_range(df, OPEN_ET)
+    df = build_indicators(df)
+    a = fr.build_indicators_np(fr.bars_to_arrays(bars))
+
+    for col in ("ema20", "ema50", "vwap"):
+        got, want = getattr(a, col).tolist(), df[col].tolist()
+        assert all(same(x, y) for x, y in zip(got, want)), col
+
+    np_orh, np_orl = fr.opening_range_np(a, OPEN_ET)
+    assert same(np_orh, orh) and same(np_orl, orl)
+
+    info = qualify_entry(df, orh)
+    np_info = fr.qualify_entry_np(a, orh)
+    assert all(same(np_info[k], info[k]) for k in info)
+
+    assert fr.has_higher_low_np(a.low) == _has_higher_low(df)
+    assert fr.vwap_reclaim_np(a) == _vwap_reclaim(df)
+    for lookback in (1, 5):
+        assert fr.vwap_retest_np(a, lookback) == _vwap_retest(df, lookback)
+    assert same(fr.estimate_rvol_np(a.volume), _estimate_rvol(df))
+    assert same(fr.estimate_spread_pct_np(a), _estimate_spread_pct(df))
+
+    ev = fr.evaluate_entry_np(a, OPEN_ET)
+    assert ev.qualifies == qualifies_all(info)
+
+def test_engine_fast_path_matches_pandas_path(monkeypatch):
+    from bot.backtest.engine import MemoryLedger, NullAuditor
+    from bot.config.settings import settings
+    from bot.engine.state_machine import Engine
+    eng = Engine(ledger=MemoryLedger(4000.0), aud=NullAuditor(), refresh_earnings=False)
+    bars = make_bars(120, 35, 0, 0.01)
+    results = []
+    for fast in (True, False):
+        monkeypatch.setattr(settings, "fast_rules", fast)
+        eng.indicators.clear()
+        ev, _ = eng._evaluate_entry("AAPL", bars)
+        results.append(ev)
+    assert results[0] == results[1]
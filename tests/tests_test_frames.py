@@ -0,0 +1,25 @@
+import json
+
+from bot.api.frames import filter_frame, frame_symbols
+
+FRAME = json.dumps([
+    {"T": "q", "S": "AAPL", "bp": 190.1, "ap": 190.12, "c": ["R"]},
+    {"T": "t", "S": "MSFT", "p": 410.5, "c": ["@", "I"]},
+    {"T": "b", "S": "AAPL", "o": 1, "h": 2, "l": 0.5, "c": 1.5, "v": 100},
+], separators=(",", ":"))
+
+def test_frame_symbols():
+    assert frame_symbols(FRAME) == {"AAPL", "MSFT"}
+    assert frame_symbols('[{"T":"success","msg":"authenticated"}]') == set()
+
+def test_filter_frame_passes_whole_frame_when_everything_matches():
+    assert filter_frame(FRAME, None) is FRAME
+    assert filter_frame(FRAME, {"AAPL", "MSFT", "NVDA"}) is FRAME
+    status = '[{"T":"subscription","trades":["AAPL"]}]'
+    assert filter_frame(status, {"NVDA"}) is status
+
+def test_filter_frame_rebuilds_only_matching_messages():
+    got = filter_frame(FRAME, {"AAPL"})
+    assert json.loads(got) == [e for e in json.loads(FRAME) if e["S"] == "AAPL"]
+    assert json.loads(filter_frame(FRAME, {"MSFT"})) == [json.loads(FRAME)[1]]
+    assert filter_frame(FRAME, {"NVDA"}) is None
@@ -0,0 +1,54 @@
+import math
+import random
+import pandas as pd
+import pytest
+
+from bot.engine.state_machine import _bars_to_df, _calc_atr
+from bot.strategy.indicators import IndicatorState
+from bot.strategy.rules import build_indicators
+
+def make_bars(n, seed=7):
+    rnd = random.Random(seed)
+    times = pd.date_range("2025-01-07 14:30", periods=n, freq="1min", tz="UTC")
+    bars, px = [], 100.0
+    for t in times:
+        o = px
+        c = max(1.0, o + rnd.uniform(-0.5, 0.55))
+        h = max(o, c) + rnd.uniform(0, 0.3)
+        l = min(o, c) - rnd.uniform(0, 0.3)
+        bars.append({"t": t.strftime("%Y-%m-%dT%H:%M:%SZ"), "o": o, "h": h, "l": l, "c": c, "v": rnd.randint(0, 50000)})
+        px = c
+    return bars
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_streaming_matches_batch(seed):
+    bars = make_bars(300, seed)
+    state = IndicatorState(atr_len=14, history=300)
+    for b in bars:
+        state.update(b)
+    df = build_indicators(_bars_to_df(bars))
+    cols = state.columns(len(df))
+    for name in ("ema20", "ema50", "vwap"):
+        assert cols[name] == df[name].tolist()
+    assert state.atr == pytest.approx(_calc_atr(df, 14), rel=1e-12)
+
+def test_revised_last_bar_replaces_it():
+    bars = make_bars(60)
+    state = IndicatorState(atr_len=14, history=300)
+    for b in bars:
+        state.update(b)
+    revised = dict(bars[-1], c=bars[-1]["c"] + 0.25, h=bars[-1]["h"] + 0.25)
+    state.update(revised)
+    fresh = IndicatorState(atr_len=14, history=300).sync(bars[:-1] + [revised])
+    assert len(state.history) == 60
+    assert (state.ema20, state.ema50, state.vwap, state.atr) == (fresh.ema20, fresh.ema50, fresh.vwap, fresh.atr)
+
+def test_vwap_resets_each_session_and_sync_is_incremental():
+    day1 = make_bars(30)
+    day2 = [dict(b, t=b["t"].replace("2025-01-07", "2025-01-08")) for b in make_bars(30, seed=9)]
+    state = IndicatorState(atr_len=14).sync(day1)
+    state.sync(day1[-5:] + day2)
+    expected = build_indicators(_bars_to_df(day2))["vwap"].iloc[-1]
+    assert state.vwap == expected
+    assert state.count == 60
+    assert not math.isnan(state.ema50)
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+from bot.api.loop_lag import LoopLagMonitor
+
+
+def blocking_handler():
+    time.sleep(0.25)  # e.g. a sync REST call inside an async endpoint
+
+def test_idle_loop_has_low_lag():
+    async def run():
+        mon = LoopLagMonitor(interval=0.01, block_ms=100, watchdog=False)
+        mon.start()
+        await asyncio.sleep(0.2)
+        mon.stop()
+        return mon.stats()
+    stats = asyncio.run(run())
+    assert stats["samples"] >= 5
+    assert stats["p50_ms"] < 50 and stats["over_threshold"] == 0
+
+def test_watchdog_captures_blocking_stack():
+    async def run():
+        mon = LoopLagMonitor(interval=0.01, block_ms=100, watchdog=True)
+        mon.start()
+        await asyncio.sleep(0.05)
+        blocking_handler()
+        await asyncio.sleep(0.05)
+        mon.stop()
+        return mon.stats(stalls=True)
+    stats = asyncio.run(run())
+    assert stats["max_ms"] >= 200 and stats["over_threshold"] == 1
+    assert len(stats["stalls"]) == 1
+    stall = stats["stalls"][0]
+    assert stall["blocked_ms"] >= 200
+    assert "blocking_handler" in "".join(stall["stack"])
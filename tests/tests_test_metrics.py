@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from bot.broker import alpaca_adapter
+from bot.logging.metrics import Registry, muted, registry
+from bot.storage.buckets_ledger import JournaledBucketsLedger
+
+
+def test_render_counter_gauge_histogram():
+    reg = Registry()
+    c = reg.counter("orders_total", "Orders", ("mode",))
+    g = reg.gauge("depth", "Depth")
+    h = reg.histogram("call_seconds", "Calls", ("fn",), buckets=(0.1, 1.0))
+    c.labels("paper").inc()
+    c.labels("paper").inc(2)
+    g.set(7)
+    g.dec()
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.labels("get_bars").observe(v)
+    text = reg.render()
+    assert "# TYPE orders_total counter" in text
+    assert 'orders_total{mode="paper"} 3' in text
+    assert "depth 6" in text
+    assert 'call_seconds_bucket{fn="get_bars",le="0.1"} 2' in text
+    assert 'call_seconds_bucket{fn="get_bars",le="1"} 3' in text
+    assert 'call_seconds_bucket{fn="get_bars",le="+Inf"} 4' in text
+    assert 'call_seconds_sum{fn="get_bars"} 3.65' in text
+    assert 'call_seconds_count{fn="get_bars"} 4' in text
+
+def test_timer_and_label_escaping():
+    reg = Registry()
+    h = reg.histogram("t_seconds", "T", ("stage",))
+    with h.labels('a"b\\c').time():
+        pass
+    text = reg.render()
+    assert 't_seconds_count{stage="a\\"b\\\\c"} 1' in text
+
+def test_registration_is_idempotent_and_checked():
+    reg = Registry()
+    assert reg.counter("x_total", "X") is reg.counter("x_total", "X")
+    with pytest.raises(ValueError):
+        reg.gauge("x_total", "X")
+    with pytest.raises(ValueError):
+        reg.counter("y_total", "Y", ("a",)).labels("1", "2")
+
+def test_collectors_run_on_scrape_and_failures_are_contained():
+    reg = Registry()
+    reg.add_collector(lambda: [("clients", "gauge", "Clients", [({"hub": "events"}, 2)])])
+    def broken():
+        raise RuntimeError("boom")
+    reg.add_collector(broken)
+    text = reg.render()
+    assert 'clients{hub="events"} 2' in text
+    assert "failed: boom" in text
+
+def test_ledger_writes_are_counted(tmp_path):
+    writes = registry.get("ledger_writes_total")
+    before = writes.labels("journal", "buy").value
+    led = JournaledBucketsLedger(str(tmp_path / "b.json"), snapshot_every=100)
+    led.consume_on_buy("A", 10.0)
+    led.close()
+    assert writes.labels("journal", "buy").value == before + 1
+    assert 'ledger_write_seconds_count{backend="journal",kind="append"}' in registry.render()
+
+def test_adapter_request_latency_labelled_by_op(monkeypatch):
+    class FakeResponse:
+        status_code = 200
+
+    class FakeSession:
+        def request(self, method, url, **kw):
+            return FakeResponse()
+
+    monkeypatch.setattr(alpaca_adapter, "_http", lambda: FakeSession())
+    child = alpaca_adapter.REQUEST_SECONDS.labels("sync", "get_clock_for_test", 200)
+    before = child.count
+    alpaca_adapter._request("GET", "https://example.invalid/v2/clock", "get_clock_for_test")
+    assert child.count == before + 1
+
+def test_muted_only_drops_its_own_context():
+    reg = Registry()
+    c = reg.counter("orders_total", "Orders")
+    h = reg.histogram("call_seconds", "Calls", buckets=(1.0,))
+    with muted():
+        c.inc()
+        h.observe(0.5)
+        other = threading.Thread(target=c.inc)
+        other.start()
+        other.join()
+    c.inc()
+    assert c._solo.value == 2 and h._solo.count == 0
@@ -0,0 +1,38 @@
+from bot.broker.rate_limit import PRIORITY_DATA, PRIORITY_ORDER, RateLimiter, plan_request_budget
+from bot.config.settings import settings
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+    def __call__(self):
+        return self.t
+
+def test_orders_can_use_reserve_data_cannot():
+    clock = FakeClock()
+    rl = RateLimiter(per_minute=120, burst=10, order_reserve=3, clock=clock)
+    granted = 0
+    while rl.try_acquire(PRIORITY_DATA) == 0.0:
+        granted += 1
+    assert granted == 7
+    assert rl.try_acquire(PRIORITY_DATA) > 0
+    for _ in range(3):
+        assert rl.try_acquire(PRIORITY_ORDER) == 0.0
+    wait = rl.try_acquire(PRIORITY_ORDER)
+    assert wait > 0
+    clock.t += wait
+    assert rl.try_acquire(PRIORITY_ORDER) == 0.0
+    assert rl.usage()["granted"] == {PRIORITY_ORDER: 4, PRIORITY_DATA: 7}
+
+def test_budget_planner_flags_large_watchlists():
+    assert plan_request_budget(6, n_positions=3, tick_sec=5.0, engine_mode="poll", limit_per_min=200)["over_limit"] is False
+    assert plan_request_budget(60, n_positions=3, tick_sec=5.0, engine_mode="poll", limit_per_min=200)["over_limit"]
+    assert not plan_request_budget(60, n_positions=3, tick_sec=5.0, engine_mode="stream", limit_per_min=200)["over_limit"]
+
+def test_budget_planner_reads_current_settings(monkeypatch):
+    monkeypatch.setattr(settings, "engine_mode", "poll")
+    monkeypatch.setattr(settings, "concurrency_cap", 3)
+    monkeypatch.setattr(settings, "engine_poll_sec", 5.0)
+    assert plan_request_budget(6, limit_per_min=200)["engine_per_min"] == 12 * (1 + 6 + 5)
+    monkeypatch.setattr(settings, "engine_poll_sec", 60.0)  # e.g. changed from the dashboard
+    monkeypatch.setattr(settings, "engine_mode", "stream")
+    assert plan_request_budget(6, limit_per_min=200)["engine_per_min"] == 1 + 6
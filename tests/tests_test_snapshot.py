@@ -0,0 +1,91 @@
+import pytest
+
+from bot.backtest.engine import MemoryLedger, NullAuditor
+from bot.broker import alpaca_adapter
+from bot.config.settings import settings
+from bot.data.bar_cache import BarCache
+from bot.engine import snapshot, state_machine
+from bot.engine.state_machine import Engine, PositionState
+
+
+def bars(n=30):
+    return [{"t": f"2024-01-02T15:{i:02d}:00Z", "o": 10.0, "h": 10.1, "l": 9.9, "c": 10.0, "v": 1000} for i in range(n)]
+
+class Counting:
+    def __init__(self):
+        self.price_requests = []
+        self.bar_fetches = []
+        self.atr_calls = []
+
+@pytest.fixture
+def setup(monkeypatch):
+    calls = Counting()
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_KEY_ID", "k")
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_SECRET_KEY", "s")
+    monkeypatch.setattr(settings, "dry_run", True)
+    monkeypatch.setattr(settings, "mae_k_atr", 1.0)
+    monkeypatch.setattr(settings, "atr_trail_k", 1.0)
+    monkeypatch.setattr(settings, "exit_in_power_window_only", False)
+    monkeypatch.setattr(state_machine, "friday_flatten_due", lambda: False)
+
+    def prices(symbols):
+        calls.price_requests.append(list(symbols))
+        return {s: 10.05 for s in symbols}
+    monkeypatch.setattr(snapshot, "latest_trade_prices", prices)
+    monkeypatch.setattr(snapshot, "bar_cache", BarCache(fetch=lambda symbol, limit, start=None: calls.bar_fetches.append(symbol) or bars()))
+
+    eng = Engine(ledger=MemoryLedger(4000.0), aud=NullAuditor(), refresh_earnings=False)
+    real = eng._indicators_for
+    monkeypatch.setattr(eng, "_indicators_for", lambda symbol, b: calls.atr_calls.append(symbol) or real(symbol, b))
+    for sym in ("AAPL", "MSFT"):
+        eng.positions.append(PositionState(symbol=sym, entry_price=10.0, target_price=11.0, qty=1, opened_at="2024-01-02T10:00:00-05:00"))
+    return eng, calls
+
+def test_one_fetch_per_symbol_and_one_atr_for_all_exit_rules(setup):
+    eng, calls = setup
+    eng.reconcile_positions()
+    assert calls.price_requests == [["AAPL", "MSFT"]]
+    assert sorted(calls.bar_fetches) == ["AAPL", "MSFT"]
+    # MAE and the ATR trail both ran, off one ATR computation per symbol
+    assert sorted(calls.atr_calls) == ["AAPL", "MSFT"]
+    assert all(ps.trail_stop is not None for ps in eng.positions)
+
+def test_no_bars_fetched_without_atr_exits(setup, monkeypatch):
+    eng, calls = setup
+    monkeypatch.setattr(settings, "mae_k_atr", 0.0)
+    monkeypatch.setattr(settings, "atr_trail_k", 0.0)
+    eng.reconcile_positions()
+    assert calls.price_requests == [["AAPL", "MSFT"]]
+    assert calls.bar_fetches == [] and calls.atr_calls == []
+
+def test_bars_fetched_lazily_when_not_prefetched(setup):
+    eng, calls = setup
+    snap = snapshot.MarketSnapshot(eng._indicators_for)
+    snap.prefetch(["AAPL", "MSFT"], bars=False)
+    assert calls.bar_fetches == []
+    assert snap.atr("AAPL") > 0 and snap.atr("AAPL") > 0
+    assert calls.bar_fetches == ["AAPL"] and calls.atr_calls == ["AAPL"]
+
+def test_latest_trade_prices_is_one_request(monkeypatch):
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_KEY_ID", "k")
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_SECRET_KEY", "s")
+    sent = []
+
+    class FakeResponse:
+        status_code = 200
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"trades": {"AAPL": {"p": 190.5}, "MSFT": {"p": 410.0}}}
+
+    class FakeSession:
+        def request(self, method, url, **kw):
+            sent.append((method, url, kw["params"]["symbols"]))
+            return FakeResponse()
+
+    monkeypatch.setattr(alpaca_adapter, "_http", lambda: FakeSession())
+    out = alpaca_adapter.latest_trade_prices(["AAPL", "MSFT", "AAPL", "NVDA"])
+    assert out == {"AAPL": 190.5, "MSFT": 410.0}
+    assert len(sent) == 1 and sent[0][2] == "AAPL,MSFT,NVDA"
@@ -0,0 +1,86 @@
+import asyncio
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from bot.api.state import StateChannel, merge_patch
+from bot.backtest.engine import MemoryLedger, NullAuditor
+from bot.engine.state_machine import Engine, PositionState
+
+TZ_ET = ZoneInfo("America/New_York")
+
+
+def apply_patch(target, patch):
+    if not isinstance(patch, dict):
+        return patch
+    out = dict(target) if isinstance(target, dict) else {}
+    for k, v in patch.items():
+        if v is None:
+            out.pop(k, None)
+        else:
+            out[k] = apply_patch(out.get(k), v)
+    return out
+
+def test_merge_patch_roundtrip():
+    old = {"mode": "cash", "positions": [], "pending_orders": {"AAPL": {"qty": 1}}, "caps": {"soft_hit": False, "realized_usd": 0.0}}
+    new = {"mode": "cash", "positions": [{"symbol": "AAPL"}], "pending_orders": {}, "caps": {"soft_hit": False, "realized_usd": 12.5}}
+    patch = merge_patch(old, new)
+    assert patch == {"positions": [{"symbol": "AAPL"}], "pending_orders": {"AAPL": None}, "caps": {"realized_usd": 12.5}}
+    assert apply_patch(old, patch) == new
+    assert merge_patch(new, dict(new)) is None
+
+def _engine():
+    return Engine(ledger=MemoryLedger(4000.0), aud=NullAuditor(), refresh_earnings=False)
+
+def test_snapshot_state_tracks_versioned_changes():
+    eng = _engine()
+    first = eng.snapshot_state()
+    with eng._mutating():
+        eng.positions.append(PositionState(symbol="AAPL", entry_price=10.0, target_price=10.5, qty=3, opened_at="2025-01-07T10:00:00-05:00", bucket="A"))
+    second = eng.snapshot_state()
+    assert second["version"] == first["version"] + 1
+    assert second["positions"][0]["symbol"] == "AAPL" and second["concurrency"]["open_positions"] == 1
+    eng._close_position(eng.positions[0], 10.5, "target_hit")
+    third = eng.snapshot_state()
+    assert third["version"] == second["version"] + 1
+    assert third["positions"] == [] and third["daily_caps"]["realized_usd"] == 1.5
+    assert "AAPL" in third["cooldowns"]["per_symbol_last_exit"]
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, obj):
+        self.sent.append(obj)
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+def test_channel_sends_snapshot_then_deltas_only_on_change():
+    eng = _engine()
+    async def run():
+        ch = StateChannel(eng, poll_sec=0.01, full_check_sec=3600)
+        ws = FakeWS()
+        ch.start()
+        server = asyncio.ensure_future(ch.serve(ws))
+        await asyncio.sleep(0.05)
+        idle = len(ws.sent)
+        with eng._mutating():
+            eng.pending_orders["MSFT"] = {"id": "o1", "placed_at": datetime(2025, 1, 7, 10, tzinfo=TZ_ET), "qty": 2, "entry_price": 400.0, "target": 402.0, "bucket": "A"}
+        await asyncio.sleep(0.05)
+        with eng._mutating():
+            pass  # version moved but nothing visible changed
+        await asyncio.sleep(0.05)
+        ch.stop()
+        server.cancel()
+        return idle, ws.sent
+    idle, sent = asyncio.run(run())
+    assert idle == 1 and sent[0]["type"] == "snapshot"
+    assert len(sent) == 2
+    delta = sent[1]
+    assert delta["type"] == "delta" and delta["seq"] == sent[0]["seq"] + 1
+    state = apply_patch(sent[0]["state"], delta["patch"])
+    assert state["pending_orders"]["MSFT"]["qty"] == 2
+    expected = eng.snapshot_state()
+    del expected["version"]
+    assert {k: v for k, v in state.items() if k not in ("account", "windows")} == expected
@@ -0,0 +1,146 @@
+import time
+
+import pytest
+
+from bot.backtest.engine import MemoryLedger, NullAuditor
+from bot.broker import alpaca_adapter
+from bot.config.settings import settings
+from bot.data.bar_cache import BarCache
+from bot.engine import state_machine
+from bot.engine.state_machine import Engine, PositionState
+
+
+def bar(t, c, v=1000):
+    return {"t": t, "o": c, "h": c, "l": c, "c": c, "v": v}
+
+@pytest.fixture
+def eng(monkeypatch):
+    monkeypatch.setattr(settings, "engine_mode", "stream")
+    monkeypatch.setattr(state_machine, "in_entry_window", lambda: True)
+    cache = BarCache(window=5, fetch=lambda symbol, limit, start=None: [bar("2024-01-02T15:00:00Z", 10.0), bar("2024-01-02T15:01:00Z", 10.1)])
+    monkeypatch.setattr(state_machine, "bar_cache", cache)
+    e = Engine(ledger=MemoryLedger(4000.0), aud=NullAuditor(), refresh_earnings=False)
+    monkeypatch.setattr(e, "refresh_mode", lambda: None)
+    return e
+
+def drain(eng):
+    while not eng._stream_events.empty():
+        eng._handle_stream_event(*eng._stream_events.get_nowait())
+
+def test_closed_bar_evaluates_only_that_symbol(eng, monkeypatch):
+    sym, other = settings.symbol_priority[0], settings.symbol_priority[1]
+    scanned = []
+    monkeypatch.setattr(eng, "_fetch_candidate_bars", lambda symbols: scanned.append(list(symbols)) or {})
+    state_machine.bar_cache.get(sym)  # backfilled, so the stream bar is merged
+
+    eng.on_stream_event({"T": "u", "S": sym, **bar("2024-01-02T15:02:00Z", 10.2)})
+    drain(eng)
+    assert scanned == []  # an updated (still forming) bar does not trigger a scan
+
+    eng.on_stream_event({"T": "b", "S": sym, **bar("2024-01-02T15:02:00Z", 10.3)})
+    drain(eng)
+    assert scanned == [[sym]]
+    assert other not in scanned[0]
+
+def test_updated_bar_revises_instead_of_appending(eng):
+    sym = settings.symbol_priority[0]
+    cache = state_machine.bar_cache
+    eng.on_stream_event({"T": "u", "S": sym, **bar("2024-01-02T15:02:00Z", 10.2)})
+    drain(eng)
+    assert cache.peek(sym) == []  # ignored until the symbol is backfilled
+
+    cache.get(sym)
+    eng.on_stream_event({"T": "u", "S": sym, **bar("2024-01-02T15:01:00Z", 10.4, v=1500)})
+    drain(eng)
+    bars = cache.peek(sym)
+    assert len(bars) == 2 and bars[-1]["c"] == 10.4 and bars[-1]["v"] == 1500
+
+def test_trade_print_runs_exits_for_held_symbols_only(eng, monkeypatch):
+    checked = []
+    monkeypatch.setattr(eng, "_manage_position", lambda ps, lp, snap: checked.append((ps.symbol, lp)))
+    eng.positions.append(PositionState(symbol="AAPL", entry_price=10.0, target_price=10.5, qty=3, opened_at="2024-01-02T10:00:00-05:00", bucket="A"))
+
+    eng.on_stream_event({"T": "t", "S": "MSFT", "p": 400.0})
+    eng.on_stream_event({"T": "t", "S": "AAPL", "p": 10.6})
+    drain(eng)
+    assert checked == [("AAPL", 10.6)]
+    assert eng.last_trade == {"MSFT": 400.0, "AAPL": 10.6}
+
+def test_trade_through_target_closes_position(eng):
+    ps = PositionState(symbol="AAPL", entry_price=10.0, target_price=10.5, qty=3, opened_at="2024-01-02T10:00:00-05:00", bucket="A")
+    eng.positions.append(ps)
+    eng.on_stream_event({"T": "t", "S": "AAPL", "p": 10.6})
+    drain(eng)
+    assert eng.positions == []
+    assert eng.daily_realized_usd == pytest.approx(1.5)
+
+def test_events_ignored_in_poll_mode(eng, monkeypatch):
+    monkeypatch.setattr(settings, "engine_mode", "poll")
+    eng.on_stream_event({"T": "b", "S": "AAPL", **bar("2024-01-02T15:02:00Z", 10.3)})
+    assert eng._stream_events.empty()
+
+def run_one_iteration(eng, monkeypatch):
+    """Run _stream_loop until it polls once; returns which path it took."""
+    calls = []
+
+    def stop(name):
+        def fn(**kw):
+            calls.append(name)
+            raise KeyboardInterrupt
+        return fn
+    monkeypatch.setattr(eng, "tick", stop("tick"))
+    monkeypatch.setattr(eng, "_stream_housekeeping", stop("housekeeping"))
+    eng._stream_loop()
+    return calls
+
+def test_disconnected_stream_falls_back_to_tick(eng, monkeypatch):
+    eng.set_stream_connected(False)
+    assert run_one_iteration(eng, monkeypatch) == ["tick"]
+
+def test_stale_stream_falls_back_to_tick(eng, monkeypatch):
+    eng.set_stream_connected(True)
+    eng._stream_resync = False
+    eng.stream_last_msg = time.monotonic() - settings.stream_stale_sec - 1
+    assert not eng.stream_alive()
+    assert run_one_iteration(eng, monkeypatch) == ["tick"]
+
+def test_live_stream_only_does_housekeeping(eng, monkeypatch):
+    eng.set_stream_connected(True)
+    eng._stream_resync = False
+    eng.on_stream_event({"T": "t", "S": "AAPL", "p": 10.0})  # keeps the stream fresh
+    assert run_one_iteration(eng, monkeypatch) == ["housekeeping"]
+
+class StopAfterTick:
+    """Stands in for the event queue so _stream_loop exits once the tick is done."""
+
+    def get(self, timeout=None):
+        raise KeyboardInterrupt
+
+def test_reconnect_backfills_bars_missed_while_down(eng, monkeypatch):
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_KEY_ID", "k")
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_SECRET_KEY", "s")
+    monkeypatch.setattr(settings, "dry_run", True)
+    monkeypatch.setattr(state_machine, "in_entry_window", lambda: False)  # no candidates to scan
+    monkeypatch.setattr(eng, "_maybe_prewarm", lambda: None)
+    history = [bar(f"2024-01-02T15:0{i}:00Z", 10.0 + i / 10) for i in range(6)]
+    published = {"n": 2}
+    calls = []
+
+    def fetch(symbol, limit, start=None):
+        calls.append((symbol, start))
+        return [b for b in history[:published["n"]] if start is None or b["t"] >= start][-limit:]
+    cache = BarCache(window=10, fetch=fetch)
+    monkeypatch.setattr(state_machine, "bar_cache", cache)
+    cache.get("AAPL")  # cached up to 15:01, then the stream dropped
+    calls.clear()
+
+    eng.set_stream_connected(False)
+    published["n"] = len(history)  # four bars close while disconnected
+    eng.set_stream_connected(True)
+    eng.on_stream_event({"T": "t", "S": "MSFT", "p": 400.0})  # the stream looks alive again
+    monkeypatch.setattr(eng, "_stream_events", StopAfterTick())
+    eng._stream_loop()
+
+    assert calls == [("AAPL", "2024-01-02T15:01:00Z")]
+    assert [b["t"] for b in cache.peek("AAPL")] == [b["t"] for b in history]
+    assert eng._stream_resync is False
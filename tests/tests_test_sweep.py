@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from bot.backtest import sweep
+from bot.backtest.engine import run_backtest
+from bot.backtest.signals import ARRAY_FIELDS, prepare_symbol
+
+from tests_test_backtest import session_bars
+
+def test_grid_and_random_sample():
+    combos = sweep.grid(target_pct=[0.003, 0.004], mae_k_atr=[1.0, 1.2, 1.5])
+    assert len(combos) == 6 and {"target_pct": 0.004, "mae_k_atr": 1.5} in combos
+    sample = sweep.random_sample({"atr_len": (5, 20), "rvol_min": (0.8, 1.5), "confirm_higher_low": [True, False]}, 20, seed=3)
+    assert len(sample) == 20
+    assert all(isinstance(c["atr_len"], int) and 5 <= c["atr_len"] <= 20 for c in sample)
+    assert all(0.8 <= c["rvol_min"] <= 1.5 for c in sample)
+    assert sample == sweep.random_sample({"atr_len": (5, 20), "rvol_min": (0.8, 1.5), "confirm_higher_low": [True, False]}, 20, seed=3)
+
+def test_shared_series_round_trip():
+    s = prepare_symbol("AAPL", session_bars(2, 0))
+    layout, blocks = sweep.share_series({"AAPL": s})
+    try:
+        got, attached = sweep.attach_series(layout)
+        for f in ARRAY_FIELDS:
+            assert np.array_equal(getattr(got["AAPL"], f), getattr(s, f), equal_nan=True), f
+        assert not got["AAPL"].close.flags.writeable
+        for shm in attached:
+            shm.close()
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+def test_sweep_matches_single_runs(tmp_path):
+    data = {"AAPL": session_bars(5, 0), "MSFT": session_bars(5, 1)}
+    combos = sweep.grid(target_pct=[0.003, 0.005], mae_k_atr=[0.8, 1.5])
+    out = tmp_path / "results.csv"
+    df = sweep.run_sweep(data, combos, out_path=str(out), workers=2)
+    assert df["run"].tolist() == [0, 1, 2, 3]
+    assert (df["error"] == "").all()
+    on_disk = pd.read_csv(out).sort_values("run").reset_index(drop=True)
+    assert on_disk["realized_usd"].tolist() == df["realized_usd"].tolist()
+    for i in (0, 3):
+        assert run_backtest(data, **combos[i]).summary()["realized_usd"] == df.loc[i, "realized_usd"]
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from bot.broker import alpaca_adapter
+from bot.config.settings import settings
+from bot.logging import tracing
+from bot.logging.audit import Auditor
+from bot.logging.events import hub, publish
+
+
+def test_spans_nest_under_one_trace():
+    assert tracing.current_trace_id() is None
+    with tracing.span("orphan") as sp:
+        assert sp is None
+    with tracing.trace("tick") as root:
+        with tracing.span("scan", symbols=2) as scan:
+            with tracing.span("fetch_bars") as fetch:
+                assert tracing.current_trace_id() == root.trace_id
+        assert tracing.current_span() is root
+    assert tracing.current_trace_id() is None
+    assert scan.parent_id == root.span_id and fetch.parent_id == scan.span_id
+    assert fetch.trace_id == root.trace_id and scan.attrs == {"symbols": 2}
+    assert fetch.dur_ms is not None and root.dur_ms >= scan.dur_ms >= fetch.dur_ms
+
+def test_errors_are_recorded_on_the_span():
+    try:
+        with tracing.trace("tick") as root:
+            raise ValueError("bad bar")
+    except ValueError:
+        pass
+    assert root.error == "ValueError: bad bar"
+
+def test_submit_carries_the_trace_into_pool_threads():
+    with ThreadPoolExecutor(max_workers=2) as pool, tracing.trace("tick") as root:
+        carried = tracing.submit(pool, tracing.current_trace_id).result()
+        plain = pool.submit(tracing.current_trace_id).result()
+    assert carried == root.trace_id
+    assert plain is None
+
+def test_bar_batch_spans_join_the_tick(monkeypatch):
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_KEY_ID", "k")
+    monkeypatch.setattr(alpaca_adapter, "_ALPACA_SECRET_KEY", "s")
+    seen = []
+
+    def fetch(symbol, limit):
+        seen.append((symbol, tracing.current_span().name, tracing.current_trace_id()))
+        return [{"t": "2024-01-02T15:00:00Z", "c": 1.0}]
+
+    with tracing.trace("tick") as root:
+        alpaca_adapter.get_bars_batch(["AAPL", "MSFT"], fetch=fetch)
+    assert sorted(seen) == [("AAPL", "bars", root.trace_id), ("MSFT", "bars", root.trace_id)]
+
+def test_trace_follows_await_and_to_thread():
+    async def run():
+        with tracing.trace("stream_bar") as root:
+            await asyncio.sleep(0)
+            in_thread = await asyncio.to_thread(tracing.current_trace_id)
+            return root.trace_id, in_thread
+    tid, in_thread = asyncio.run(run())
+    assert tid == in_thread
+
+def test_audit_records_and_events_are_stamped(tmp_path):
+    aud = Auditor(str(tmp_path / "audit.log"))
+    aud.log("engine_started", {})
+    with tracing.trace("tick") as root:
+        aud.log("entry_order_placed", {"symbol": "AAPL"})
+    aud.close()
+    recs = [json.loads(l) for l in (tmp_path / "audit.log").read_text().splitlines()]
+    assert "trace_id" not in recs[0]
+    assert recs[1]["trace_id"] == root.trace_id
+
+    async def run():
+        with hub.subscribe() as sub:
+            with tracing.trace("tick") as t:
+                await publish("AAPL: Placed entry")
+            await publish("system: Bot started")
+            return t.trace_id, await sub.get(), await sub.get()
+    tid, stamped, plain = asyncio.run(run())
+    assert stamped == f"AAPL: Placed entry [trace {tid}]"
+    assert plain == "system: Bot started"
+
+def test_spans_export_as_json_lines(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "trace_export", True)
+    monkeypatch.setattr(settings, "trace_file", str(path))
+    monkeypatch.setattr(tracing, "_exporter", None)
+    with tracing.trace("tick", mode="paper") as root:
+        with tracing.span("scan"):
+            pass
+    tracing.close()
+    spans = [json.loads(l)["payload"] for l in path.read_text().splitlines()]
+    assert [s["name"] for s in spans] == ["scan", "tick"]
+    assert all(s["trace_id"] == root.trace_id for s in spans)
+    assert spans[1]["attrs"] == {"mode": "paper"} and spans[1]["parent_id"] is None
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+import pytest
+
+from bot.api import wire
+from bot.api.broadcast import BroadcastHub
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent = []
+
+    async def _send(self, frame):
+        self.sent.append(frame)
+
+    send_text = send_bytes = _send
+
+def _pump(proto, msgs, raw=False):
+    async def run():
+        hub = BroadcastHub("t", maxlen=1000)
+        ws = FakeWS()
+        with hub.subscribe() as sub:
+            for m in msgs:
+                hub.publish(m)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(wire.pump(ws, sub, proto, raw, interval=0), 0.05)
+            return ws.sent, sub.stats()
+    return asyncio.run(run())
+
+EVENTS = [{"T": "q", "S": "SPY", "bp": 500.0 + i, "ap": 500.1 + i} for i in range(50)]
+
+def test_json_proto_is_one_frame_per_message():
+    sent, stats = _pump("json", EVENTS[:3])
+    assert [json.loads(f) for f in sent] == EVENTS[:3]
+    assert stats["frames"] == 3
+
+def test_batch_proto_sends_one_compact_frame():
+    sent, stats = _pump("batch", EVENTS)
+    assert len(sent) == 1 and json.loads(sent[0]) == EVENTS
+    assert " " not in sent[0]
+    assert stats["bytes"] < sum(len(json.dumps(e)) for e in EVENTS)
+
+def test_raw_frames_are_spliced_without_decoding():
+    frames = ['[{"T":"q","S":"A"}]', '[{"T":"t","S":"B"},{"T":"t","S":"A"}]', "[]"]
+    sent, _ = _pump("batch", frames, raw=True)
+    assert json.loads(sent[0]) == [{"T": "q", "S": "A"}, {"T": "t", "S": "B"}, {"T": "t", "S": "A"}]
+
+def test_negotiate():
+    assert wire.negotiate(None) == "json"
+    assert wire.negotiate("BATCH") == "batch"
+    assert wire.negotiate("msgpack", raw=True) == "batch"
+    with pytest.raises(ValueError):
+        wire.negotiate("xml")
+
+def test_msgpack_proto():
+    msgpack = pytest.importorskip("msgpack")
+    sent, _ = _pump("msgpack", EVENTS)
+    assert isinstance(sent[0], bytes) and msgpack.unpackb(sent[0]) == EVENTS